@@ -1,33 +1,69 @@
-import sys
-import json
-from firebase_connection import FirebaseConnection
-
-if __name__ == '__main__':
-    fc = FirebaseConnection()
-    print("데이터 수신 대기...")
-
-    for line in sys.stdin:
-        try:
-            data = json.loads(line.strip())
-
-            if data["Task"] == "init_data":
-                fc.init_data(data["Total"], data["Mature"])
-
-            elif data["Task"] == "init_log":
-                fc.init_log(data["Total"], data["Mature"])
-
-            elif data["Task"] == "count":
-                fc.increment_harvest_count()
-
-            elif data["Task"] == "clear":
-                fc.clear_data()
-                
-            else:
-                print(f"데이터 수신 오류: {data}")
-                break
-
-            print(f"수신됨 {data}")
-
-        except EOFError:
-            # 파이프가 닫히면 종료
-            break
\ No newline at end of file
+import os
+import sys
+import json
+import signal
+import argparse
+from firebase_connection import FirebaseConnection
+from telemetry_channel import TelemetryReceiver
+from telemetry_store import TelemetryStore, TelemetrySyncer
+
+# 수신한 이벤트를 먼저 기록하는 로컬 DB (네트워크가 끊겨도 유실 없음, 연결되면 Firestore 로 동기화)
+TELEMETRY_DB = os.environ.get('TELEMETRY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telemetry.db'))
+
+
+def handle(store, syncer, data):
+    # 필드 검사는 store.append (잘못된 이벤트는 기록하지 않음)
+    try:
+        store.append(data.get("Task"), total=data.get("Total"), mature=data.get("Mature"), n=data.get("N", 1))
+    except (ValueError, AttributeError) as e:
+        print(f"데이터 수신 오류: {data} ({e})")
+        return False
+
+    syncer.wake()
+    print(f"수신됨 {data}")
+    return True
+
+
+def _run(store, syncer):
+    """stdin JSON line 모드 (--socket 없이 단독 실행 시)"""
+    for line in sys.stdin:
+        try:
+            if not handle(store, syncer, json.loads(line.strip())):
+                break
+
+        except EOFError:
+            # 파이프가 닫히면 종료
+            break
+
+
+def _serve(store, syncer, path):
+    """socket 채널 모드: 메시지는 socket 으로 받고, stdin 이 닫히면(detection 종료) 종료"""
+    receiver = TelemetryReceiver(path, lambda data: handle(store, syncer, data))
+    try:
+        for _ in sys.stdin:
+            pass
+    finally:
+        receiver.close()
+        print(f"수신 통계 {receiver.counters}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--socket', default=None, help="telemetry_channel Unix socket 경로")
+    args = parser.parse_args()
+
+    # Firebase 연결은 동기화 스레드가 담당 (오프라인으로 시작해도 수신/기록은 바로 가능)
+    store = TelemetryStore(TELEMETRY_DB)
+    syncer = TelemetrySyncer(store, connect=lambda: FirebaseConnection(flush_interval_s=None, max_pending=None))
+    print(f"데이터 수신 대기... (미동기화 {store.backlog()}건)")
+    # detection 종료 시 terminate(SIGTERM) → 남은 갱신 기록 후 종료
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    try:
+        if args.socket:
+            _serve(store, syncer, args.socket)
+        else:
+            _run(store, syncer)
+    finally:
+        syncer.close()
+        store.close()
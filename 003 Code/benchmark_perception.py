@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Perception Benchmark (수확 인식 경로 end-to-end 측정)
+
+YOLO → UNet(crop) → generate_instance_mask → classify_strawberry_maturity
+→ extract_centerline_and_picking_points → depth 조회 체인을 녹화 세션 위에서 실행하고
+스테이지별/전체 지연시간 p50/p95/p99, peak RSS, 프레임당 메모리 할당량을 JSON 으로 저장
+
+- 사용:
+    python3 frame_source.py record session_dir --frames 300   # 세션 녹화 (카메라 필요)
+    python3 benchmark_perception.py session_dir --out bench.json
+    python3 benchmark_perception.py session_dir --compare base.json --out bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from frame_source import create_frame_source
+from util.pipeline import StageTimer
+from util.tracker import BoxTracker
+
+# detection 모듈이 import 시점에 모델을 로드하므로 장치를 먼저 지정
+os.environ.setdefault('DETECTION_DEVICE', 'cpu')
+import detection  # noqa: E402
+
+STAGES = ['yolo', 'track', 'seg', 'instance', 'maturity', 'centerline', 'depth']
+PERCENTILES = (50, 95, 99)
+
+
+class FrameStageRecorder(StageTimer):
+    """StageTimer 와 동일하게 동작하면서 프레임 단위로 스테이지 시간을 합산해 보관"""
+
+    def __init__(self):
+        super().__init__()
+        self.frames = []
+        self._current = None
+
+    def begin_frame(self):
+        self._current = {}
+
+    def end_frame(self):
+        self.frames.append(self._current)
+        self._current = None
+
+    def record(self, stage, ms):
+        super().record(stage, ms)
+        if self._current is not None:
+            self._current[stage] = self._current.get(stage, 0.0) + ms
+
+
+def summarize(values):
+    if len(values) == 0:
+        return {'count': 0}
+    arr = np.asarray(values, dtype=np.float64)
+    out = {'count': int(arr.size), 'mean': float(arr.mean()), 'max': float(arr.max())}
+    for p in PERCENTILES:
+        out[f'p{p}'] = float(np.percentile(arr, p))
+    return out
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=BASE_DIR, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    # Linux: ru_maxrss 단위는 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def reset_tracker():
+    """패스마다 트랙 캐시를 비운 상태에서 시작"""
+    if detection.tracker is not None:
+        detection.tracker = BoxTracker(refresh_interval=detection.TRACK_REFRESH_INTERVAL,
+                                       refresh_iou=detection.TRACK_REFRESH_IOU)
+
+
+def run_timing(path, warmup, max_frames):
+    """타이밍 패스: 프레임별 스테이지/전체 시간(ms)"""
+    recorder = FrameStageRecorder()
+    detection.stage_timer = recorder
+    reset_tracker()
+    totals = []
+    n_targets = 0
+
+    source = create_frame_source(path, realtime=False)
+    with source:
+        idx = 0
+        while max_frames is None or len(totals) < max_frames:
+            frame = source.read()
+            if frame is None:
+                if source.eof:
+                    break
+                continue
+
+            measuring = idx >= warmup
+            if measuring:
+                recorder.begin_frame()
+            t0 = time.perf_counter()
+            result = detection.process_frame(frame, idx)
+            total_ms = (time.perf_counter() - t0) * 1000.0
+            if measuring:
+                recorder.end_frame()
+                totals.append(total_ms)
+                n_targets += result['target'] is not None
+            idx += 1
+
+    stages = {}
+    for stage in STAGES:
+        # 해당 스테이지가 실행되지 않은 프레임은 0ms 로 집계
+        stages[stage] = summarize([f.get(stage, 0.0) for f in recorder.frames])
+    return stages, summarize(totals), n_targets
+
+
+def run_alloc(path, n_frames):
+    """메모리 패스(tracemalloc): 프레임당 할당 peak(KB) 및 블록 수"""
+    detection.stage_timer = StageTimer()
+    reset_tracker()
+    peaks_kb = []
+    blocks = []
+
+    source = create_frame_source(path, realtime=False)
+    tracemalloc.start()
+    try:
+        with source:
+            idx = 0
+            while len(peaks_kb) < n_frames:
+                frame = source.read()
+                if frame is None:
+                    if source.eof:
+                        break
+                    continue
+                before = tracemalloc.take_snapshot()
+                base, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                detection.process_frame(frame, idx)
+                _, peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+
+                peaks_kb.append((peak - base) / 1024.0)
+                diff = after.compare_to(before, 'filename')
+                blocks.append(sum(max(0, d.count_diff) for d in diff))
+                idx += 1
+    finally:
+        tracemalloc.stop()
+
+    return {'alloc_peak_kb_per_frame': summarize(peaks_kb),
+            'alloc_blocks_per_frame': summarize(blocks)}
+
+
+def print_report(report, baseline=None):
+    print(f"\n=== Perception benchmark ({report['meta']['frames']} frames, "
+          f"device={report['meta']['device']}) ===")
+    print(f"{'stage':<12}{'p50':>10}{'p95':>10}{'p99':>10}{'mean':>10}")
+    rows = list(report['stages'].items()) + [('total', report['total'])]
+    for name, s in rows:
+        if s.get('count', 0) == 0:
+            continue
+        line = f"{name:<12}{s['p50']:>10.2f}{s['p95']:>10.2f}{s['p99']:>10.2f}{s['mean']:>10.2f}"
+        if baseline is not None:
+            base = baseline['total'] if name == 'total' else baseline['stages'].get(name)
+            if base and base.get('count', 0) and base['p50'] > 0:
+                line += f"   p50 {100.0 * (s['p50'] - base['p50']) / base['p50']:+.1f}%"
+        print(line)
+    mem = report['memory']
+    print(f"peak RSS: {mem['peak_rss_mb']:.1f} MB")
+    if 'alloc_peak_kb_per_frame' in mem and mem['alloc_peak_kb_per_frame'].get('count', 0):
+        print(f"alloc peak / frame: p50 {mem['alloc_peak_kb_per_frame']['p50']:.1f} KB, "
+              f"blocks p50 {mem['alloc_blocks_per_frame']['p50']:.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수확 인식 경로 end-to-end 벤치마크 (CPU)")
+    parser.add_argument('session', help="녹화 세션 (.bag / .npz / 세션 디렉토리)")
+    parser.add_argument('--warmup', type=int, default=5, help="측정에서 제외할 초기 프레임 수")
+    parser.add_argument('--frames', type=int, default=None, help="측정할 최대 프레임 수")
+    parser.add_argument('--alloc-frames', type=int, default=20, help="tracemalloc 측정 프레임 수 (0: 생략)")
+    parser.add_argument('--no-tracking', action='store_true', help="트랙 캐시 없이 매 프레임 전체 인식")
+    parser.add_argument('--out', default='bench_perception.json', help="결과 JSON 경로")
+    parser.add_argument('--compare', default=None, help="비교할 이전 결과 JSON")
+    args = parser.parse_args()
+
+    if args.no_tracking:
+        detection.tracker = None
+    stages, total, n_targets = run_timing(args.session, args.warmup, args.frames)
+    memory = {'peak_rss_mb': peak_rss_mb()}
+    if args.alloc_frames > 0:
+        memory.update(run_alloc(args.session, args.alloc_frames))
+
+    report = {
+        'meta': {
+            'session': os.path.abspath(args.session),
+            'revision': git_revision(),
+            'timestamp': datetime.now(tz=timezone.utc).isoformat(),
+            'device': detection.DEVICE,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'frames': total.get('count', 0),
+            'warmup': args.warmup,
+            'frames_with_target': n_targets,
+            'tracking': detection.tracker is not None,
+        },
+        'stages': stages,
+        'total': total,
+        'memory': memory,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\n[INFO] 결과 저장: {args.out}")
+
+
+if __name__ == '__main__':
+    main()
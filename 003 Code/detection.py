@@ -1,4 +1,3 @@
-import pyrealsense2 as rs
 import numpy as np
 import cv2
 import os
@@ -7,11 +6,17 @@ import torch
 import time
 import math
 import subprocess
-import json
+import threading
+import argparse
 
-from util.generate_instance_mask import generate_instance_mask
-from util.classify_strawberry_maturity import classify_strawberry_maturity
+from util.generate_instance_mask import generate_instance_mask, instance_rois
+from util.classify_strawberry_maturity import classify_strawberry_maturity_batch
 from util.extract_centerline_and_picking_points import extract_centerline_and_picking_points
+from util.pipeline import LatestFrameQueue, StageTimer, AdaptiveScheduler
+from util.tracker import BoxTracker
+from frame_source import create_frame_source
+from telemetry_channel import TelemetrySender
+from socket_sender import SocketSender
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
@@ -20,47 +25,34 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(BASE_DIR, 'dl', 'yolov5n'))
 sys.path.insert(0, os.path.join(BASE_DIR, 'dl', 'MobileNetV3_UNet'))
 
-from dl.MobileNetV3_UNet.seg_infer import load_segmentation_model, infer_segmentation_on_crop
+from dl.MobileNetV3_UNet.seg_infer import load_segmentation_model, infer_segmentation_on_crops
 from dl.yolov5n.yolov5_infer import YOLOv5nInfer
 
 # -------------------- 모델 및 장치 초기화 --------------------
 yolo_model_path = 'dl/yolov5n/best.pt'
-seg_model_path = 'dl/MobileNetV3_UNet/checkpoints/best_model.pth'
-DEVICE = 'cuda'
+# .onnx 경로를 지정하면 ONNX Runtime(TensorRT EP) 백엔드 사용 (dl/MobileNetV3_UNet/export_onnx.py)
+seg_model_path = os.environ.get('SEG_MODEL_PATH', 'dl/MobileNetV3_UNet/checkpoints/best_model.pth')
+SEG_PRECISION = os.environ.get('SEG_PRECISION', 'fp16')
+SEG_INT8_CALIBRATION = os.environ.get('SEG_INT8_CALIBRATION')   # int8 용 TensorRT calibration cache
+DEVICE = os.environ.get('DETECTION_DEVICE', 'cuda' if torch.cuda.is_available() else 'cpu')
 
 print("[INFO] 모델 로딩 중...")
 yolo_model = YOLOv5nInfer(model_path=yolo_model_path, device=DEVICE)
-seg_model = load_segmentation_model(seg_model_path)
-
-# -------------------- RealSense 설정 --------------------
-pipeline = rs.pipeline()
-config = rs.config()
-config.enable_stream(rs.stream.color, 640, 480, rs.format.bgr8, 30)
-config.enable_stream(rs.stream.depth, 640, 480, rs.format.z16, 30)
-
-ctx = rs.context()
-device = ctx.query_devices()[0]
-depth_sensor = device.first_depth_sensor()
-
-preset_map = {
-    'default': 1,
-    'high_accuracy': 3,
-    'high_density': 4,
-    'medium_density': 5
-}
-depth_sensor.set_option(rs.option.visual_preset, preset_map['high_accuracy'])
-depth_sensor.set_option(rs.option.laser_power, 240.0)
-depth_sensor.set_option(rs.option.exposure, 8500.0)
-depth_sensor.set_option(rs.option.gain, 16.0)
-
-profile = pipeline.start(config)
-align = rs.align(rs.stream.color)
+seg_model = load_segmentation_model(seg_model_path, precision=SEG_PRECISION,
+                                    int8_calibration_table=SEG_INT8_CALIBRATION)
+
+# -------------------- 프레임 소스 --------------------
+# main(source=...) 에서 지정, 없으면 RealSense 카메라 (frame_source.py 참고)
+source = None
 
 # -------------------- DI 콜백/상태 훅 --------------------
 _DI_CB = None       # 외부(main.py)에서 등록하는 콜백
 _LAST_DI = None     # 마지막 Ripe 포인트의 3D 결과(dict) 저장
 
 _DI_CB_2 = None
+_BUSY_CB = None     # 로봇 동작 중 여부 (True 면 인식을 monitor 모드로 낮춤)
+_LAST_ANGLE = None  # _LAST_DI 와 같은 프레임에서 계산된 줄기 각도
+_TARGETS_CB = None  # 프레임별 전체 수확 대상 목록을 받는 콜백 (연속 수확용)
 
 # -------------------- Indy mode --------------------
 indy_mode = 1
@@ -75,6 +67,19 @@ def register_di_callback2(func):
     global _DI_CB_2
     _DI_CB_2 = func
 
+def register_busy_callback(func):
+    """외부(main.py)에서 로봇 동작 중 여부(bool)를 반환하는 콜백을 등록"""
+    global _BUSY_CB
+    _BUSY_CB = func
+
+def register_targets_callback(func):
+    """
+    외부(main.py)에서 전체 인식 프레임마다 (targets, host_time) 를 받는 콜백을 등록
+    등록되면 첫 번째 대상뿐 아니라 모든 fully_ripe 딸기의 수확점/3D 좌표를 계산
+    """
+    global _TARGETS_CB
+    _TARGETS_CB = func
+
 # -------------------- 유틸 함수 --------------------
 def pixel_to_meter(x, y, depth_mm, fx=615, fy=615, cx=320, cy=240):
     z = depth_mm / 1000.0
@@ -83,8 +88,14 @@ def pixel_to_meter(x, y, depth_mm, fx=615, fy=615, cx=320, cy=240):
     return x_m, y_m, z
 
 
-def get_mean_valid_depth_in_mask(depth_frame, mask, padding=6):
-    depth = np.asanyarray(depth_frame.get_data())
+DEPTH_EROSION_PADDING = 6
+
+
+def get_mean_valid_depth_in_mask(depth, mask, padding=DEPTH_EROSION_PADDING):
+    """
+    mask 를 padding 만큼 erosion 한 영역의 유효 depth 평균
+    depth/mask 는 전체 프레임 또는 같은 ROI (ROI 는 마스크 주변에 padding 이상 여유가 있어야 결과 동일)
+    """
     kernel = np.ones((padding * 2 + 1, padding * 2 + 1), np.uint8)
     eroded_mask = cv2.erode(mask.astype(np.uint8), kernel, iterations=1)
     valid_mask = (depth > 0) & np.isfinite(depth)
@@ -101,6 +112,7 @@ def compute_angle(tip, midpoint):
     return np.degrees(angle_rad)
 
 def angles_from_pixel(depth_frame, u=200, v=200):
+    """depth_frame: frame_source.FrameData"""
     w = depth_frame.get_width()
     h = depth_frame.get_height()
     u = int(max(0, min(w - 1, round(u))))
@@ -110,10 +122,7 @@ def angles_from_pixel(depth_frame, u=200, v=200):
         return None
 
     # 반드시 "depth 프레임의" intrinsics 사용
-    depth_vsp  = depth_frame.get_profile().as_video_stream_profile()
-    depth_intr = depth_vsp.get_intrinsics()
-    X, Y, Z = rs.rs2_deproject_pixel_to_point(depth_intr, [u, v], z)
-    print(depth_intr)
+    X, Y, Z = depth_frame.deproject(u, v, z)
 
     theta = math.degrees(math.atan2(math.hypot(X, Y), Z))
     yaw   = math.degrees(math.atan2(X, Z))
@@ -131,294 +140,535 @@ def put_text_bg(img, text, org, scale=0.5, thickness=1, fg=(255,255,255), bg=(0,
     # 텍스트
     cv2.putText(img, text, (x + 3, y - 3), font, scale, fg, thickness, cv2.LINE_AA)
 
-def send_data_to_subprocess(task, n_total = None, n_mature = None):    
+def send_data_to_subprocess(task, n_total = None, n_mature = None):
+    """app.py 로 텔레메트리 전송 (큐에 넣고 바로 반환, 전송은 telemetry_channel 스레드에서)"""
+    if channel is None:
+        return
+    if task == "count":
+        channel.send(task)
+    else:
+        channel.send(task, Total=n_total, Mature=n_mature)
+    print(f"[INFO] 데이터 전송 요청: {task} (backlog {channel.backlog()})")
+
+# subprocess로 firebase 연결 (stdin 은 종료 신호용, 데이터는 Unix socket 채널)
+ENV_PYTHON = "" # subprocess에서 사용할 python 경로 (비워두면 현재 python)
+APP_SCRIPT = "app.py" # app.py 경로
+TELEMETRY_SOCKET = os.environ.get('TELEMETRY_SOCKET', f'/tmp/harvest-telemetry-{os.getpid()}.sock')
+process = None
+channel = None
+
+# 수확점 좌표 TCP 송신 (예: POINT_SOCKET=192.168.0.10:9999, 비워두면 전송 안 함)
+POINT_SOCKET = os.environ.get('POINT_SOCKET', '')
+POINT_SOCKET_CODEC = os.environ.get('POINT_SOCKET_CODEC', 'point')   # json / msgpack / point
+point_sender = None
+
+def report_harvest():
+    """수확 1개 완료 (main.py 픽킹 시퀀스에서 호출)"""
+    send_data_to_subprocess("count")
+
+def start_subprocess():
+    global process, channel
+    print("[INFO] subprocess 시작")
+    channel = TelemetrySender(TELEMETRY_SOCKET)   # app.py 가 socket 을 열 때까지 메시지는 큐에 보관
     try:
-        data = {"Task": task,
-                "Total": n_total,
-                "Mature": n_mature}
-
-        json_data = json.dumps(data) + "\n"
-        process.stdin.write(json_data)
-        process.stdin.flush()
-        print(f"[INFO] 데이터 전송 완료: {json_data.strip()}")
-        
+        process = subprocess.Popen(
+            [ENV_PYTHON or sys.executable, APP_SCRIPT, '--socket', TELEMETRY_SOCKET],
+            stdin=subprocess.PIPE,
+            stdout=sys.stdout,
+            stderr=sys.stderr,
+            text=True
+        )
+    except OSError as e:
+        print(f"[ERROR] subprocess 시작 실패: {e}")
+        process = None
+
+# -------------------- 파이프라인 설정 --------------------
+# capture → inference → render(UI) 3단 구성, 단계 사이는 최신 프레임만 유지하는 큐
+CAPTURE_QUEUE_SIZE = 1
+RESULT_QUEUE_SIZE = 1
+
+stage_timer = StageTimer()
+
+# -------------------- 트래킹 설정 --------------------
+# 트랙별 인식 결과를 캐시하고 TRACK_REFRESH_INTERVAL 프레임마다
+# (또는 새 딸기 / box 변화 / 대상 소실 시) 전체 인식 경로 재실행, None 이면 매 프레임 전체 실행
+TRACK_REFRESH_INTERVAL = 10
+TRACK_REFRESH_IOU = 0.7
+tracker = BoxTracker(refresh_interval=TRACK_REFRESH_INTERVAL, refresh_iou=TRACK_REFRESH_IOU)
+
+# -------------------- 적응형 인식 주기 --------------------
+# 픽킹 동작 중에는 MONITOR_EVERY 프레임마다 detector 만 실행
+MONITOR_EVERY = 5
+scheduler = AdaptiveScheduler(is_busy=lambda: _BUSY_CB is not None and _BUSY_CB(),
+                              monitor_every=MONITOR_EVERY)
+
+_END_OF_STREAM = object()  # 재생 소스 종료 표시
+
+
+def print_last_di():
+    d = _LAST_DI
+    print(f"[Ripe XYZ] X={d.get('X', float('nan')):.3f} m, "
+          f"Y={d.get('Y', float('nan')):.3f} m, "
+          f"Z={d.get('Z', float('nan')):.3f} m "
+          f"(dist={d.get('distance_m', float('nan')):.3f} m)")
+
+
+def trigger_di_callback():
+    """키 '1' 처리: 마지막 Ripe 결과를 _DI_CB 로 전달, 콜백 호출에 성공하면 True"""
+    if _LAST_DI is None:
+        print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
+        return False
+    if _DI_CB is None:
+        print_last_di()
+        return False
+    try:
+        _DI_CB(_LAST_DI)
+        return True
     except Exception as e:
-        print(f"[ERROR] subprocess에 데이터 전송 중 오류 발생: {e}")
-
-# subprocess로 firebase 연결
-print("[INFO] subprocess 시작")
-ENV_PYTHON = "" # subprocess에서 사용할 python 경로
-APP_SCRIPT = "app.py" # app.py 경로
-
-process = subprocess.Popen(
-    [ENV_PYTHON, APP_SCRIPT],
-    stdin=subprocess.PIPE,
-    stdout=sys.stdout,
-    stderr=sys.stderr,
-    text=True
-)
-
-# -------------------- 메인 루프 --------------------
-def main():
-    global _LAST_DI, indy_mode  # 함수 내에서 갱신하기 위해 global 선언
-
-    frame_idx = 0
-    prev_time = time.time()
-    start_time = None
-    total_frames = 0
-
-    is_first = True
-    n_mature = 0
-    n_harvest = 0
-
-    print("[INFO] 실시간 딸기 탐지 시작... 'q' 종료, '1' 현재 Ripe XYZ 출력")
-
-    while True:
-        frames = pipeline.wait_for_frames()
-        frames = align.process(frames)
-        color_frame = frames.get_color_frame()
-        depth_frame = frames.get_depth_frame()
-        if not color_frame or not depth_frame:
-            # 공통 키 처리 (q/1)
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('1'):
-                if _LAST_DI is not None:
-                    if _DI_CB is not None:
-                        try:
-                            _DI_CB(_LAST_DI)
-                        except Exception as e:
-                            print(f"[WARN] DI callback error: {e}")
-                    else:
-                        d = _LAST_DI
-                        print(f"[Ripe XYZ] X={d.get('X', float('nan')):.3f} m, "
-                              f"Y={d.get('Y', float('nan')):.3f} m, "
-                              f"Z={d.get('Z', float('nan')):.3f} m "
-                              f"(dist={d.get('distance_m', float('nan')):.3f} m)")
-                else:
-                    print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
-            continue
-
-        image = np.asanyarray(color_frame.get_data())
-        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        binary_mask = np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
-
+        print(f"[WARN] DI callback error: {e}")
+        return False
+
+
+# -------------------- 추론 --------------------
+def build_target(frame, roi, cx, cy):
+    """fully_ripe 인스턴스 1개의 수확점(줄기 축/각도), depth, 중심점 3D 좌표"""
+    sy, sx, roi_mask = roi
+    roi_mask = roi_mask.astype(np.uint8)
+    target = {'cx': cx, 'cy': cy, 'has_axis': False,
+              'angle': None, 'depth_value': None, 'message': None, 'di': None}
+    with stage_timer.measure('centerline'):
+        tip, midpoint, picking_pts = extract_centerline_and_picking_points(roi_mask, offset=(sx.start, sy.start))
+    if tip is not None and midpoint is not None and len(picking_pts) == 2:
+        target['has_axis'] = True
+        target['angle'] = compute_angle(tip, midpoint)
+        with stage_timer.measure('depth'):
+            depth_value = get_mean_valid_depth_in_mask(frame.depth[sy, sx], roi_mask,
+                                                       padding=DEPTH_EROSION_PADDING)
+
+        if depth_value is not None:
+            left_pt, right_pt = picking_pts
+            left_xyz = pixel_to_meter(*left_pt, depth_value)
+            right_xyz = pixel_to_meter(*right_pt, depth_value)
+
+            # Center 픽셀 좌표 계산
+            center_x = int((left_pt[0] + right_pt[0]) / 2)
+            center_y = int((left_pt[1] + right_pt[1]) / 2)
+
+            target['depth_value'] = depth_value
+            target['message'] = {
+                "left": {"x": round(left_xyz[0], 3), "y": round(left_xyz[1], 3), "z": round(left_xyz[2], 3)},
+                "right": {"x": round(right_xyz[0], 3), "y": round(right_xyz[1], 3), "z": round(right_xyz[2], 3)},
+                "angle": round(target['angle'], 2),
+                "center_pixel": {"x": center_x, "y": center_y}
+            }
+
+        # 중심점 3D 좌표
+        with stage_timer.measure('depth'):
+            target['di'] = angles_from_pixel(depth_frame=frame, u=cx, v=cy)
+    return target
+
+
+def process_frame(frame, frame_idx, count_mature=False, detect_only=False):
+    """
+    한 프레임(frame_source.FrameData)에 대해 YOLO → Segmentation → 인스턴스/성숙도 → 수확점/깊이 계산
+    frame.color 는 수정하지 않으며, 시각화는 render_result 에서 수행
+    count_mature: True 면 수확점 계산 대신 전체/숙성 딸기 수만 계산 (최초 1회)
+    detect_only: True 면 YOLO box 만 계산 (로봇 동작 중 monitor 모드)
+    return: dict(image, boxes, seg, tracks, n_total, n_mature, target, targets)
+            targets: register_targets_callback 이 등록된 경우 모든 fully_ripe 대상 (target 은 그 중 첫 번째)
+    """
+    image = frame.color
+    result = {'frame_idx': frame_idx,
+              'image': image,
+              'boxes': [],        # [(x1, y1, x2, y2), ...]
+              'seg': [],          # [((x1, y1, x2, y2), mask), ...]
+              'tracks': [],       # [(track_id, (x1, y1, x2, y2), maturity), ...]
+              'n_total': None,
+              'n_mature': None,
+              'target': None,
+              'targets': [],
+              'detect_only': detect_only,
+              'reused': False,    # True 면 seg/target(s) 가 이전 refresh 프레임의 캐시 (이번 프레임 좌표 아님)
+              'host_time': getattr(frame, 'host_time', None)}
+
+    with stage_timer.measure('yolo'):
         preds = yolo_model(image, frame_idx)
-        if preds is None or len(preds) == 0:
-            cv2.imshow("Strawberry Detection", image)
-            key = cv2.waitKey(1) & 0xFF
-            if key == ord('q'):
-                break
-            elif key == ord('1'):
-                if _LAST_DI is not None:
-                    if _DI_CB is not None:
-                        try:
-                            _DI_CB(_LAST_DI)
-                        except Exception as e:
-                            print(f"[WARN] DI callback error: {e}")
-                    else:
-                        d = _LAST_DI
-                        print(f"[Ripe XYZ] X={d.get('X', float('nan')):.3f} m, "
-                              f"Y={d.get('Y', float('nan')):.3f} m, "
-                              f"Z={d.get('Z', float('nan')):.3f} m "
-                              f"(dist={d.get('distance_m', float('nan')):.3f} m)")
-                else:
-                    print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
-            continue
 
-        # ---------------- YOLO + Segmentation 시각화 ----------------
+    boxes = []
+    if preds is not None:
         for (*xyxy, conf, cls) in preds:
             x1 = max(int(xyxy[0].item()), 0)
             y1 = max(int(xyxy[1].item()), 0)
             x2 = min(int(xyxy[2].item()), image.shape[1])
             y2 = min(int(xyxy[3].item()), image.shape[0])
-
-            # 바운딩 박스 표시
-            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
-
-            crop = image[y1:y2, x1:x2]
-            if crop.size == 0:
-                continue
-
-            crop_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-            mask = infer_segmentation_on_crop(crop_rgb, seg_model, device=DEVICE)
-            mask_resized = cv2.resize(mask, (x2 - x1, y2 - y1), interpolation=cv2.INTER_NEAREST)
-
-            # 세그멘테이션 결과 시각화
-            mask_overlay = np.zeros_like(crop)
-            mask_overlay[mask_resized == 1] = [0, 0, 255]  # 빨간색 마스크
-            blended = cv2.addWeighted(crop, 0.7, mask_overlay, 0.3, 0)
-            image[y1:y2, x1:x2] = blended
-
-            # 바이너리 마스크 통합
-            binary_mask[y1:y2, x1:x2][mask_resized == 1] = 255
+            if x2 > x1 and y2 > y1:
+                boxes.append((x1, y1, x2, y2))
+    result['boxes'] = boxes
+    if detect_only:
+        return result
+
+    # ---------------- 트래킹 (캐시 재사용) ----------------
+    if tracker is not None:
+        with stage_timer.measure('track'):
+            tracker.update(boxes)
+            reuse = boxes and not count_mature and not tracker.needs_refresh()
+            if reuse:
+                result['reused'] = True
+                result['seg'] = tracker.cached_seg(image.shape[:2])
+                result['target'] = tracker.cached_target()
+                result['targets'] = tracker.cached_targets()
+                result['tracks'] = tracker.current_tracks(smoothed=True, shape=image.shape[:2])
+        if reuse:
+            return result
+
+    if len(boxes) == 0:
+        return result
+
+    # ---------------- YOLO + Segmentation ----------------
+    with stage_timer.measure('seg'):
+        crops_rgb = [cv2.cvtColor(image[y1:y2, x1:x2], cv2.COLOR_BGR2RGB) for (x1, y1, x2, y2) in boxes]
+
+        # 프레임 내 모든 crop 을 한 번에 세그멘테이션 (박스 크기로 복원된 마스크)
+        masks = infer_segmentation_on_crops(crops_rgb, seg_model, device=DEVICE)
+
+    binary_mask = np.zeros((image.shape[0], image.shape[1]), dtype=np.uint8)
+    for (x1, y1, x2, y2), mask_resized in zip(boxes, masks):
+        # 바이너리 마스크 통합
+        binary_mask[y1:y2, x1:x2][mask_resized == 1] = 255
+    result['seg'] = list(zip(boxes, masks))
+
+    with stage_timer.measure('instance'):
+        hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
 
         # ---------------- 인스턴스 마스크, 성숙도 분석 ----------------
         instance_mask = generate_instance_mask(binary_mask)
+        # 인스턴스는 (bounding box ROI, 오프셋) 으로만 다룸 (ROI 여유 = depth erosion 반경)
+        rois = {}
         instance_centers = []
-        for inst_id in np.unique(instance_mask):
-            if inst_id == 0:
-                continue
-            mask = (instance_mask == inst_id)
-            ys, xs = np.where(mask)
-            center_x = int(np.mean(xs))
-            center_y = int(np.mean(ys))
+        for inst_id, (sy, sx) in instance_rois(instance_mask, pad=DEPTH_EROSION_PADDING):
+            roi_mask = (instance_mask[sy, sx] == inst_id)
+            ys, xs = np.nonzero(roi_mask)
+            center_x = int(np.mean(xs + sx.start))
+            center_y = int(np.mean(ys + sy.start))
+            rois[inst_id] = (sy, sx, roi_mask)
             instance_centers.append((inst_id, center_x, center_y))
 
         instance_centers.sort(key=lambda x: x[1])
 
-        # 최초 1회에는 전체 숙성 딸기수 계산
-        if is_first == True:
-            for inst_id, cx, cy in instance_centers:
-                mask = (instance_mask == inst_id)
-                maturity = classify_strawberry_maturity(hsv_image, mask)
+    # 전체 인스턴스 숙성도 한 번에 분류
+    with stage_timer.measure('maturity'):
+        maturities = classify_strawberry_maturity_batch(hsv_image, instance_mask)
+
+    # 최초 1회에는 전체 숙성 딸기수 계산
+    if count_mature:
+        result['n_total'] = len(instance_centers)
+        result['n_mature'] = sum(1 for m in maturities.values() if m == 'fully_ripe')
+        if tracker is not None:
+            tracker.refresh(result['seg'], instance_centers, maturities, None)
+            result['tracks'] = tracker.current_tracks()
+        return result
+
+    # 수확 대상 (x 기준 첫 번째 fully_ripe, 이전 대상 트랙이 남아 있으면 우선)
+    prev_box = tracker.target_track_box() if tracker is not None else None
+    if prev_box is not None:
+        instance_centers.sort(key=lambda c: not (prev_box[0] <= c[1] < prev_box[2] and
+                                                 prev_box[1] <= c[2] < prev_box[3]))
+    for inst_id, cx, cy in instance_centers:
+        if maturities.get(inst_id) == 'fully_ripe':
+            target = build_target(frame, rois[inst_id], cx, cy)
+            if result['target'] is None:
+                result['target'] = target
+            if _TARGETS_CB is None:
+                break
+            result['targets'].append(target)
+
+    if tracker is not None:
+        tracker.refresh(result['seg'], instance_centers, maturities, result['target'], result['targets'])
+        result['tracks'] = tracker.current_tracks()
+    return result
 
-                if maturity == 'fully_ripe':
-                    n_mature += 1
 
-            # subprocess로 데이터 전송
-            send_data_to_subprocess(f"init_data", len(instance_centers), n_mature)
-            send_data_to_subprocess(f"init_log", len(instance_centers), n_mature)
-            is_first = False
-            continue
+# -------------------- 시각화 --------------------
+def render_result(result, fps, avg_fps):
+    """process_frame 결과를 원본 이미지 위에 그려서 반환"""
+    image = result['image']
 
-        # 수확 시작
-        for inst_id, cx, cy in instance_centers:
-            mask = (instance_mask == inst_id)
-            maturity = classify_strawberry_maturity(hsv_image, mask)
-            if maturity == 'fully_ripe':
-                tip, midpoint, picking_pts = extract_centerline_and_picking_points(mask.astype(np.uint8))
-                if tip is not None and midpoint is not None and len(picking_pts) == 2:
-                    angle = compute_angle(tip, midpoint)
-                    depth_value = get_mean_valid_depth_in_mask(depth_frame, mask.astype(np.uint8))
-                    
-                    if depth_value is not None:
-                        left_pt, right_pt = picking_pts
-                        left_xyz = pixel_to_meter(*left_pt, depth_value)
-                        right_xyz = pixel_to_meter(*right_pt, depth_value)
-
-                        # Center 픽셀 좌표 계산
-                        center_x = int((left_pt[0] + right_pt[0]) / 2)
-                        center_y = int((left_pt[1] + right_pt[1]) / 2)
-
-                        message = {
-                            "left": {"x": round(left_xyz[0], 3), "y": round(left_xyz[1], 3), "z": round(left_xyz[2], 3)},
-                            "right": {"x": round(right_xyz[0], 3), "y": round(right_xyz[1], 3), "z": round(right_xyz[2], 3)},
-                            "angle": round(angle, 2),
-                            "center_pixel": {"x": center_x, "y": center_y}
-                        }
-
-                        # ---- 정보 텍스트 (좌측 상단) ----
-                        text_y = 50
-                        cv2.putText(image, f"Angle: {message['angle']} deg", (10, text_y),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
-                        text_y += 25
-                        cv2.putText(image, f"Left (x:{message['left']['x']}, y:{message['left']['y']}, z:{message['left']['z']})",
-                                    (10, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
-                        text_y += 25
-                        cv2.putText(image, f"Right (x:{message['right']['x']}, y:{message['right']['y']}, z:{message['right']['z']})",
-                                    (10, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
-                        text_y += 25
-                        cv2.putText(image, f"Center pixel: ({center_x}, {center_y})", (10, text_y),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2, cv2.LINE_AA)  
-
-                        # 센터 점
-                        cv2.circle(image, (center_x, center_y), 6, (0, 255, 0), -1)
-                        cv2.putText(image, "Center", (center_x + 10, center_y - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-
-                        # 깊이 텍스트
-                        cv2.putText(image, f"{depth_value/10:.1f} cm", (cx, cy - 10),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-                    # 중심점 및 Ripe 표시 + 3D 좌표 오버레이
-                    di = angles_from_pixel(depth_frame=depth_frame, u=cx, v=cy)
-                    cv2.circle(image, (cx, cy), 4, (0, 0, 255), -1)
-                    cv2.putText(image, "Ripe", (cx + 10, cy),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-
-                    if di is not None:
-                        # 최신 di 저장 (키 '1' 입력 시 사용)
-                        _LAST_DI = di
-
-                        # --- 화면에 X/Y/Z + dist를 선명하게 표시 (검은 배경 + 흰 글씨) ---
-                        # 화면 밖으로 나가지 않도록 위치 보정
-                        tx = min(cx + 12, image.shape[1] - 160)
-                        ty = min(cy + 20, image.shape[0] - 10)
-                        put_text_bg(image, f"X={di['X']:.3f} m", (tx, ty))
-                        put_text_bg(image, f"Y={di['Y']:.3f} m", (tx, ty + 20))
-                        put_text_bg(image, f"Z={di['Z']:.3f} m", (tx, ty + 40))
-                        put_text_bg(image, f"d={di['distance_m']:.3f} m", (tx, ty + 60))
-                    
+    # ---------------- YOLO + Segmentation 시각화 ----------------
+    if not result['seg']:
+        # monitor 모드: box 만 표시
+        for (x1, y1, x2, y2) in result['boxes']:
+            cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+    for (x1, y1, x2, y2), mask_resized in result['seg']:
+        # 바운딩 박스 표시
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 0, 255), 2)
+
+        crop = image[y1:y2, x1:x2]
+        mask_overlay = np.zeros_like(crop)
+        mask_overlay[mask_resized == 1] = [0, 0, 255]  # 빨간색 마스크
+        blended = cv2.addWeighted(crop, 0.7, mask_overlay, 0.3, 0)
+        image[y1:y2, x1:x2] = blended
+
+    # 트랙 ID
+    for track_id, (x1, y1, x2, y2), maturity in result['tracks']:
+        cv2.putText(image, f"#{track_id}", (x1, max(12, y1 - 4)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 255, 255), 1, cv2.LINE_AA)
+
+    target = result['target']
+    if target is not None and target['has_axis']:
+        cx, cy = target['cx'], target['cy']
+        message = target['message']
+        if message is not None:
+            center_x = message['center_pixel']['x']
+            center_y = message['center_pixel']['y']
+
+            # ---- 정보 텍스트 (좌측 상단) ----
+            text_y = 50
+            cv2.putText(image, f"Angle: {message['angle']} deg", (10, text_y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2, cv2.LINE_AA)
+            text_y += 25
+            cv2.putText(image, f"Left (x:{message['left']['x']}, y:{message['left']['y']}, z:{message['left']['z']})",
+                        (10, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
+            text_y += 25
+            cv2.putText(image, f"Right (x:{message['right']['x']}, y:{message['right']['y']}, z:{message['right']['z']})",
+                        (10, text_y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2, cv2.LINE_AA)
+            text_y += 25
+            cv2.putText(image, f"Center pixel: ({center_x}, {center_y})", (10, text_y),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2, cv2.LINE_AA)
+
+            # 센터 점
+            cv2.circle(image, (center_x, center_y), 6, (0, 255, 0), -1)
+            cv2.putText(image, "Center", (center_x + 10, center_y - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+            # 깊이 텍스트
+            cv2.putText(image, f"{target['depth_value']/10:.1f} cm", (cx, cy - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+        # 중심점 및 Ripe 표시 + 3D 좌표 오버레이
+        cv2.circle(image, (cx, cy), 4, (0, 0, 255), -1)
+        cv2.putText(image, "Ripe", (cx + 10, cy),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+
+        di = target['di']
+        if di is not None:
+            # --- 화면에 X/Y/Z + dist를 선명하게 표시 (검은 배경 + 흰 글씨) ---
+            # 화면 밖으로 나가지 않도록 위치 보정
+            tx = min(cx + 12, image.shape[1] - 160)
+            ty = min(cy + 20, image.shape[0] - 10)
+            put_text_bg(image, f"X={di['X']:.3f} m", (tx, ty))
+            put_text_bg(image, f"Y={di['Y']:.3f} m", (tx, ty + 20))
+            put_text_bg(image, f"Z={di['Z']:.3f} m", (tx, ty + 40))
+            put_text_bg(image, f"d={di['distance_m']:.3f} m", (tx, ty + 60))
+
+    # ---------------- FPS / 스테이지 시간 표시 ----------------
+    cv2.putText(image, f"FPS: {fps:.2f} (avg {avg_fps:.2f})",
+                (10, image.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX,
+                0.6, (255, 255, 255), 2, cv2.LINE_AA)
+    cv2.putText(image, stage_timer.summary_text(['capture', 'infer', 'render']),
+                (10, image.shape[0] - 35), cv2.FONT_HERSHEY_SIMPLEX,
+                0.45, (255, 255, 255), 1, cv2.LINE_AA)
+    cv2.putText(image, f"mode: {scheduler.summary_text()}",
+                (10, image.shape[0] - 55), cv2.FONT_HERSHEY_SIMPLEX,
+                0.45, (255, 255, 255), 1, cv2.LINE_AA)
+    return image
+
+
+# -------------------- 스테이지 스레드 --------------------
+def capture_loop(frame_q, stop_event):
+    """capture 스테이지: 프레임 소스에서 정렬된 color/depth 수신"""
+    while not stop_event.is_set():
+        t0 = time.perf_counter()
+        frame = source.read()
+        if frame is None:
+            if source.eof:
+                frame_q.put(_END_OF_STREAM)
                 break
-        
-        # ---------------- FPS 계산 및 표시 ----------------
-        if start_time is None:
-            start_time = time.time()
-        frame_idx += 1
-        curr_time = time.time()
-        elapsed = curr_time - prev_time
-        fps = 1.0 / elapsed if elapsed > 0 else 0
-        prev_time = curr_time
-        total_frames += 1
-        total_elapsed = curr_time - start_time
-        avg_fps = total_frames / total_elapsed if total_elapsed > 0 else 0
-
-        cv2.putText(image, f"FPS: {fps:.2f} (avg {avg_fps:.2f})",
-                    (10, image.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6, (255, 255, 255), 2, cv2.LINE_AA)
-
-        # ---------------- 영상 표시 및 키 입력 ----------------
-        cv2.imshow("Strawberry Detection", image)
-        key = cv2.waitKey(1) & 0xFF
-
-
-        # ---------------- Indy7 제어 ----------------
-        if indy_mode == 2:
-            if _LAST_DI is not None:
-                if _DI_CB_2 is not None:
-                    try:
-                        _DI_CB_2(_LAST_DI, angle)
-                        n_harvest += 1
-                        send_data_to_subprocess("count")
-                    except Exception as e:
-                        print(f"[WARN] DI callback error: {e}")
-                else:
-                    d = _LAST_DI
-                    print(f"[Ripe XYZ] X={d.get('X', float('nan')):.3f} m, "
-                            f"Y={d.get('Y', float('nan')):.3f} m, "
-                            f"Z={d.get('Z', float('nan')):.3f} m "
-                            f"(dist={d.get('distance_m', float('nan')):.3f} m)")
-            else:
-                print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
+            continue
+        stage_timer.record('capture', (time.perf_counter() - t0) * 1000.0)
+        frame.host_time = time.monotonic()  # 로봇 정지 이후 촬영된 프레임인지 판단용
+        # 재생 소스(realtime=False)는 소비될 때까지 대기하므로 stop 여부를 주기적으로 확인
+        while not frame_q.put(frame, timeout=0.1):
+            if stop_event.is_set():
+                return
 
-            indy_mode = 1
 
-        if key == ord('q'):
+def inference_loop(frame_q, result_q, stop_event):
+    """inference 스테이지: 최신 프레임만 꺼내 추론 후 결과 큐로 전달"""
+    frame_idx = 0
+    is_first = True
+    while not stop_event.is_set():
+        frame = frame_q.get(timeout=0.1)
+        if frame is None:
+            continue
+        if frame is _END_OF_STREAM:
+            result_q.put(_END_OF_STREAM)
             break
-        elif key == ord('1'):
-            if _LAST_DI is not None:
-                if _DI_CB is not None:
+
+        # 로봇 동작 중에는 detector 만 N 프레임마다 실행
+        action = scheduler.next_action()
+        if scheduler.resumed and tracker is not None:
+            # 홈 복귀 후에는 시야가 바뀌었으므로 이전 트랙 캐시를 버림
+            tracker.reset()
+        if action == 'skip':
+            continue
+
+        try:
+            with stage_timer.measure('infer'):
+                result = process_frame(frame, frame_idx, count_mature=is_first,
+                                       detect_only=(action == 'detect'))
+        except Exception as e:
+            print(f"[WARN] inference error: {e}")
+            continue
+        frame_idx += 1
+
+        # 최초 1회에는 전체 숙성 딸기수 전송
+        if result['n_total'] is not None:
+            send_data_to_subprocess(f"init_data", result['n_total'], result['n_mature'])
+            send_data_to_subprocess(f"init_log", result['n_total'], result['n_mature'])
+            is_first = False
+
+        result_q.put(result)
+
+
+# -------------------- 메인 루프 (render / UI) --------------------
+def main(frame_source=None, headless=False, telemetry=True):
+    """
+    frame_source: frame_source.FrameSource (없으면 RealSense 카메라)
+    headless: True 면 창 표시/키 입력 없이 실행 (재생 벤치마크용)
+    telemetry: False 면 app.py(Firebase) subprocess 를 띄우지 않음
+    """
+    global _LAST_DI, _LAST_ANGLE, indy_mode, source, point_sender  # 함수 내에서 갱신하기 위해 global 선언
+
+    source = frame_source or create_frame_source()
+    source.start()
+    if telemetry:
+        start_subprocess()
+    if POINT_SOCKET:
+        host, port = POINT_SOCKET.rsplit(':', 1)
+        point_sender = SocketSender(host, int(port), codec=POINT_SOCKET_CODEC)
+        point_sender.connect()
+
+    # 재생 소스(realtime=False)는 모든 프레임을 처리하도록 capture 큐에서 drop 하지 않음
+    frame_q = LatestFrameQueue(CAPTURE_QUEUE_SIZE, drop=source.realtime)
+    result_q = LatestFrameQueue(RESULT_QUEUE_SIZE)
+    stop_event = threading.Event()
+    workers = [
+        threading.Thread(target=capture_loop, args=(frame_q, stop_event),
+                         name="capture", daemon=True),
+        threading.Thread(target=inference_loop, args=(frame_q, result_q, stop_event),
+                         name="inference", daemon=True),
+    ]
+
+    prev_time = time.time()
+    run_start = time.time()
+    start_time = None
+    total_frames = 0
+
+    print("[INFO] 실시간 딸기 탐지 시작... 'q' 종료, '1' 현재 Ripe XYZ 출력")
+    for w in workers:
+        w.start()
+
+    try:
+        while True:
+            # cv2.imshow / waitKey 는 메인 스레드에서만 호출
+            result = result_q.get(timeout=0.005)
+            if result is _END_OF_STREAM:
+                print("[INFO] 프레임 소스 종료")
+                break
+            if result is not None:
+                t0 = time.perf_counter()
+                target = result['target']
+                if target is not None and target['di'] is not None:
+                    # 최신 di 저장 (키 '1' 입력 시 사용)
+                    _LAST_DI = target['di']
+                    _LAST_ANGLE = target['angle']
+                if point_sender is not None and target is not None and target['message'] is not None:
+                    point_sender.send_data(target['message'])
+                # 캐시 재사용 프레임의 targets 는 이전 프레임(이동 전일 수 있음)의 카메라 좌표이므로
+                # host_time 으로 새 좌표처럼 보이지 않도록 실제로 다시 계산한 프레임에서만 전달
+                if _TARGETS_CB is not None and not result['detect_only'] and not result['reused']:
                     try:
-                        _DI_CB(_LAST_DI)
-                        indy_mode = 2
+                        _TARGETS_CB(result['targets'], result['host_time'])
                     except Exception as e:
-                        print(f"[WARN] DI callback error: {e}")
+                        print(f"[WARN] targets callback error: {e}")
+
+                # ---------------- FPS 계산 ----------------
+                if start_time is None:
+                    start_time = time.time()
+                curr_time = time.time()
+                elapsed = curr_time - prev_time
+                fps = 1.0 / elapsed if elapsed > 0 else 0
+                prev_time = curr_time
+                total_frames += 1
+                total_elapsed = curr_time - start_time
+                avg_fps = total_frames / total_elapsed if total_elapsed > 0 else 0
+
+                # ---------------- 영상 표시 ----------------
+                image = render_result(result, fps, avg_fps)
+                if not headless:
+                    cv2.imshow("Strawberry Detection", image)
+                stage_timer.record('render', (time.perf_counter() - t0) * 1000.0)
+
+            key = 0xFF if headless else cv2.waitKey(1) & 0xFF
+
+            # ---------------- Indy7 제어 ----------------
+            if result is not None and indy_mode == 2:
+                if _LAST_DI is not None:
+                    if _DI_CB_2 is not None:
+                        try:
+                            # 수확 수 전송은 픽킹 시퀀스에서 대상마다 report_harvest 로 처리
+                            _DI_CB_2(_LAST_DI, _LAST_ANGLE)
+                        except Exception as e:
+                            print(f"[WARN] DI callback error: {e}")
+                    else:
+                        print_last_di()
                 else:
-                    d = _LAST_DI
-                    print(f"[Ripe XYZ] X={d.get('X', float('nan')):.3f} m, "
-                          f"Y={d.get('Y', float('nan')):.3f} m, "
-                          f"Z={d.get('Z', float('nan')):.3f} m "
-                          f"(dist={d.get('distance_m', float('nan')):.3f} m)")
-            else:
-                print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
-
-    pipeline.stop()
-    send_data_to_subprocess("clear")
-    process.terminate()
-    cv2.destroyAllWindows()
+                    print("[INFO] 아직 Ripe 포인트가 감지되지 않았어.")
 
-if __name__ == '__main__':
-    main()
+                indy_mode = 1
 
+            if key == ord('q'):
+                break
+            elif key == ord('1'):
+                if trigger_di_callback():
+                    indy_mode = 2
+    finally:
+        stop_event.set()
+        for w in workers:
+            w.join(timeout=1.0)
+        run_elapsed = time.time() - run_start
+        print(f"[INFO] {total_frames} frames in {run_elapsed:.2f}s "
+              f"({total_frames / run_elapsed if run_elapsed > 0 else 0:.2f} fps)")
+        print(f"[INFO] stage timing: {stage_timer.summary_text()} "
+              f"(dropped: capture {frame_q.dropped}, result {result_q.dropped})")
+        if tracker is not None:
+            print(f"[INFO] tracking: refresh {tracker.n_refresh}, reuse {tracker.n_reuse}")
+        print(f"[INFO] scheduler: {scheduler.counters}")
+
+        source.stop()
+        if point_sender is not None:
+            point_sender.close()
+        send_data_to_subprocess("clear")
+        if channel is not None:
+            channel.close(timeout=5.0)
+            print(f"[INFO] telemetry: {channel.stats()}")
+        if process is not None:
+            # stdin 을 닫으면 app.py 가 남은 갱신을 기록하고 종료, 응답이 없을 때만 terminate
+            try:
+                process.stdin.close()
+                process.wait(timeout=10.0)
+            except (OSError, subprocess.TimeoutExpired):
+                process.terminate()
+        if not headless:
+            cv2.destroyAllWindows()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="실시간 딸기 탐지")
+    parser.add_argument('--replay', default=None, help="녹화 세션(.bag / .npz / 세션 디렉토리) 재생")
+    parser.add_argument('--realtime', action='store_true', help="재생 시 녹화 속도 유지 (기본: 가능한 빠르게)")
+    parser.add_argument('--headless', action='store_true', help="창 표시 없이 실행")
+    parser.add_argument('--no-telemetry', action='store_true', help="app.py(Firebase) subprocess 미사용")
+    args = parser.parse_args()
+
+    src = create_frame_source(args.replay, realtime=args.realtime) if args.replay else None
+    main(frame_source=src, headless=args.headless, telemetry=not args.no_telemetry)
@@ -15,6 +15,11 @@ LR         = 1e-3
 VAL_SPLIT  = 0.15
 THRESH     = 0.5
 ALPHA      = 0.5
+
+# ONNX / TensorRT export
+ONNX_OPSET     = 17
+SEG_OPT_BATCH  = 16   # TensorRT profile: 1 ~ SEG_MAX_BATCH, 최적화 기준 SEG_OPT_BATCH
+SEG_MAX_BATCH  = 32
 # Device
 import torch
 DEVICE = 'cuda' if torch.cuda.is_available() else 'cpu'
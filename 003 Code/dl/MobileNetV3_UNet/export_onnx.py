@@ -0,0 +1,113 @@
+"""
+segmentation 모델 ONNX export + PyTorch 대비 parity 확인
+
+    python -m dl.MobileNetV3_UNet.export_onnx \
+        --weights dl/MobileNetV3_UNet/checkpoints/best_model.pth \
+        --out dl/MobileNetV3_UNet/checkpoints/best_model.onnx
+
+export 된 .onnx 경로를 load_segmentation_model 에 넘기면 ONNX Runtime 백엔드가 선택됨
+"""
+import os
+import sys
+import glob
+import argparse
+import cv2
+import numpy as np
+import torch
+from .seg_infer import load_segmentation_model, infer_segmentation_on_crops, OnnxSegmentationModel
+from . import config
+
+
+def export_onnx(weight_path, onnx_path, opset=config.ONNX_OPSET):
+    """(batch, 3, IMG_SIZE, IMG_SIZE) 입력, batch 축만 dynamic 으로 export"""
+    model = load_segmentation_model(weight_path, backend='torch').cpu().eval()
+    dummy = torch.zeros(1, 3, config.IMG_SIZE, config.IMG_SIZE)
+    torch.onnx.export(
+        model, dummy, onnx_path,
+        input_names=['input'],
+        output_names=['mask'],
+        dynamic_axes={'input': {0: 'batch'}, 'mask': {0: 'batch'}},
+        opset_version=opset,
+        do_constant_folding=True,
+    )
+    print(f"[SEG] ONNX exported: {onnx_path}")
+    return onnx_path
+
+
+def _sample_crops(n, images_dir=None, seed=0):
+    """parity 확인용 crop: images_dir 의 실제 crop 이 있으면 사용, 없으면 랜덤 크기 노이즈"""
+    crops = []
+    if images_dir and os.path.isdir(images_dir):
+        paths = sorted(glob.glob(os.path.join(images_dir, '*.png')) +
+                       glob.glob(os.path.join(images_dir, '*.jpg')))[:n]
+        crops = [cv2.cvtColor(cv2.imread(p), cv2.COLOR_BGR2RGB) for p in paths]
+    rng = np.random.default_rng(seed)
+    while len(crops) < n:
+        h, w = rng.integers(20, 160, size=2)
+        crops.append(rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8))
+    return crops
+
+
+def check_parity(weight_path, onnx_path, n=16, precision='fp32', providers=None,
+                 images_dir=config.INFER_IMAGES_DIR, min_agreement=0.999, int8_calibration_table=None):
+    """
+    같은 crop 에 대해 PyTorch / ONNX 마스크 일치율 비교
+    providers 미지정 시 fp32 는 CPU EP, fp16/int8 은 TensorRT → CUDA → CPU 중 사용 가능한 것
+    fp16/int8 인데 TensorRT EP 가 활성화되지 않으면 (실제로는 fp32 로 실행되므로) RuntimeError
+    return: dict(agreement, max_abs_diff, passed, provider)
+    """
+    if providers is None and precision == 'fp32':
+        providers = ['CPUExecutionProvider']
+    crops = _sample_crops(n, images_dir)
+    torch_model = load_segmentation_model(weight_path, backend='torch').cpu().eval()
+    onnx_model = OnnxSegmentationModel(onnx_path, precision=precision, providers=providers,
+                                       int8_calibration_table=int8_calibration_table)
+    if not onnx_model.precision_applied:
+        raise RuntimeError(f"{precision} parity requires TensorrtExecutionProvider, "
+                           f"active provider is {onnx_model.provider} (precision not applied)")
+
+    # 확률값 비교
+    batch = np.stack([cv2.resize(c, (config.IMG_SIZE, config.IMG_SIZE)) for c in crops])
+    tensor = torch.from_numpy(batch).permute(0, 3, 1, 2).float().div_(255.0)
+    with torch.no_grad():
+        torch_prob = torch_model(tensor).numpy()
+    onnx_prob = onnx_model.run(tensor.numpy())
+    max_abs_diff = float(np.abs(torch_prob - onnx_prob).max())
+
+    # 최종 마스크 비교 (crop 크기로 복원된 결과)
+    torch_masks = infer_segmentation_on_crops(crops, torch_model, device='cpu')
+    onnx_masks = infer_segmentation_on_crops(crops, onnx_model)
+    same = sum(int((a == b).sum()) for a, b in zip(torch_masks, onnx_masks))
+    total = sum(a.size for a in torch_masks)
+    agreement = same / total
+
+    report = {'agreement': agreement, 'max_abs_diff': max_abs_diff,
+              'passed': agreement >= min_agreement, 'provider': onnx_model.provider}
+    print(f"[SEG] parity ({precision}, {onnx_model.provider}): mask agreement {agreement * 100:.3f}%, "
+          f"max |Δprob| {max_abs_diff:.2e} → {'OK' if report['passed'] else 'FAIL'}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="segmentation 모델 ONNX export")
+    parser.add_argument('--weights', default=os.path.join('dl', 'MobileNetV3_UNet', 'checkpoints', 'best_model.pth'))
+    parser.add_argument('--out', default=None, help="기본: weights 와 같은 경로의 .onnx")
+    parser.add_argument('--opset', type=int, default=config.ONNX_OPSET)
+    parser.add_argument('--precision', default='fp32', choices=['fp32', 'fp16', 'int8'],
+                        help="parity 확인 시 ONNX 백엔드 정밀도 (fp16/int8 은 TensorRT EP 필요)")
+    parser.add_argument('--provider', default=None,
+                        help="예: TensorrtExecutionProvider (기본: fp32 는 CPU, fp16/int8 은 TensorRT → CUDA → CPU)")
+    parser.add_argument('--calibration-table', default=None,
+                        help="int8 용 TensorRT calibration cache 파일 이름 (engine cache 디렉터리 기준)")
+    parser.add_argument('--skip-parity', action='store_true')
+    args = parser.parse_args()
+    if args.precision == 'int8' and not args.skip_parity and not args.calibration_table:
+        parser.error("--precision int8 requires --calibration-table")
+
+    out = args.out or os.path.splitext(args.weights)[0] + '.onnx'
+    export_onnx(args.weights, out, opset=args.opset)
+    if not args.skip_parity:
+        result = check_parity(args.weights, out, precision=args.precision,
+                              providers=[args.provider] if args.provider else None,
+                              int8_calibration_table=args.calibration_table)
+        sys.exit(0 if result['passed'] else 1)
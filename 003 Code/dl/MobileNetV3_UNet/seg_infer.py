@@ -2,19 +2,91 @@ import os
 import torch
 import cv2
 import numpy as np
-from torchvision import transforms
-from PIL import Image
 from .model import get_model
 from . import config
 
 
-def load_segmentation_model(weight_path=None):
+class OnnxSegmentationModel:
+    """
+    ONNX Runtime segmentation 백엔드 (export_onnx.py 로 내보낸 모델, 입력 (N, 3, IMG_SIZE, IMG_SIZE))
+    - providers 미지정 시 TensorRT EP(Jetson) → CUDA EP → CPU EP 중 사용 가능한 것 사용
+    - precision: 'fp32' | 'fp16' | 'int8' (fp16/int8 은 TensorRT EP 에서만 적용, 다른 EP 면 fp32 로 실행되고
+      precision_applied 가 False), int8 은 calibration table 필요
+    - TensorRT 는 batch 1 ~ SEG_MAX_BATCH 고정 profile 로 엔진을 한 번만 빌드 (engine cache)
+    """
+    def __init__(self, onnx_path, precision='fp32', providers=None,
+                 max_batch=config.SEG_MAX_BATCH, opt_batch=config.SEG_OPT_BATCH,
+                 trt_cache_dir=None, int8_calibration_table=None):
+        import onnxruntime as ort
+
+        if precision not in ('fp32', 'fp16', 'int8'):
+            raise ValueError(f"Unknown precision: {precision}")
+        if precision == 'int8' and not int8_calibration_table:
+            raise ValueError("int8 precision requires int8_calibration_table (TensorRT calibration cache)")
+        self.onnx_path = onnx_path
+        self.precision = precision
+        self.max_batch = max_batch
+        self.input_name = 'input'
+
+        available = ort.get_available_providers()
+        if providers is None:
+            providers = [p for p in ('TensorrtExecutionProvider', 'CUDAExecutionProvider', 'CPUExecutionProvider')
+                         if p in available]
+
+        size = config.IMG_SIZE
+        provider_list = []
+        for p in providers:
+            if p == 'TensorrtExecutionProvider':
+                trt_options = {
+                    'trt_fp16_enable': precision in ('fp16', 'int8'),
+                    'trt_int8_enable': precision == 'int8',
+                    'trt_engine_cache_enable': True,
+                    'trt_engine_cache_path': trt_cache_dir or os.path.dirname(os.path.abspath(onnx_path)),
+                    'trt_profile_min_shapes': f'{self.input_name}:1x3x{size}x{size}',
+                    'trt_profile_opt_shapes': f'{self.input_name}:{opt_batch}x3x{size}x{size}',
+                    'trt_profile_max_shapes': f'{self.input_name}:{max_batch}x3x{size}x{size}',
+                }
+                if precision == 'int8':
+                    trt_options['trt_int8_calibration_table_name'] = int8_calibration_table
+                provider_list.append((p, trt_options))
+            else:
+                provider_list.append(p)
+
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, sess_options, providers=provider_list)
+        self.input_name = self.session.get_inputs()[0].name
+        self.provider = self.session.get_providers()[0]
+        self.precision_applied = precision == 'fp32' or self.provider == 'TensorrtExecutionProvider'
+        if self.precision_applied:
+            print(f"[SEG] ONNX backend: {self.provider} ({precision})")
+        else:
+            print(f"[SEG] ONNX backend: {self.provider} (fp32, {precision} requested but precision not applied: "
+                  f"TensorRT EP not active)")
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        """batch: (N, 3, IMG_SIZE, IMG_SIZE) float32 [0, 1] → (N, 1, IMG_SIZE, IMG_SIZE) 확률"""
+        outputs = []
+        for i in range(0, len(batch), self.max_batch):
+            chunk = np.ascontiguousarray(batch[i:i + self.max_batch], dtype=np.float32)
+            outputs.append(self.session.run(None, {self.input_name: chunk})[0])
+        return np.concatenate(outputs, axis=0)
+
+
+def load_segmentation_model(weight_path=None, backend=None, precision='fp32', int8_calibration_table=None):
     """
     segmentation 모델 로드 및 준비
+    backend: 'torch' | 'onnx' (None 이면 weight_path 확장자로 결정: .onnx → ONNX Runtime)
+    precision: ONNX 백엔드 정밀도 ('fp32' | 'fp16' | 'int8', int8 은 int8_calibration_table 필요)
     """
+    weight_path = weight_path or os.path.join('models', 'MobileNetV3_UNet', 'checkpoints', 'best_model.pth')
+    backend = backend or ('onnx' if weight_path.endswith('.onnx') else 'torch')
+    if backend == 'onnx':
+        return OnnxSegmentationModel(weight_path, precision=precision,
+                                     int8_calibration_table=int8_calibration_table)
+
     model = get_model()
     device = config.DEVICE
-    weight_path = weight_path or os.path.join('models', 'MobileNetV3_UNet', 'checkpoints', 'best_model.pth')
     state = torch.load(weight_path, map_location=device)
     model.load_state_dict(state)
     model.to(device)
@@ -22,10 +94,27 @@ def load_segmentation_model(weight_path=None):
     return model
 
 
+def _predict_batch(batch: np.ndarray, model, device) -> np.ndarray:
+    """
+    batch: (N, IMG_SIZE, IMG_SIZE, 3) uint8 RGB
+    return: (N, IMG_SIZE, IMG_SIZE) 이진 마스크 (uint8, 0 또는 1)
+    """
+    if isinstance(model, OnnxSegmentationModel):
+        # ToTensor 와 동일한 정규화: HWC uint8 → CHW float [0, 1]
+        tensor = batch.transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        pred_masks = model.run(tensor)[:, 0]
+        return (pred_masks > config.THRESH).astype(np.uint8)
+
+    tensor = torch.from_numpy(batch).to(device).permute(0, 3, 1, 2).float().div_(255.0)
+    with torch.no_grad():
+        pred_masks = model(tensor)[:, 0]
+        return (pred_masks > config.THRESH).to(torch.uint8).cpu().numpy()
+
+
 def infer_segmentation_on_crop(crop_image: np.ndarray, model, device=None):
     """
     crop_image: np.ndarray (H, W, 3) RGB 이미지
-    model: segmentation 모델 (UNet)
+    model: segmentation 모델 (UNet 또는 OnnxSegmentationModel)
     return: 이진 마스크 (np.ndarray, shape = (IMG_SIZE, IMG_SIZE), 값: 0 또는 1)
     """
     if crop_image is None or crop_image.ndim != 3:
@@ -33,13 +122,36 @@ def infer_segmentation_on_crop(crop_image: np.ndarray, model, device=None):
 
     device = device or config.DEVICE
     img_resized = cv2.resize(crop_image, (config.IMG_SIZE, config.IMG_SIZE))
-    tensor = transforms.ToTensor()(Image.fromarray(img_resized)).unsqueeze(0).to(device)
+    return _predict_batch(img_resized[np.newaxis], model, device)[0]
 
-    with torch.no_grad():
-        pred_mask = model(tensor)[0, 0].cpu().numpy()
-        binary_mask = (pred_mask > config.THRESH).astype(np.uint8)
 
-    return binary_mask
+def infer_segmentation_on_crops(crop_images, model, device=None):
+    """
+    한 프레임의 crop 전체를 한 번의 forward 로 추론
+    crop_images: list[np.ndarray] (H_i, W_i, 3) RGB 이미지 리스트
+    model: segmentation 모델 (UNet 또는 OnnxSegmentationModel)
+    return: 이진 마스크 리스트 (각 crop 크기 (H_i, W_i) 로 복원됨, 값: 0 또는 1)
+    """
+    if len(crop_images) == 0:
+        return []
+    for crop_image in crop_images:
+        if crop_image is None or crop_image.ndim != 3:
+            raise ValueError("Invalid crop image provided.")
+
+    device = device or config.DEVICE
+    size = config.IMG_SIZE
+
+    # (N, IMG_SIZE, IMG_SIZE, 3) uint8
+    batch = np.empty((len(crop_images), size, size, 3), dtype=np.uint8)
+    for i, crop_image in enumerate(crop_images):
+        batch[i] = cv2.resize(crop_image, (size, size))
+    binary_masks = _predict_batch(batch, model, device)
+
+    masks = []
+    for crop_image, binary_mask in zip(crop_images, binary_masks):
+        h, w = crop_image.shape[:2]
+        masks.append(cv2.resize(binary_mask, (w, h), interpolation=cv2.INTER_NEAREST))
+    return masks
 
 
 def overlay_mask(crop_image: np.ndarray, mask: np.ndarray, alpha=0.5):
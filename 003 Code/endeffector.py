@@ -11,6 +11,19 @@ End Effector (OpenCR + Dynamixel) Controller
     eff.rotate_for(seconds=4.0, direction=+1, speed=100)  # 정방향 4초
     eff.shutdown()
 
+- 비동기 제어 (호출 스레드를 막지 않음, 동작은 전용 스레드에서 FIFO 순서로 실행):
+    act = eff.rotate_for_async(seconds=2.0, direction=+1, on_done=lambda a: print("opened"))
+    ...                                                    # 그 사이 로봇 이동 등
+    act.result()                                           # 완료 대기 (act.stop() 으로 조기 정지)
+    eff.move_to_async(100.0).result(timeout=5.0)           # 위치 이동 (도달 시 True)
+
+- 피드백 그립 (고정 시간 대신 위치/전류로 stall 감지 시 정지):
+    res = eff.grip_async(direction=-1, timeout_s=3.5).result()   # {'reason', 'elapsed_s', 'travel_deg'}
+    eff.grip_async(direction=+1, travel_deg=res['travel_deg'])    # 닫은 만큼만 다시 열기
+
+- 모드/토크 상태 캐시: 이미 같은 모드 + 토크 ON 이면 전환(torqueOff → setOperatingMode → torqueOn) 생략
+    eff.transaction_stats()   # {'sent': n, 'skipped': m, 'by_method': {...}}
+
 - 인터랙티브 모드(단독 실행 시):
     python3 endeffector.py
     키보드:
@@ -24,14 +37,44 @@ End Effector (OpenCR + Dynamixel) Controller
 import sys
 import os
 import time
+import queue
 import termios
 import tty
 import select
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+import metrics
 sys.path.append('/home/dfx')
-from opencr.opencr_firmware.libraries.peripheral._opencr import OpenCRSerial
+try:
+    from opencr.opencr_firmware.libraries.peripheral._opencr import OpenCRSerial
+except ImportError:  # 시뮬레이터(opencr_sim.SimOpenCR)만 사용하는 환경
+    OpenCRSerial = None
+
+
+class EffectorAction(Future):
+    """
+    비동기 엔드이펙터 동작 핸들 (concurrent.futures.Future)
+    stop(): 대기 중이면 취소, 실행 중이면 조기 종료 요청 (모터는 정지 처리 후 완료)
+    """
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+        self.cancel()
 
 
 class MotorControl:
+    # 위치 값 0~1023 ↔ 0~200도 (사용자 코드 기준 맵핑)
+    POSITION_RANGE_DEG = 200.0
+    POSITION_MAX = 1023.0
+    VELOCITY_MODE = 1
+    POSITION_MODE = 3
+
     def __init__(
         self,
         center_motor_id: int = 16,
@@ -39,6 +82,7 @@ class MotorControl:
         baud_rate: int = 57600,
         serial_timeout: float = 1.0,
         device_address: int = 0xF0,
+        shared_opencr=None,
     ):
         """
         :param center_motor_id: 센터 모터 ID
@@ -46,6 +90,7 @@ class MotorControl:
         :param baud_rate: 시리얼 보드레이트
         :param serial_timeout: 시리얼 타임아웃(초)
         :param device_address: OpenCR 장치 주소
+        :param shared_opencr: 공유 OpenCR 연결 (opencr_bus.OpenCRBus.view), 주어지면 포트 probe 생략
         """
         if possible_device_ports is None:
             possible_device_ports = ['/dev/ttyACM0', '/dev/ttyACM1']
@@ -56,11 +101,32 @@ class MotorControl:
         self.baud_rate = baud_rate
         self.serial_timeout = serial_timeout
         self.device_address = device_address
-        self.opencr_serial: OpenCRSerial = None
+        self.opencr_serial: OpenCRSerial = shared_opencr
+        self._owns_opencr = shared_opencr is None
 
         # 현재 모터 각도(도 단위), 0~200도 맵핑 가정(사용자 코드 기준)
         self.center_position = 0.0
 
+        # 현재 전류 읽기 지원 여부 (OpenCR 펌웨어에 없으면 위치 기반 stall 만 사용)
+        self._has_current = True
+        # stall 후 과부하 보호 확인에 쓸 상태 읽기 (펌웨어에 없는 것은 첫 시도 때 제외)
+        self._status_methods = ['dxl_getTorqueEnable', 'dxl_getHardwareErrorStatus']
+
+        # 서보 상태 캐시 (None: 모름 → 다음 전환은 생략하지 않음)
+        self._mode = None
+        self._torque = None
+
+        # 시리얼 트랜잭션 카운터 (메서드별 전송 수, 캐시로 생략한 수)
+        self._stats_lock = threading.Lock()
+        self.transactions = {}
+        self.skipped_transactions = 0
+
+        # 비동기 동작 큐 (첫 *_async 호출 시 작업 스레드 시작)
+        self._actions = queue.Queue()
+        self._action_thread = None
+        self._action_lock = threading.Lock()
+        self._current_action = None
+
         # 연결 & 초기화
         self.connect()
         self.initialize_current_position()
@@ -68,6 +134,11 @@ class MotorControl:
     # ------------------------- 연결/초기화 -------------------------
 
     def connect(self):
+        if not self._owns_opencr:
+            print("[OpenCR] Using shared OpenCR connection")
+            self._init_motor()
+            return True
+
         for device_port in self.possible_device_ports:
             try:
                 self.opencr_serial = OpenCRSerial(
@@ -79,12 +150,7 @@ class MotorControl:
                 self.connected_device_port = device_port
                 print(f"[OpenCR] Connected to {device_port}")
 
-                # 모터 초기화 (사용자 코드 기준: 200도 범위, 프로토콜 0)
-                self.opencr_serial.dxl_init(self.CENTER_MOTOR_ID, 200, 0)
-
-                # 기본은 토크 온 + 포지션 모드로 시작
-                self._set_position_mode()
-                print("[OpenCR] Center motor initialized (Position mode, torque ON)")
+                self._init_motor()
                 return True
 
             except Exception as connection_error:
@@ -93,9 +159,19 @@ class MotorControl:
 
         raise RuntimeError("[OpenCR] No available /dev/ttyACM* device found.")
 
+    def _init_motor(self):
+        # 모터 초기화 (사용자 코드 기준: 200도 범위, 프로토콜 0)
+        self._dxl('dxl_init', 200, 0)
+        self._mode = None
+        self._torque = None
+
+        # 기본은 토크 온 + 포지션 모드로 시작
+        self._set_position_mode()
+        print("[OpenCR] Center motor initialized (Position mode, torque ON)")
+
     def initialize_current_position(self):
         try:
-            center_pos = self.opencr_serial.dxl_getPresentPositionData(self.CENTER_MOTOR_ID)
+            center_pos = self._dxl('dxl_getPresentPositionData')
             # 사용자 코드 기준: 0~1023 -> 0~200도
             self.center_position = float(center_pos) * 200.0 / 1023.0
             print(f"[OpenCR] Initialized center position: {self.center_position:.1f}°")
@@ -106,70 +182,383 @@ class MotorControl:
 
     # ------------------------- 내부 유틸 -------------------------
 
+    def _count(self, method, n=1):
+        with self._stats_lock:
+            self.transactions[method] = self.transactions.get(method, 0) + n
+
+    def _dxl(self, method, *args):
+        """센터 모터 대상 트랜잭션 1회 (카운트 포함)"""
+        self._count(method)
+        try:
+            return getattr(self.opencr_serial, method)(self.CENTER_MOTOR_ID, *args)
+        except Exception as e:
+            # 쓰기 중 통신/하드웨어 오류면 모터 상태를 알 수 없으므로 다음 전환은 전체 실행
+            # (읽기 실패, 펌웨어에 없는 호출은 모터 상태를 바꾸지 않음)
+            if not method.startswith('dxl_get') and self._may_change_state(e):
+                self._invalidate_mode_cache()
+            raise
+
+    @staticmethod
+    def _may_change_state(error):
+        """이 예외 후 모터 mode/torque 가 캐시와 달라졌을 수 있는지 (지원하지 않는 호출이면 아무것도 보내지 않았음)"""
+        return not isinstance(error, (AttributeError, NotImplementedError))
+
+    def _invalidate_mode_cache(self):
+        """
+        캐시된 mode/torque 무효화
+        과부하(overload) 등 하드웨어 오류 shutdown 은 모터가 스스로 토크를 끄므로
+        캐시만 보고 torqueOn 을 생략하면 그리퍼가 움직이지 않음
+        """
+        self._mode = None
+        self._torque = None
+
+    def _write_batch(self, calls):
+        """
+        레지스터 쓰기 여러 개를 연속 실행
+        공유 버스(OpenCRView)면 요청 하나로 묶어 다른 view(ToF 등)의 트랜잭션이 중간에 끼지 않게 함
+        """
+        for method, *_ in calls:
+            self._count(method)
+        batch = getattr(self.opencr_serial, 'batch', None)
+        if callable(batch):
+            return batch([(method, (self.CENTER_MOTOR_ID, *args)) for method, *args in calls])
+        return [getattr(self.opencr_serial, method)(self.CENTER_MOTOR_ID, *args) for method, *args in calls]
+
+    def _set_mode(self, mode):
+        """
+        operating mode 전환 + 토크 ON, 캐시된 상태와 같으면 생략
+        모드 변경은 토크 OFF 상태에서만 가능하므로 필요한 경우에만 torqueOff 를 보냄
+        """
+        calls = []
+        if self._mode != mode:
+            if self._torque is not False:
+                calls.append(('dxl_torqueOff',))
+            calls.append(('dxl_setOperatingMode', mode))
+        if self._mode != mode or self._torque is not True:
+            calls.append(('dxl_torqueOn',))
+        with self._stats_lock:
+            self.skipped_transactions += 3 - len(calls)
+        if not calls:
+            return
+        try:
+            self._write_batch(calls)
+        except Exception as e:
+            # 어디까지 적용됐는지 모르므로 다음 전환은 전체 실행
+            if self._may_change_state(e):
+                self._invalidate_mode_cache()
+            raise
+        self._mode = mode
+        self._torque = True
+
     def _set_velocity_mode(self):
         """Velocity 모드(1)로 전환"""
-        self.opencr_serial.dxl_torqueOff(self.CENTER_MOTOR_ID)
-        self.opencr_serial.dxl_setOperatingMode(self.CENTER_MOTOR_ID, 1)
-        self.opencr_serial.dxl_torqueOn(self.CENTER_MOTOR_ID)
+        self._set_mode(self.VELOCITY_MODE)
 
     def _set_position_mode(self):
         """Position 모드(3)로 전환"""
-        self.opencr_serial.dxl_torqueOff(self.CENTER_MOTOR_ID)
-        self.opencr_serial.dxl_setOperatingMode(self.CENTER_MOTOR_ID, 3)
-        self.opencr_serial.dxl_torqueOn(self.CENTER_MOTOR_ID)
+        self._set_mode(self.POSITION_MODE)
+
+    def transaction_count(self, method=None):
+        """보낸 시리얼 트랜잭션 수 (method 지정 시 해당 메서드만)"""
+        with self._stats_lock:
+            if method is None:
+                return sum(self.transactions.values())
+            return self.transactions.get(method, 0)
+
+    def transaction_stats(self):
+        with self._stats_lock:
+            return {'sent': sum(self.transactions.values()),
+                    'skipped': self.skipped_transactions,
+                    'by_method': dict(self.transactions)}
+
+    # ------------------------- 비동기 동작 큐 -------------------------
+
+    def _submit(self, name, func, *args, on_done=None):
+        """func(stop_event, *args) 를 작업 스레드에서 실행하고 EffectorAction 반환"""
+        action = EffectorAction(name)
+        if on_done is not None:
+            action.add_done_callback(on_done)
+        with self._action_lock:
+            if self._action_thread is None:
+                self._action_thread = threading.Thread(target=self._action_loop, name="effector", daemon=True)
+                self._action_thread.start()
+        self._actions.put((action, func, args))
+        return action
+
+    def _action_loop(self):
+        while True:
+            item = self._actions.get()
+            if item is None:
+                break
+            action, func, args = item
+            if not action.set_running_or_notify_cancel():
+                continue
+            self._current_action = action
+            try:
+                action.set_result(func(action.stop_event, *args))
+            except Exception as e:
+                action.set_exception(e)
+            finally:
+                self._current_action = None
+
+    def _on_action_thread(self):
+        return threading.current_thread() is self._action_thread
+
+    def _run_blocking(self, name, func, *args):
+        """
+        동작을 큐에 넣고 완료까지 대기
+        작업 스레드 안(on_done 콜백 등)에서 호출되면 자기 자신을 기다리게 되므로(deadlock) 큐를 거치지 않고 바로 실행
+        """
+        if self._on_action_thread():
+            action = self._current_action
+            stop_event = action.stop_event if action is not None else threading.Event()
+            return func(stop_event, *args)
+        return self._submit(name, func, *args).result()
+
+    def wait_idle(self, timeout=None):
+        """지금까지 요청된 동작이 모두 끝날 때까지 대기"""
+        if self._on_action_thread():
+            raise RuntimeError("wait_idle() cannot be called from the effector action thread (on_done callback)")
+        return self._submit("barrier", lambda stop_event: None).result(timeout)
+
+    def cancel_all(self):
+        """대기 중인 동작 취소 + 실행 중인 동작 조기 종료"""
+        while True:
+            try:
+                item = self._actions.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        action = self._current_action
+        if action is not None:
+            action.stop()
 
     # ------------------------- 프로그래매틱 제어 API -------------------------
 
+    def _rotate(self, stop_event, seconds, direction, speed, restore_mode):
+        seconds = max(0.0, float(seconds))
+        direction = 1 if direction >= 0 else -1
+        speed_val = int(abs(speed)) * direction
+
+        with metrics.span('rotate', direction=direction, seconds=seconds) as sp:
+            try:
+                self._set_velocity_mode()
+                print(f"[EE] Rotate {('CW' if direction>0 else 'CCW')} for {seconds:.2f}s @ {abs(speed)}")
+                self._dxl('dxl_goalVelocity', speed_val)
+                stop_event.wait(seconds)  # stop() 시 조기 종료
+            finally:
+                # 반드시 정지
+                self._dxl('dxl_goalVelocity', 0)
+                if restore_mode:
+                    self._set_position_mode()
+                print("[EE] Rotation stopped")
+            sp.set(completed=not stop_event.is_set())
+        return not stop_event.is_set()
+
+    def rotate_for_async(self, seconds: float, direction: int = 1, speed: int = 100,
+                         restore_mode: bool = True, on_done=None) -> EffectorAction:
+        """
+        rotate_for 를 작업 스레드에서 실행하고 바로 반환
+        :param on_done: 완료 콜백 (인자: EffectorAction), 작업 스레드에서 호출됨
+        :return: EffectorAction, result() 는 지정 시간을 채웠으면 True, stop() 으로 중단되면 False
+        """
+        return self._submit("rotate", self._rotate, seconds, direction, speed, restore_mode, on_done=on_done)
+
+    def _read_position_deg(self):
+        pos = self._dxl('dxl_getPresentPositionData')
+        return float(pos) * self.POSITION_RANGE_DEG / self.POSITION_MAX
+
+    def _read_current(self):
+        if not self._has_current:
+            return None
+        try:
+            return self._dxl('dxl_getPresentCurrentData')
+        except AttributeError:
+            print("[EE] Present current not available, using position-based stall detection")
+            self._has_current = False
+            return None
+
+    def _torque_tripped(self):
+        """
+        stall 후 1회: 과부하 보호로 토크가 꺼졌는지 (torque enable 0 또는 hardware error 비트)
+        확인할 수 없으면 None
+        """
+        for method in list(self._status_methods):
+            try:
+                value = self._dxl(method)
+            except AttributeError:
+                self._status_methods.remove(method)
+                continue
+            except Exception as e:
+                print(f"[EE] Servo status read failed: {e}")
+                return None
+            return not value if method == 'dxl_getTorqueEnable' else bool(value)
+        return None
+
+    def _grip(self, stop_event, direction, speed, timeout_s, travel_deg, stall_current,
+              stall_window_s, stall_deg, min_time_s, poll_s, restore_mode):
+        direction = 1 if direction >= 0 else -1
+        half_range = self.POSITION_RANGE_DEG / 2.0
+        t0 = time.monotonic()
+        travel = 0.0
+        reason = 'stopped'
+
+        with metrics.span('grip', direction=direction, restore_mode=restore_mode) as sp:
+            try:
+                self._set_velocity_mode()
+                self._dxl('dxl_goalVelocity', int(abs(speed)) * direction)
+                prev = self._read_position_deg()
+                window = deque([(t0, 0.0)])   # (시각, 누적 회전량), window[0] 은 stall_window_s 이전 샘플
+                n_over_current = 0
+                while not stop_event.wait(poll_s):
+                    now = time.monotonic()
+                    elapsed = now - t0
+                    pos = self._read_position_deg()
+                    # 0~200도 wrap 보정 후 명령 방향 기준 회전량 누적
+                    step = (pos - prev + half_range) % self.POSITION_RANGE_DEG - half_range
+                    prev = pos
+                    travel += step * direction
+                    window.append((now, travel))
+                    while len(window) > 1 and window[1][0] <= now - stall_window_s:
+                        window.popleft()
+
+                    if travel_deg is not None and travel >= travel_deg:
+                        reason = 'target'
+                        break
+                    if elapsed >= min_time_s:
+                        current = self._read_current() if stall_current is not None else None
+                        over = current is not None and abs(current) >= stall_current
+                        n_over_current = n_over_current + 1 if over else 0
+                        if n_over_current >= 2:
+                            reason = 'stall'
+                            break
+                        if now - window[0][0] >= stall_window_s and travel - window[0][1] < stall_deg:
+                            reason = 'stall'
+                            break
+                    if elapsed >= timeout_s:
+                        reason = 'timeout'
+                        break
+            finally:
+                self._dxl('dxl_goalVelocity', 0)
+                if reason in ('stall', 'timeout'):
+                    # 일부러 stall 시킨 경우: 과부하 보호로 토크가 꺼졌으면(또는 확인 불가) 다음 전환 때 다시 켬
+                    tripped = self._torque_tripped()
+                    if tripped is not False:
+                        self._invalidate_mode_cache()
+                    if tripped:
+                        print("[EE] Servo overload protection tripped, torque will be re-enabled")
+                        metrics.count('servo_overload')
+                if restore_mode:
+                    self._set_position_mode()
+            sp.set(reason=reason, travel_deg=round(travel, 1))
+        metrics.count(f'grip_{reason}')
+
+        result = {'reason': reason, 'elapsed_s': time.monotonic() - t0, 'travel_deg': travel}
+        print(f"[EE] Grip {('CW' if direction>0 else 'CCW')}: {reason} after {result['elapsed_s']:.2f}s "
+              f"({travel:.0f}°)")
+        return result
+
+    def grip_async(self, direction: int = -1, speed: int = 100, timeout_s: float = 3.5,
+                   travel_deg: float = None, stall_current: int = 300,
+                   stall_window_s: float = 0.15, stall_deg: float = 1.0, min_time_s: float = 0.2,
+                   poll_s: float = 0.02, restore_mode: bool = False, on_done=None) -> EffectorAction:
+        """
+        피드백 회전: 위치/전류를 poll 하면서 회전하다가 아래 조건 중 하나에서 정지
+          - travel_deg 만큼 회전 (목표 위치 도달)
+          - stall: 전류가 stall_current 이상 (2회 연속) 또는 stall_window_s 동안 회전량 < stall_deg
+          - timeout_s 초과
+        min_time_s 동안은 가속 구간으로 보고 stall 판정을 하지 않음
+        :return: EffectorAction, result() = {'reason': 'target'|'stall'|'timeout'|'stopped',
+                                             'elapsed_s': float, 'travel_deg': float}
+        """
+        return self._submit("grip", self._grip, direction, speed, timeout_s, travel_deg, stall_current,
+                            stall_window_s, stall_deg, min_time_s, poll_s, restore_mode, on_done=on_done)
+
     def rotate_for(self, seconds: float, direction: int = 1, speed: int = 100, restore_mode: bool = True):
         """
-        지정 시간(seconds) 동안 연속 회전 후 정지.
+        지정 시간(seconds) 동안 연속 회전 후 정지 (완료까지 블로킹).
         :param seconds: 회전 시간(초)
         :param direction: 1(정방향), -1(역방향)
         :param speed: 목표 속도(라이브러리 단위)
         :param restore_mode: True면 종료 후 Position 모드로 복원
+        on_done 콜백 안에서 호출하면 작업 스레드에서 바로 실행
         """
-        seconds = max(0.0, float(seconds))
-        direction = 1 if direction >= 0 else -1
-        speed_val = int(abs(speed)) * direction
-
-        try:
-            self._set_velocity_mode()
-            print(f"[EE] Rotate {('CW' if direction>0 else 'CCW')} for {seconds:.2f}s @ {abs(speed)}")
-            self.opencr_serial.dxl_goalVelocity(self.CENTER_MOTOR_ID, speed_val)
-            time.sleep(seconds)
-        finally:
-            # 반드시 정지
-            self.opencr_serial.dxl_goalVelocity(self.CENTER_MOTOR_ID, 0)
-            if restore_mode:
-                self._set_position_mode()
-            print("[EE] Rotation stopped")
+        return self._run_blocking("rotate", self._rotate, seconds, direction, speed, restore_mode)
+
+    def _move_to(self, stop_event, target_angle, tolerance_deg, timeout_s, poll_s):
+        position_value = int(float(target_angle) * 1023.0 / 200.0)  # 0~200도 맵핑 가정
+        self._set_position_mode()
+        self._dxl('dxl_goalPosition', position_value)
+        print(f"[EE] Move to {target_angle:.1f}°")
+
+        deadline = time.monotonic() + timeout_s
+        while not stop_event.is_set():
+            pos = self._dxl('dxl_getPresentPositionData')
+            self.center_position = float(pos) * 200.0 / 1023.0
+            if abs(self.center_position - target_angle) <= tolerance_deg:
+                return True
+            if time.monotonic() >= deadline:
+                print(f"[EE] Move timeout at {self.center_position:.1f}°")
+                return False
+            stop_event.wait(poll_s)
+        return False
+
+    def move_to_async(self, target_angle: float, tolerance_deg: float = 2.0, timeout_s: float = 3.0,
+                      poll_s: float = 0.02, on_done=None) -> EffectorAction:
+        """
+        Position 모드로 target_angle(도) 이동, 현재 위치를 poll 해서 도달 여부 확인
+        :return: EffectorAction, result() 는 tolerance 안에 도달하면 True, 시간 초과/중단 시 False
+        """
+        return self._submit("move_to", self._move_to, target_angle, tolerance_deg, timeout_s, poll_s,
+                            on_done=on_done)
 
     def stop(self):
         try:
-            self.opencr_serial.dxl_goalVelocity(self.CENTER_MOTOR_ID, 0)
+            self._dxl('dxl_goalVelocity', 0)
             print("[EE] Stop command sent")
         except Exception as e:
             print(f"[EE] Stop error: {e}")
 
     def shutdown(self):
+        self.cancel_all()
+        if self._action_thread is not None:
+            self._actions.put(None)
+            self._action_thread.join(timeout=2.0)
+            self._action_thread = None
         try:
             self.stop()
         finally:
             try:
-                self.opencr_serial.dxl_torqueOff(self.CENTER_MOTOR_ID)
+                self._dxl('dxl_torqueOff')
+                self._torque = False
                 print("[OpenCR] Torque OFF")
             except Exception:
                 pass
 
     # ------------------------- 인터랙티브(옵션) -------------------------
 
+    # 모드/토크 캐시를 공유하므로 인터랙티브 명령도 작업 스레드에서 순서대로 실행
+
+    def _start_rotation(self, stop_event, direction, speed):
+        self._set_velocity_mode()
+        self._dxl('dxl_goalVelocity', int(speed) * direction)
+
+    def _stop_rotation(self, stop_event):
+        self._dxl('dxl_goalVelocity', 0)
+        stop_event.wait(0.3)
+        self._set_position_mode()
+
+    def _reset(self, stop_event, position_value):
+        self._set_position_mode()
+        self._dxl('dxl_goalPosition', position_value)
+
     def start_center_motor_rotation(self, direction: int = 1, speed: int = 100):
         try:
             dir_text = "정방향" if direction == 1 else "역방향"
             print(f"[EE] 센터 모터 {dir_text} 연속 회전 시작")
 
-            self._set_velocity_mode()
-            self.opencr_serial.dxl_goalVelocity(self.CENTER_MOTOR_ID, int(speed) * direction)
+            self._run_blocking("start_rotation", self._start_rotation, direction, speed)
 
             print(f"  Motor ID: {self.CENTER_MOTOR_ID}")
             print(f"  Rotation speed: {int(speed) * direction}")
@@ -181,9 +570,7 @@ class MotorControl:
     def stop_center_motor_rotation(self):
         try:
             print("[EE] Stopping center motor rotation...")
-            self.opencr_serial.dxl_goalVelocity(self.CENTER_MOTOR_ID, 0)
-            time.sleep(0.3)
-            self._set_position_mode()
+            self._run_blocking("stop_rotation", self._stop_rotation)
             print(f"  Motor ID: {self.CENTER_MOTOR_ID}")
             print(f"  Rotation stopped")
         except Exception as e:
@@ -198,8 +585,7 @@ class MotorControl:
             print(f"  Motor ID: {self.CENTER_MOTOR_ID}")
             print(f"  Target position value: {position_value}")
 
-            self._set_position_mode()
-            self.opencr_serial.dxl_goalPosition(self.CENTER_MOTOR_ID, position_value)
+            self._run_blocking("reset", self._reset, position_value)
             print("  Reset command sent successfully")
 
             self.center_position = target_angle
@@ -211,7 +597,7 @@ class MotorControl:
         """현재 위치/각도 출력"""
         print("\n=== Motor Status Check ===")
         try:
-            center_pos = self.opencr_serial.dxl_getPresentPositionData(self.CENTER_MOTOR_ID)
+            center_pos = self._dxl('dxl_getPresentPositionData')
             center_angle = float(center_pos) * 200.0 / 1023.0
             print(f"Center Motor (ID {self.CENTER_MOTOR_ID}): Position={center_pos}, Angle={center_angle:.1f}°")
         except Exception as e:
@@ -1,88 +1,193 @@
-import firebase_admin
-from firebase_admin import firestore
-from firebase_admin import credentials
-import datetime
-from datetime import datetime as dt
-
-class FirebaseConnection:
-    def __init__(self):
-        file_path = '' # Firebase - 앱 간 연결용 json 파일 경로
-        cred = credentials.Certificate(file_path)
-        firebase_admin.initialize_app(cred)
-
-        self.db = firestore.client()
-        self.doc_data = self.db.collection('Harvest_Data').document('Data')
-        self.doc_log = self.db.collection('Growth_Log')
-        self.last_log = self.get_last_log()
-        self.count = 0
-        self.cumul_count = self.last_log.get('n_cumul_harvest') if self.last_log is not None else 0
-
-        # 실시간 현황 화면 초기화
-    def init_data(self, n_total, n_mature):
-        self.doc_data.update({'n_total': n_total,
-                            'n_mature': n_mature,
-                            'n_immature': n_total - n_mature,
-                            'n_harvest': 0})
-        
-        # 새로운 로그 초기화
-    def init_log(self, n_total, n_mature):
-        if self.last_log is not None:
-            prev_cumul_total = self.last_log.get('n_cumul_total')
-            prev_cumul_mature = self.last_log.get('n_cumul_mature')
-
-            prev_current_total = self.last_log.get('n_current_total')
-            prev_current_mature = self.last_log.get('n_current_mature')
-            prev_current_harvest = self.last_log.get('n_current_harvest')
-
-        else:
-            prev_cumul_total = 0
-            prev_cumul_mature = 0
-
-            prev_current_total = 0
-            prev_current_mature = 0
-            prev_current_harvest = 0
-
-        n_cumul_total = prev_cumul_total + max(0, n_total - (prev_current_total - prev_current_harvest))
-        n_cumul_mature = prev_cumul_mature + max(0, n_mature - (prev_current_mature - prev_current_harvest))
-        
-        self.doc_log.add({'datetime': dt.now(tz = datetime.timezone.utc),
-                          'n_cumul_total': n_cumul_total,
-                          'n_current_total': n_total,
-                          'n_cumul_mature': n_cumul_mature,
-                          'n_current_mature': n_mature,
-                          'n_cumul_harvest': self.cumul_count,
-                          'n_current_harvest': 0})
-        
-        # 최신 로그 상태 업데이트
-        self.last_log = self.get_last_log()
-
-    # 수확량 증가
-    def increment_harvest_count(self):
-        self.count += 1
-        self.cumul_count += 1
-        
-        self.doc_data.update({'n_harvest': self.count})
-        self.last_log.reference.update({'n_cumul_harvest': self.cumul_count,
-                                        'n_current_harvest': self.count})
-
-    def update_log(self, n_total, n_mature):
-        self.last_log.reference.update({'n_cumul_total': self.last_log.get('n_cumul_total') + n_total,
-                                        'n_current_total': self.last_log.get('n_current_total') + n_total,
-                                        'n_cumul_mature': self.last_log.get('n_cumul_mature') + n_mature,
-                                        'n_current_mature': self.last_log.get('n_current_mature') + n_mature})
-   
-        # 실시간 현황 0으로 초기화
-    def clear_data(self):
-        self.doc_data.update({'n_total': 0,
-                            'n_mature': 0,
-                            'n_immature': 0,
-                            'n_harvest': 0})
-
-    def get_last_log(self):
-        query = self.doc_log.order_by('datetime', direction=firestore.Query.DESCENDING).limit(1)
-        docs = query.stream()
-        
-        try:
-            return next(docs)
-        except StopIteration:
-            return None
\ No newline at end of file
+import os
+import datetime
+from datetime import datetime as dt
+
+from firestore_writer import CoalescingWriter
+
+try:
+    import firebase_admin
+    from firebase_admin import firestore
+    from firebase_admin import credentials
+except ImportError:  # firebase 미설치 환경 (firestore_fake.FakeFirestore 사용)
+    firebase_admin = None
+
+try:
+    from google.cloud.firestore import transactional
+except ImportError:
+    from firestore_fake import transactional
+
+# Firestore 에뮬레이터 사용 시 (예: FIRESTORE_EMULATOR_HOST=localhost:8080) 인증 파일 없이 이 프로젝트로 연결
+EMULATOR_PROJECT = os.environ.get('FIRESTORE_EMULATOR_PROJECT', 'demo-harvest')
+
+# Harvest_Data/Summary: 누적값 + 현재 로그 값 (+ last_log_id), Growth_Log 를 조회하지 않고 시작/로그 교체
+SUMMARY_FIELDS = ('n_cumul_total', 'n_cumul_mature', 'n_cumul_harvest',
+                  'n_current_total', 'n_current_mature', 'n_current_harvest')
+
+@transactional
+def _init_log_in_transaction(transaction, summary_ref, log_ref, n_total, n_mature, when, sync):
+    """요약 문서 → 새 로그 값 계산, 로그 생성 + 요약 교체 (+ 동기화 위치), 새 로그 dict 반환"""
+    snap = summary_ref.get(transaction=transaction)
+    summary = snap.to_dict() if snap.exists else {}
+    existing = log_ref.get(transaction=transaction)
+    if existing.exists and summary.get('last_log_id') == log_ref.id:
+        return existing.to_dict()   # 이미 기록된 로그 (같은 이벤트 재생)
+
+    prev = {key: summary.get(key) or 0 for key in SUMMARY_FIELDS}
+    n_cumul_total = prev['n_cumul_total'] + max(0, n_total - (prev['n_current_total'] - prev['n_current_harvest']))
+    n_cumul_mature = prev['n_cumul_mature'] + max(0, n_mature - (prev['n_current_mature'] - prev['n_current_harvest']))
+
+    log = {'datetime': when,
+           'n_cumul_total': n_cumul_total,
+           'n_current_total': n_total,
+           'n_cumul_mature': n_cumul_mature,
+           'n_current_mature': n_mature,
+           'n_cumul_harvest': prev['n_cumul_harvest'],
+           'n_current_harvest': 0}
+    transaction.set(log_ref, log)
+    transaction.set(summary_ref, dict({key: log[key] for key in SUMMARY_FIELDS}, last_log_id=log_ref.id))
+    if sync is not None:
+        transaction.set(*sync)
+    return log
+
+
+class FirebaseConnection:
+    def __init__(self, db=None, flush_interval_s=2.0, max_pending=50):
+        """
+        :param db: Firestore client 호환 객체 (firestore_fake.FakeFirestore 등), 없으면 Firebase 앱 연결
+        :param flush_interval_s / max_pending: 갱신을 모아 batch 로 기록하는 주기 / 대기 필드 수 상한
+        """
+        if db is None:
+            try:
+                firebase_admin.get_app()    # 재연결 시 이미 초기화된 앱 사용
+            except ValueError:
+                if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+                    firebase_admin.initialize_app(options={'projectId': EMULATOR_PROJECT})
+                else:
+                    file_path = '' # Firebase - 앱 간 연결용 json 파일 경로
+                    cred = credentials.Certificate(file_path)
+                    firebase_admin.initialize_app(cred)
+            db = firestore.client()
+
+        self.db = db
+        self.doc_data = self.db.collection('Harvest_Data').document('Data')
+        self.doc_log = self.db.collection('Growth_Log')
+        self.doc_sync = self.db.collection('Harvest_Data').document('Sync')   # telemetry_store 동기화 위치
+        self.doc_summary = self.db.collection('Harvest_Data').document('Summary')
+        self.writer = CoalescingWriter(self.db, flush_interval_s=flush_interval_s, max_pending=max_pending)
+
+        # 누적값 + 현재 로그 요약 (시작 시 문서 하나만 읽음, 이후 모든 갱신과 같은 batch 로 기록)
+        summary = self.load_summary()
+        self.last_log_ref = self.doc_log.document(summary['last_log_id']) if summary.get('last_log_id') else None
+        self.last_log = summary if self.last_log_ref is not None else None
+        self.count = 0
+        self.cumul_count = summary.get('n_cumul_harvest') or 0
+
+        # 실시간 현황 화면 초기화
+    def init_data(self, n_total, n_mature):
+        self.writer.set_fields(self.doc_data, {'n_total': n_total,
+                                               'n_mature': n_mature,
+                                               'n_immature': n_total - n_mature,
+                                               'n_harvest': 0})
+
+        # 새로운 로그 초기화
+    def init_log(self, n_total, n_mature, when=None, log_id=None, sync_marker=None):
+        """
+        요약 문서를 transaction 안에서 읽어 누적값을 계산하고, 새 로그 + 요약을 함께 바로 commit
+        (다른 writer 와 동시에 실행돼도 누적값이 어긋나지 않음, 충돌 시 transaction 재시도)
+        앞서 쌓인 갱신은 먼저 flush 해서 요약 문서에 반영된 값으로 계산 (실패 시 예외)
+        when: 로그 시각 (기본: 지금), log_id: 문서 ID (같은 ID 로 다시 기록하면 건너뜀, 기본: 자동 생성)
+        sync_marker: telemetry_store 이벤트 ID, 주면 동기화 위치도 같은 transaction 으로 기록
+        """
+        self.writer.flush(raise_errors=True)
+        log_ref = self.doc_log.document(log_id)
+        when = when or dt.now(tz = datetime.timezone.utc)
+        sync = (self.doc_sync, self._sync_marker_doc(sync_marker)) if sync_marker is not None else None
+        log = _init_log_in_transaction(self.db.transaction(), self.doc_summary, log_ref,
+                                       n_total, n_mature, when, sync)
+
+        # 최신 로그 상태 업데이트
+        self.last_log_ref = log_ref
+        self.last_log = dict(log, last_log_id=log_ref.id)
+        self.count = log.get('n_current_harvest') or 0
+        self.cumul_count = log.get('n_cumul_harvest') or 0
+
+    # 수확량 증가 (batch 로 모아서 기록)
+    def increment_harvest_count(self, n=1):
+        self.count += n
+        self.cumul_count += n
+
+        self.writer.increment(self.doc_data, 'n_harvest', n)
+        self.writer.increment(self.doc_summary, 'n_cumul_harvest', n)
+        if self.last_log_ref is not None:
+            self.writer.increment(self.last_log_ref, 'n_cumul_harvest', n)
+            self.writer.increment(self.last_log_ref, 'n_current_harvest', n)
+            self.writer.increment(self.doc_summary, 'n_current_harvest', n)
+            self.last_log['n_cumul_harvest'] = self.cumul_count
+            self.last_log['n_current_harvest'] = self.count
+
+    def update_log(self, n_total, n_mature):
+        for field, n in (('n_cumul_total', n_total), ('n_current_total', n_total),
+                         ('n_cumul_mature', n_mature), ('n_current_mature', n_mature)):
+            self.writer.increment(self.last_log_ref, field, n)
+            self.writer.increment(self.doc_summary, field, n)
+            self.last_log[field] = self.last_log.get(field, 0) + n
+
+        # 실시간 현황 0으로 초기화
+    def clear_data(self):
+        self.writer.set_fields(self.doc_data, {'n_total': 0,
+                                               'n_mature': 0,
+                                               'n_immature': 0,
+                                               'n_harvest': 0})
+
+    def flush(self, raise_errors=False):
+        return self.writer.flush(raise_errors=raise_errors)
+
+    def discard(self):
+        """아직 기록하지 않은 갱신 버리기 (동기화 도중 실패 시, 같은 이벤트를 다시 재생하기 전에)"""
+        return self.writer.discard()
+
+    def read_sync_marker(self):
+        """Firestore 에 반영된 마지막 telemetry_store 이벤트 ID (없으면 0)"""
+        snap = self.doc_sync.get()
+        return (snap.get('last_event_id') or 0) if snap.exists else 0
+
+    @staticmethod
+    def _sync_marker_doc(event_id):
+        return {'last_event_id': event_id, 'synced_at': dt.now(tz = datetime.timezone.utc)}
+
+    def set_sync_marker(self, event_id):
+        """다음 flush batch 에 동기화 위치 기록 (이벤트 갱신과 같은 batch 로 원자적으로 기록)"""
+        self.writer.create(self.doc_sync, self._sync_marker_doc(event_id))
+
+    def close(self):
+        """남은 갱신 기록 (종료 전 반드시 호출)"""
+        self.writer.close()
+
+    def load_summary(self):
+        """
+        요약 문서 읽기 (point read 한 번)
+        없으면 (이전 버전 데이터) 최신 로그를 한 번 조회해 요약 문서를 만듦
+        """
+        snap = self.doc_summary.get()
+        if snap.exists:
+            return snap.to_dict()
+
+        summary = dict.fromkeys(SUMMARY_FIELDS, 0)
+        summary['last_log_id'] = None
+        last = self.get_last_log()
+        if last is not None:
+            log = last.to_dict()
+            summary.update({key: log.get(key) or 0 for key in SUMMARY_FIELDS})
+            summary['last_log_id'] = last.id
+        self.doc_summary.set(summary)
+        print(f"[FIREBASE] summary 문서 생성 (최신 로그: {summary['last_log_id']})")
+        return summary
+
+    def get_last_log(self):
+        query = self.doc_log.order_by('datetime', direction='DESCENDING').limit(1)
+        docs = query.stream()
+
+        try:
+            return next(docs)
+        except StopIteration:
+            return None
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+메모리 Firestore (firebase 연결/에뮬레이터 없이 FirebaseConnection, firestore_writer 실행·테스트용)
+
+FirebaseConnection / CoalescingWriter 에서 사용하는 호출만 같은 이름으로 구현
+- db.collection(name).document(id=None) / .add(data) / .order_by(field, direction).limit(n).stream()
+- DocumentReference.set / update / get, DocumentSnapshot.get / to_dict / reference / exists
+- db.batch() → set / update / commit (commit 한 번 = round trip 한 번)
+- db.transaction() + transactional(fn): ref.get(transaction=) 로 읽은 문서가 commit 전에 바뀌면 재시도
+- Increment(value) 센티넬 (google.cloud.firestore 미설치 환경용)
+- round_trips / writes: 서버 호출 수, 문서 쓰기 수
+
+- 사용:
+    from firestore_fake import FakeFirestore
+    fc = FirebaseConnection(db=FakeFirestore())
+    python3 firestore_fake.py       # 수확 100개 기록 시 round trip 수 비교
+"""
+
+import uuid
+import threading
+
+
+MAX_TRANSACTION_ATTEMPTS = 5
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class Aborted(Exception):
+    """transaction 에서 읽은 문서가 commit 전에 다른 writer 에 의해 바뀜"""
+
+
+def _apply(current, fields):
+    data = dict(current)
+    for key, value in fields.items():
+        if hasattr(value, 'value') and type(value).__name__ == 'Increment':
+            data[key] = data.get(key, 0) + value.value
+        else:
+            data[key] = value
+    return data
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def get(self, field):
+        return None if self._data is None else self._data.get(field)
+
+    def to_dict(self):
+        return None if self._data is None else dict(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def _write(self, data):
+        self._db._docs[self.path] = data
+        self._db._versions[self.path] = self._db._versions.get(self.path, 0) + 1
+        self._db.writes += 1
+
+    def set(self, data):
+        with self._db._lock:
+            self._db.round_trips += 1
+            self._write(_apply({}, data))
+
+    def update(self, fields):
+        with self._db._lock:
+            self._db.round_trips += 1
+            if self.path not in self._db._docs:
+                raise KeyError(f"No document to update: {self.path}")
+            self._write(_apply(self._db._docs[self.path], fields))
+
+    def get(self, transaction=None):
+        with self._db._lock:
+            self._db.round_trips += 1
+            data = self._db._docs.get(self.path)
+            if transaction is not None:
+                transaction._reads[self.path] = self._db._versions.get(self.path, 0)
+            return FakeSnapshot(self, None if data is None else dict(data))
+
+
+class FakeQuery:
+    def __init__(self, collection, field, descending, limit=None):
+        self._collection = collection
+        self._field = field
+        self._descending = descending
+        self._limit = limit
+
+    def limit(self, n):
+        return FakeQuery(self._collection, self._field, self._descending, n)
+
+    def stream(self):
+        db = self._collection._db
+        with db._lock:
+            db.round_trips += 1
+            prefix = self._collection.name + '/'
+            docs = [(path, dict(data)) for path, data in db._docs.items()
+                    if path.startswith(prefix) and self._field in data]
+        docs.sort(key=lambda item: item[1][self._field], reverse=self._descending)
+        for path, data in docs[:self._limit]:
+            yield FakeSnapshot(self._collection.document(path[len(prefix):]), data)
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self._db = db
+        self.name = name
+
+    def document(self, doc_id=None):
+        return FakeDocument(self._db, self.name, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def order_by(self, field, direction='ASCENDING'):
+        return FakeQuery(self, field, direction == 'DESCENDING')
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, ref, data):
+        self._ops.append(('set', ref, data))
+
+    def update(self, ref, fields):
+        self._ops.append(('update', ref, fields))
+
+    def commit(self):
+        """모든 쓰기를 한 번에 적용 (하나라도 실패하면 아무것도 적용하지 않음)"""
+        with self._db._lock:
+            self._db.round_trips += 1
+            self._db._commit_ops(self._ops)
+        return [None] * len(self._ops)
+
+
+class FakeTransaction(FakeBatch):
+    def __init__(self, db):
+        super().__init__(db)
+        self._reads = {}    # 문서 경로 → 읽을 때의 version
+
+    def _commit(self):
+        with self._db._lock:
+            self._db.round_trips += 1
+            for path, version in self._reads.items():
+                if self._db._versions.get(path, 0) != version:
+                    raise Aborted(f"{path} changed during transaction")
+            self._db._commit_ops(self._ops)
+
+
+def transactional(fn):
+    """google.cloud.firestore.transactional 과 같은 호출 방식: fn(transaction, *args)"""
+    def wrapper(transaction, *args, **kwargs):
+        for _ in range(MAX_TRANSACTION_ATTEMPTS):
+            transaction._reads, transaction._ops = {}, []
+            result = fn(transaction, *args, **kwargs)
+            try:
+                transaction._commit()
+                return result
+            except Aborted:
+                continue
+        raise Aborted(f"transaction failed after {MAX_TRANSACTION_ATTEMPTS} attempts")
+    return wrapper
+
+
+class FakeFirestore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}
+        self._versions = {}     # 문서 경로 → 쓰기 횟수 (transaction 충돌 확인용)
+        self.round_trips = 0
+        self.writes = 0
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def transaction(self):
+        return FakeTransaction(self)
+
+    def _commit_ops(self, ops):
+        """batch/transaction 쓰기 적용 (_lock 안에서 호출)"""
+        docs = dict(self._docs)
+        for op, ref, fields in ops:
+            if op == 'set':
+                docs[ref.path] = _apply({}, fields)
+            elif ref.path not in docs:
+                raise KeyError(f"No document to update: {ref.path}")
+            else:
+                docs[ref.path] = _apply(docs[ref.path], fields)
+        for op, ref, fields in ops:
+            self._versions[ref.path] = self._versions.get(ref.path, 0) + 1
+        self._docs = docs
+        self.writes += len(ops)
+
+    def dump(self):
+        with self._lock:
+            return {path: dict(data) for path, data in self._docs.items()}
+
+
+if __name__ == "__main__":
+    import time
+    from firebase_connection import FirebaseConnection
+
+    db = FakeFirestore()
+    db.collection('Harvest_Data').document('Data').set({'n_harvest': 0})
+    fc = FirebaseConnection(db=db, flush_interval_s=0.5)
+    fc.init_data(40, 12)
+    fc.init_log(40, 12)
+    t0 = time.monotonic()
+    for _ in range(100):
+        fc.increment_harvest_count()
+    elapsed_ms = (time.monotonic() - t0) * 1000.0
+    fc.close()
+    print(f"[FAKE] 100 harvests: {elapsed_ms:.1f} ms on caller, "
+          f"{db.round_trips} round trips / {db.writes} writes (direct: 2 per harvest)")
+    for path, data in sorted(db.dump().items()):
+        print(f"  {path}: {data}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Firestore write-behind (수확 카운터 등 잦은 갱신을 메모리에서 합친 뒤 batch 한 번으로 기록)
+
+- increment(ref, field, n): Increment 센티넬로 누적 (같은 필드는 합산)
+- set_fields(ref, fields): 마지막 값만 기록 (이후 increment 는 그 값에 더함)
+- create(ref, data): 새 문서 (flush 전 갱신은 생성 데이터에 바로 반영)
+- flush_interval_s 마다 또는 마지막 flush 이후 갱신 요청이 max_pending 개 이상이면
+  전용 스레드에서 db.batch() 로 commit
+- commit 실패 시 대기 중인 갱신으로 되돌려 다음 flush 에서 재시도 (batch 는 전부 적용되거나 전부 실패)
+- close(): 남은 갱신을 flush 하고 종료
+- discard(): 대기 중인 갱신을 기록하지 않고 버림 (호출 쪽에서 처음부터 다시 기록할 때)
+- flush_interval_s / max_pending 이 None 이면 자동 flush 없음
+  (flush() 직접 호출, 여러 갱신을 한 batch 로 원자적으로 기록할 때)
+
+- 사용:
+    writer = CoalescingWriter(db)
+    writer.increment(doc_ref, 'n_harvest')
+    writer.close()
+"""
+
+import threading
+
+try:
+    from google.cloud.firestore import Increment
+except ImportError:  # firebase 미설치 환경 (firestore_fake 사용)
+    from firestore_fake import Increment
+
+
+class _Pending:
+    __slots__ = ('ref', 'create', 'fields', 'inc')
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.create = None   # 새 문서 데이터 (None: 기존 문서 update)
+        self.fields = {}     # 덮어쓸 값
+        self.inc = {}        # 필드별 증가량
+
+
+class CoalescingWriter:
+    def __init__(self, db, flush_interval_s=2.0, max_pending=50):
+        self.db = db
+        self.flush_interval_s = flush_interval_s
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()   # commit 은 한 번에 하나 (순서 유지)
+        self._wake = threading.Condition(self._lock)
+        self._pending = {}                    # 문서 경로 → _Pending
+        self._n_queued = 0                    # 마지막 flush 이후 갱신 요청 수
+        self._closed = False
+        self.counters = {'ops': 0, 'commits': 0, 'writes': 0, 'errors': 0}
+
+        self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+        self._thread.start()
+
+    # ------------------------- 갱신 요청 -------------------------
+
+    def _entry(self, ref):
+        entry = self._pending.get(ref.path)
+        if entry is None:
+            entry = self._pending[ref.path] = _Pending(ref)
+        return entry
+
+    def _queued(self):
+        self.counters['ops'] += 1
+        self._n_queued += 1
+        if self.max_pending is not None and self._n_queued >= self.max_pending:
+            self._wake.notify()
+
+    def create(self, ref, data):
+        with self._lock:
+            entry = self._entry(ref)
+            entry.create = dict(data)
+            entry.fields.clear()
+            entry.inc.clear()
+            self._queued()
+
+    def set_fields(self, ref, fields):
+        with self._lock:
+            entry = self._entry(ref)
+            for key, value in fields.items():
+                entry.inc.pop(key, None)
+                if entry.create is not None:
+                    entry.create[key] = value
+                else:
+                    entry.fields[key] = value
+            self._queued()
+
+    def increment(self, ref, field, n=1):
+        with self._lock:
+            entry = self._entry(ref)
+            if entry.create is not None:
+                entry.create[field] = entry.create.get(field, 0) + n
+            elif field in entry.fields:
+                entry.fields[field] += n
+            else:
+                entry.inc[field] = entry.inc.get(field, 0) + n
+            self._queued()
+
+    # ------------------------- flush -------------------------
+
+    def _merge_back(self, pending):
+        """commit 실패: 실패한 갱신 뒤에 새로 들어온 갱신을 합쳐 다시 대기"""
+        for path, old in pending.items():
+            new = self._pending.get(path)
+            if new is None:
+                self._pending[path] = old
+                continue
+            if new.create is not None:
+                continue
+            if old.create is not None:
+                data = dict(old.create)
+                data.update(new.fields)
+                for key, n in new.inc.items():
+                    data[key] = data.get(key, 0) + n
+                new.create, new.fields, new.inc = data, {}, {}
+                continue
+            fields = dict(old.fields)
+            inc = dict(old.inc)
+            for key, value in new.fields.items():
+                inc.pop(key, None)
+                fields[key] = value
+            for key, n in new.inc.items():
+                if key in fields:
+                    fields[key] += n
+                else:
+                    inc[key] = inc.get(key, 0) + n
+            new.fields, new.inc = fields, inc
+
+    def flush(self, raise_errors=False):
+        """
+        대기 중인 갱신을 batch 한 번으로 commit, 기록한 문서 수 반환
+        raise_errors: True 면 실패 시 갱신을 되돌리지 않고 예외 전달 (호출 쪽에서 다시 기록)
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._n_queued = 0
+            if not pending:
+                return 0
+            batch = self.db.batch()
+            for entry in pending.values():
+                if entry.create is not None:
+                    batch.set(entry.ref, entry.create)
+                else:
+                    fields = dict(entry.fields)
+                    fields.update({key: Increment(n) for key, n in entry.inc.items()})
+                    batch.update(entry.ref, fields)
+            try:
+                batch.commit()
+            except Exception as e:
+                with self._lock:
+                    self.counters['errors'] += 1
+                    if raise_errors:
+                        raise
+                    print(f"[FIREBASE] batch commit 실패, 다음 flush 에서 재시도: {e}")
+                    self._merge_back(pending)
+                return 0
+            with self._lock:
+                self.counters['commits'] += 1
+                self.counters['writes'] += len(pending)
+            return len(pending)
+
+    def discard(self):
+        """대기 중인 갱신을 기록하지 않고 버림, 버린 갱신 요청 수 반환"""
+        with self._flush_lock:
+            with self._lock:
+                n = self._n_queued
+                self._pending = {}
+                self._n_queued = 0
+        return n
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._closed:
+                    self._wake.wait(self.flush_interval_s)
+                closed = self._closed
+            self.flush()
+            if closed:
+                break
+
+    def close(self, timeout=10.0):
+        """남은 갱신 flush 후 종료"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake.notify()
+        self._thread.join(timeout)
+        if self._pending:
+            self.flush()
+        print(f"[FIREBASE] writer closed {self.counters}")
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Frame Source (RealSense live / 녹화 세션 재생)
+
+- 정렬된(color 기준) color + depth 프레임을 공통 인터페이스(FrameData)로 제공
+- 백엔드:
+    RealSenseSource : 실시간 카메라
+    BagReplaySource : RealSense .bag 녹화 파일 재생
+    NpzReplaySource : record_session 으로 저장한 디렉토리(.npy memmap) 또는 .npz 재생
+
+- 사용:
+    from frame_source import create_frame_source
+    source = create_frame_source()                       # 카메라
+    source = create_frame_source('session_dir')          # 재생 (가능한 빠르게)
+    source = create_frame_source('a.bag', realtime=True) # 녹화 속도로 재생
+    source.start()
+    frame = source.read()   # FrameData 또는 None (source.eof 면 스트림 종료)
+    source.stop()
+
+- 녹화:
+    python3 frame_source.py record session_dir --frames 300
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Optional
+
+import numpy as np
+
+try:
+    import pyrealsense2 as rs
+except ImportError:  # 재생(npz)만 사용하는 환경
+    rs = None
+
+
+PRESET_MAP = {
+    'default': 1,
+    'high_accuracy': 3,
+    'high_density': 4,
+    'medium_density': 5
+}
+
+
+def _require_rs():
+    if rs is None:
+        raise RuntimeError("[Source] pyrealsense2 가 설치되어 있지 않습니다.")
+
+
+def intrinsics_to_dict(intr) -> dict:
+    """rs.intrinsics -> 직렬화 가능한 dict"""
+    return {'width': intr.width, 'height': intr.height,
+            'fx': intr.fx, 'fy': intr.fy,
+            'ppx': intr.ppx, 'ppy': intr.ppy,
+            'model': str(intr.model), 'coeffs': list(intr.coeffs)}
+
+
+def deproject_pixel_to_point(intr: dict, u: float, v: float, z: float):
+    """
+    핀홀 모델 역투영 (distortion 무시)
+    color 기준 정렬된 depth 는 color intrinsics 를 따르며, D4xx color 의 coeffs 는 보통 0
+    """
+    x = (u - intr['ppx']) / intr['fx']
+    y = (v - intr['ppy']) / intr['fy']
+    return [z * x, z * y, z]
+
+
+class FrameData:
+    """
+    정렬된 한 프레임
+    color: (H, W, 3) uint8 BGR
+    depth: (H, W) uint16 (raw z16, 미터 = raw * depth_scale)
+    """
+    __slots__ = ('index', 'timestamp', 'color', 'depth', 'depth_scale', 'intrinsics',
+                 'host_time', '_rs_intr', '_keepalive')
+
+    def __init__(self, index, timestamp, color, depth, depth_scale, intrinsics,
+                 rs_intr=None, keepalive=None):
+        self.index = index
+        self.timestamp = timestamp
+        self.color = color
+        self.depth = depth
+        self.depth_scale = depth_scale
+        self.intrinsics = intrinsics
+        self.host_time = None        # 수신 시각 (time.monotonic, detection.capture_loop 에서 기록)
+        self._rs_intr = rs_intr
+        self._keepalive = keepalive  # rs.frameset 버퍼 유지용
+
+    def get_width(self):
+        return self.depth.shape[1]
+
+    def get_height(self):
+        return self.depth.shape[0]
+
+    def get_distance(self, u: int, v: int) -> float:
+        """(u, v) 픽셀의 거리(m)"""
+        return float(self.depth[v, u]) * self.depth_scale
+
+    def deproject(self, u: float, v: float, z: float):
+        """픽셀 + 거리(m) -> 카메라 좌표계 [X, Y, Z] (m)"""
+        if self._rs_intr is not None:
+            return rs.rs2_deproject_pixel_to_point(self._rs_intr, [u, v], z)
+        return deproject_pixel_to_point(self.intrinsics, u, v, z)
+
+
+class FrameSource:
+    """
+    프레임 소스 공통 인터페이스
+    realtime: True 면 카메라처럼 일정 속도로 프레임이 들어옴 (오래된 프레임은 drop 해도 됨)
+              False 면 소비 속도에 맞춰 모든 프레임을 제공 (벤치마크용)
+    """
+    realtime = True
+
+    def __init__(self):
+        self.eof = False
+        self.intrinsics = None
+        self.depth_scale = 0.001
+
+    def start(self):
+        pass
+
+    def read(self) -> Optional[FrameData]:
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _RealSensePipelineSource(FrameSource):
+    """rs.pipeline 기반 소스 공통부 (live / bag)"""
+
+    def __init__(self, timeout_ms=5000):
+        _require_rs()
+        super().__init__()
+        self.timeout_ms = timeout_ms
+        self.pipeline = rs.pipeline()
+        self.config = rs.config()
+        self.align = rs.align(rs.stream.color)
+        self.profile = None
+        self._index = 0
+
+    def _on_started(self):
+        depth_sensor = self.profile.get_device().first_depth_sensor()
+        self.depth_scale = depth_sensor.get_depth_scale()
+
+    def start(self):
+        self.profile = self.pipeline.start(self.config)
+        self._on_started()
+
+    def read(self) -> Optional[FrameData]:
+        ok, frames = self.pipeline.try_wait_for_frames(self.timeout_ms)
+        if not ok:
+            self._on_timeout()
+            return None
+        frames = self.align.process(frames)
+        color_frame = frames.get_color_frame()
+        depth_frame = frames.get_depth_frame()
+        if not color_frame or not depth_frame:
+            return None
+        # 다른 스레드에서 사용하므로 프레임 버퍼 유지
+        frames.keep()
+
+        rs_intr = depth_frame.get_profile().as_video_stream_profile().get_intrinsics()
+        if self.intrinsics is None:
+            self.intrinsics = intrinsics_to_dict(rs_intr)
+
+        frame = FrameData(index=self._index,
+                          timestamp=frames.get_timestamp() / 1000.0,
+                          color=np.asanyarray(color_frame.get_data()),
+                          depth=np.asanyarray(depth_frame.get_data()),
+                          depth_scale=self.depth_scale,
+                          intrinsics=self.intrinsics,
+                          rs_intr=rs_intr,
+                          keepalive=frames)
+        self._index += 1
+        return frame
+
+    def _on_timeout(self):
+        print("[Source] 프레임 수신 타임아웃")
+
+    def stop(self):
+        try:
+            self.pipeline.stop()
+        except RuntimeError:
+            pass
+
+
+class RealSenseSource(_RealSensePipelineSource):
+    """실시간 RealSense 카메라 (640x480 @ 30fps, high_accuracy 프리셋)"""
+    realtime = True
+
+    def __init__(self, width=640, height=480, fps=30, preset='high_accuracy',
+                 laser_power=240.0, exposure=8500.0, gain=16.0, timeout_ms=5000):
+        super().__init__(timeout_ms=timeout_ms)
+        self.config.enable_stream(rs.stream.color, width, height, rs.format.bgr8, fps)
+        self.config.enable_stream(rs.stream.depth, width, height, rs.format.z16, fps)
+        self.preset = preset
+        self.laser_power = laser_power
+        self.exposure = exposure
+        self.gain = gain
+
+    def start(self):
+        ctx = rs.context()
+        device = ctx.query_devices()[0]
+        depth_sensor = device.first_depth_sensor()
+
+        depth_sensor.set_option(rs.option.visual_preset, PRESET_MAP[self.preset])
+        depth_sensor.set_option(rs.option.laser_power, self.laser_power)
+        depth_sensor.set_option(rs.option.exposure, self.exposure)
+        depth_sensor.set_option(rs.option.gain, self.gain)
+
+        super().start()
+
+
+class BagReplaySource(_RealSensePipelineSource):
+    """RealSense .bag 녹화 파일 재생"""
+
+    def __init__(self, path, realtime=False, timeout_ms=1000):
+        super().__init__(timeout_ms=timeout_ms)
+        self.path = path
+        self.realtime = realtime
+        self.config.enable_device_from_file(path, repeat_playback=False)
+
+    def _on_started(self):
+        super()._on_started()
+        playback = self.profile.get_device().as_playback()
+        playback.set_real_time(self.realtime)
+        self._playback = playback
+
+    def _on_timeout(self):
+        # 재생 종료 시 프레임이 더 이상 들어오지 않음
+        if self._playback.current_status() == rs.playback_status.stopped:
+            self.eof = True
+
+
+class NpzReplaySource(FrameSource):
+    """
+    record_session 으로 저장한 세션 재생
+    - 디렉토리: color.npy, depth.npy, timestamps.npy (memmap), meta.json
+    - .npz: color, depth, timestamps, meta(json 문자열)
+    """
+
+    def __init__(self, path, realtime=False, loop=False):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self._index = 0
+        self._t0_wall = None
+        self._t0_stamp = None
+
+        if os.path.isdir(path):
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            self.color = np.load(os.path.join(path, 'color.npy'), mmap_mode='r')
+            self.depth = np.load(os.path.join(path, 'depth.npy'), mmap_mode='r')
+            self.timestamps = np.load(os.path.join(path, 'timestamps.npy'), mmap_mode='r')
+        else:
+            archive = np.load(path)
+            meta = json.loads(str(archive['meta']))
+            self.color = archive['color']
+            self.depth = archive['depth']
+            self.timestamps = archive['timestamps']
+
+        self.count = int(meta.get('count', len(self.color)))
+        self.intrinsics = meta['intrinsics']
+        self.depth_scale = float(meta['depth_scale'])
+
+    def read(self) -> Optional[FrameData]:
+        if self._index >= self.count:
+            if not self.loop or self.count == 0:
+                self.eof = True
+                return None
+            self._index = 0
+            self._t0_wall = None
+
+        i = self._index
+        stamp = float(self.timestamps[i])
+        if self.realtime:
+            # 녹화 당시 간격에 맞춰 대기
+            if self._t0_wall is None:
+                self._t0_wall, self._t0_stamp = time.perf_counter(), stamp
+            delay = (stamp - self._t0_stamp) - (time.perf_counter() - self._t0_wall)
+            if delay > 0:
+                time.sleep(delay)
+
+        # memmap 에서 복사 (시각화 단계에서 이미지에 직접 그리므로)
+        frame = FrameData(index=i,
+                          timestamp=stamp,
+                          color=np.array(self.color[i]),
+                          depth=np.array(self.depth[i]),
+                          depth_scale=self.depth_scale,
+                          intrinsics=self.intrinsics)
+        self._index += 1
+        return frame
+
+
+def create_frame_source(path=None, realtime=False, loop=False) -> FrameSource:
+    """path 가 없으면 카메라, .bag 이면 bag 재생, 그 외에는 npz/디렉토리 재생"""
+    if path is None:
+        return RealSenseSource()
+    if path.endswith('.bag'):
+        return BagReplaySource(path, realtime=realtime)
+    return NpzReplaySource(path, realtime=realtime, loop=loop)
+
+
+def record_session(source: FrameSource, out_dir, n_frames):
+    """source 에서 n_frames 만큼 읽어 out_dir 에 memmap(.npy) 세션으로 저장"""
+    os.makedirs(out_dir, exist_ok=True)
+    color_mm = depth_mm = None
+    timestamps = np.zeros(n_frames, dtype=np.float64)
+
+    count = 0
+    while count < n_frames and not source.eof:
+        frame = source.read()
+        if frame is None:
+            continue
+        if color_mm is None:
+            color_mm = np.lib.format.open_memmap(os.path.join(out_dir, 'color.npy'), mode='w+',
+                                                 dtype=np.uint8, shape=(n_frames,) + frame.color.shape)
+            depth_mm = np.lib.format.open_memmap(os.path.join(out_dir, 'depth.npy'), mode='w+',
+                                                 dtype=np.uint16, shape=(n_frames,) + frame.depth.shape)
+        color_mm[count] = frame.color
+        depth_mm[count] = frame.depth
+        timestamps[count] = frame.timestamp
+        count += 1
+
+    if color_mm is not None:
+        color_mm.flush()
+        depth_mm.flush()
+    np.save(os.path.join(out_dir, 'timestamps.npy'), timestamps)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump({'count': count,
+                   'intrinsics': source.intrinsics,
+                   'depth_scale': source.depth_scale}, f, indent=2)
+    print(f"[Source] {count} frames saved to {out_dir}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RealSense 세션 녹화")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    rec = sub.add_parser('record', help="카메라(또는 .bag) 프레임을 세션 디렉토리로 저장")
+    rec.add_argument('out_dir')
+    rec.add_argument('--frames', type=int, default=300)
+    rec.add_argument('--bag', default=None, help="카메라 대신 .bag 파일에서 변환")
+    args = parser.parse_args()
+
+    if args.cmd == 'record':
+        src = create_frame_source(args.bag) if args.bag else RealSenseSource()
+        with src:
+            record_session(src, args.out_dir, args.frames)
+    sys.exit(0)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+연속 수확 계획 (한 번 촬영한 여러 fully_ripe 딸기를 홈 복귀 없이 순서대로 수확)
+
+- 대상 위치는 base 프레임 접근 위치(motion_plan.camera_to_base)로 저장
+  'position': MAX_CAM_Z clamp 없는 딸기 기준 위치 → 프레임 간 같은 딸기 매칭 (촬영 위치가 바뀌어도 그대로)
+  'goal': 촬영 위치 기준 clamp 를 적용한 실제 이동 위치 → 경로 계산/방문 순서
+- 방문 순서: nearest-neighbor 로 초기 경로 → 2-opt 로 총 이동 거리 개선 (시작점 고정, 끝점 자유)
+  대상이 EXACT_MAX_TARGETS 개 이하이면 전체 순열 비교
+- 한 개 수확 후 새 프레임의 대상으로 남은 대상을 재확인(revalidate)하고 남은 순서를 다시 계산
+- TargetPool: 홈 자세 프레임에서 반복 관찰된(검증된) 대상을 우선순위(홈에서 가까운 순)로 보관 (pick_pipeline 용)
+"""
+
+import math
+import time
+import threading
+import itertools
+
+from motion_plan import camera_to_base
+
+EXACT_MAX_TARGETS = 7   # 이하이면 모든 순열을 비교해 최단 순서 사용
+
+
+def targets_to_base(targets, capture_pos):
+    """
+    detection 대상(카메라 좌표) → base 프레임 접근 위치 (수확점/3D 좌표가 있는 대상만)
+    clamp 는 goal 에만 적용 (먼 대상의 goal 은 촬영 위치에 따라 달라지므로 매칭에는 position 사용)
+    """
+    out = []
+    for t in targets:
+        di = t.get('di')
+        if di is None or t.get('angle') is None:
+            continue
+        out.append({'position': camera_to_base(capture_pos, di['X'], di['Y'], di['Z'], clamp=False),
+                    'goal': camera_to_base(capture_pos, di['X'], di['Y'], di['Z']),
+                    'capture_uvw': list(capture_pos[3:6]),
+                    'angle': float(t['angle']),
+                    'di': di})
+    return out
+
+
+def path_length(points, order, start):
+    """start → points[order[0]] → ... 경로 길이"""
+    total = 0.0
+    prev = start
+    for i in order:
+        total += math.dist(prev, points[i])
+        prev = points[i]
+    return total
+
+
+def nearest_neighbor_order(points, start):
+    remaining = list(range(len(points)))
+    order = []
+    prev = start
+    while remaining:
+        i = min(remaining, key=lambda j: math.dist(prev, points[j]))
+        remaining.remove(i)
+        order.append(i)
+        prev = points[i]
+    return order
+
+
+def two_opt(points, order, start, max_rounds=20):
+    """경로 구간 [i, j] 뒤집기로 길이가 줄어들면 적용, 개선이 없을 때까지 반복"""
+    order = list(order)
+    n = len(order)
+    if n < 3:
+        return order
+
+    def p(k):
+        return start if k < 0 else points[order[k]]
+
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                # (i-1 → i) 와 (j → j+1) 간선을 (i-1 → j), (i → j+1) 로 교체 (끝점 자유: j+1 없으면 0)
+                before = math.dist(p(i - 1), p(i))
+                after = math.dist(p(i - 1), p(j))
+                if j + 1 < n:
+                    before += math.dist(p(j), p(j + 1))
+                    after += math.dist(p(i), p(j + 1))
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def order_targets(points, start):
+    """총 이동 거리가 짧은 방문 순서 (points 인덱스 리스트)"""
+    if not points:
+        return []
+    if len(points) <= EXACT_MAX_TARGETS:
+        return list(min(itertools.permutations(range(len(points))),
+                        key=lambda order: path_length(points, order, start)))
+    return two_opt(points, nearest_neighbor_order(points, start), start)
+
+
+class HarvestQueue:
+    """
+    남은 수확 대상 목록
+    대상 dict: {'position': [x, y, z], 'goal': [x, y, z] (base, m), 'capture_uvw': [u, v, w], 'angle': deg,
+               'misses': int, ...}  (targets_to_base 결과)
+    """
+    def __init__(self, match_radius_m=0.03, max_misses=2):
+        self.match_radius_m = match_radius_m
+        self.max_misses = max_misses
+        self._lock = threading.Lock()
+        self.pending = []
+        self.picked = []
+        # 관찰용 카운터
+        self.counters = {'planned': 0, 'picked': 0, 'dropped': 0, 'added': 0, 'revalidated': 0}
+        self.started_at = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self.pending)
+
+    def _reorder(self, start):
+        order = order_targets([t['goal'] for t in self.pending], start)
+        self.pending = [self.pending[i] for i in order]
+
+    def plan(self, targets, start):
+        """새 수확 세션: targets 를 start(현재 툴 위치) 기준 방문 순서로 정렬"""
+        with self._lock:
+            self.pending = [dict(t, misses=0) for t in targets]
+            self.picked = []
+            self._reorder(start)
+            self.counters['planned'] += len(self.pending)
+            self.started_at = time.monotonic()
+            return list(self.pending)
+
+    def pop_next(self):
+        with self._lock:
+            return self.pending.pop(0) if self.pending else None
+
+    def mark_picked(self, target):
+        """수확한 위치 기록, 같은 딸기로 보이는 남은 대상(match_radius_m 이내) 제거"""
+        with self._lock:
+            self.picked.append(target)
+            kept = [t for t in self.pending
+                    if math.dist(t['position'], target['position']) > self.match_radius_m]
+            self.counters['dropped'] += len(self.pending) - len(kept)
+            self.pending = kept
+            self.counters['picked'] += 1
+
+    def revalidate(self, fresh, start):
+        """
+        fresh: 새 프레임에서 얻은 대상 목록 (goal 은 같은 base 프레임)
+        - position 기준 반경 match_radius_m 안에 대응 대상이 있으면 위치/각도 갱신,
+          없으면 misses 증가 → max_misses 번 연속으로 보이지 않으면 제거
+        - 이미 수확한 위치가 아닌 새 대상은 추가
+        - 남은 대상 방문 순서를 start 기준으로 다시 계산
+        """
+        with self._lock:
+            unmatched = list(fresh)
+            kept = []
+            for t in self.pending:
+                best = min(unmatched, key=lambda f: math.dist(f['position'], t['position']), default=None)
+                if best is not None and math.dist(best['position'], t['position']) <= self.match_radius_m:
+                    unmatched.remove(best)
+                    kept.append(dict(best, misses=0))
+                elif t['misses'] + 1 >= self.max_misses:
+                    self.counters['dropped'] += 1
+                else:
+                    kept.append(dict(t, misses=t['misses'] + 1))
+            for f in unmatched:
+                if all(math.dist(f['position'], p['position']) > self.match_radius_m for p in self.picked):
+                    kept.append(dict(f, misses=0))
+                    self.counters['added'] += 1
+            self.pending = kept
+            self._reorder(start)
+            self.counters['revalidated'] += 1
+            return list(self.pending)
+
+    def berries_per_hour(self):
+        with self._lock:
+            if self.started_at is None or not self.picked:
+                return 0.0
+            elapsed = time.monotonic() - self.started_at
+            return 3600.0 * len(self.picked) / elapsed if elapsed > 0 else 0.0
+
+
+class TargetPool:
+    """
+    홈 자세 프레임에서 관찰한 수확 대상 후보
+    - update: 같은 위치(match_radius_m 이내)의 대상이 min_hits 프레임 이상 관찰되면 검증된 대상
+              관찰되지 않은 프레임이 max_misses 를 넘으면 제거
+    - pop_best / peek_best: 검증된 대상 중 origin(홈 툴 위치)에서 가장 가까운 대상
+    - take_match: 미리 계산한 대상이 아직 검증된 후보로 남아 있으면 꺼냄
+    대상 dict: targets_to_base 결과 + {'hits', 'misses', 'seen_at'}
+    """
+    def __init__(self, match_radius_m=0.03, min_hits=2, max_misses=3):
+        self.match_radius_m = match_radius_m
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self._lock = threading.Lock()
+        self.candidates = []
+        self.picked = []
+        self.last_update = None
+        self.counters = {'frames': 0, 'added': 0, 'dropped': 0, 'picked': 0, 'skipped_picked': 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self.candidates)
+
+    def _near_picked(self, position):
+        return any(math.dist(position, p['position']) <= self.match_radius_m for p in self.picked)
+
+    def update(self, fresh, host_time):
+        """fresh: 한 프레임의 대상 목록 (targets_to_base 결과), host_time: 촬영 시각 (time.monotonic)"""
+        with self._lock:
+            unmatched = list(fresh)
+            kept = []
+            for c in self.candidates:
+                best = min(unmatched, key=lambda f: math.dist(f['position'], c['position']), default=None)
+                if best is not None and math.dist(best['position'], c['position']) <= self.match_radius_m:
+                    unmatched.remove(best)
+                    kept.append(dict(best, hits=c['hits'] + 1, misses=0, seen_at=host_time))
+                elif c['misses'] + 1 > self.max_misses:
+                    self.counters['dropped'] += 1
+                else:
+                    kept.append(dict(c, misses=c['misses'] + 1))
+            for f in unmatched:
+                if self._near_picked(f['position']):
+                    self.counters['skipped_picked'] += 1
+                    continue
+                kept.append(dict(f, hits=1, misses=0, seen_at=host_time))
+                self.counters['added'] += 1
+            self.candidates = kept
+            self.last_update = host_time
+            self.counters['frames'] += 1
+
+    def _best(self, origin, exclude=None):
+        ready = [c for c in self.candidates if c['hits'] >= self.min_hits and c is not exclude]
+        return min(ready, key=lambda c: math.dist(origin, c['goal']), default=None)
+
+    def peek_best(self, origin, exclude=None):
+        with self._lock:
+            return self._best(origin, exclude)
+
+    def pop_best(self, origin):
+        with self._lock:
+            best = self._best(origin)
+            if best is not None:
+                self.candidates.remove(best)
+            return best
+
+    def take_match(self, target, since=None):
+        """
+        peek_best 로 받은 대상과 같은 딸기(match_radius_m 이내, 검증된 후보)를 꺼냄, 없으면 None
+        since 이후 새 프레임이 반영됐으면 가장 최근 프레임에서도 관찰된 후보만 인정 (여전히 수확 대상인지 재확인)
+        """
+        with self._lock:
+            recheck = since is not None and self.last_update is not None and self.last_update > since
+            ready = [c for c in self.candidates
+                     if c['hits'] >= self.min_hits and not (recheck and c['misses'] > 0)]
+            best = min(ready, key=lambda c: math.dist(c['position'], target['position']), default=None)
+            if best is None or math.dist(best['position'], target['position']) > self.match_radius_m:
+                return None
+            self.candidates.remove(best)
+            return best
+
+    def mark_picked(self, target):
+        """수확한 위치 기록, 같은 위치의 후보 제거 (이후 프레임에서도 다시 추가하지 않음)"""
+        with self._lock:
+            self.picked.append(target)
+            self.candidates = [c for c in self.candidates
+                               if math.dist(c['position'], target['position']) > self.match_radius_m]
+            self.counters['picked'] += 1
+
+    def validated_count(self):
+        with self._lock:
+            return sum(1 for c in self.candidates if c['hits'] >= self.min_hits)
@@ -1,13 +1,39 @@
-from neuromeka import IndyDCP2
+import os
 import time
 import math
 
+from motion_plan import plan_pick_waypoints, plan_pick_waypoints_to, camera_to_tool_move
+from util.pipeline import StageTimer
+import metrics
+
+try:
+    from neuromeka import IndyDCP2
+except ImportError:  # 시뮬레이터(INDY_SIM=1)만 사용하는 환경
+    IndyDCP2 = None
+
+# 'waypoint'  : 접근 경로를 task waypoint 목록 한 번으로 실행 (wait 1회)
+# 'sequential': 기존 방식 (이동마다 wait + 고정 대기, 비교 측정용)
+MOTION_MODE = os.environ.get('INDY_MOTION_MODE', 'waypoint')
+# 1 이면 실제 로봇 대신 indy_sim.SimIndyDCP2 사용 (INDY_SIM_SCALE: 이동 시간 배율)
+SIMULATE = os.environ.get('INDY_SIM', '0') == '1'
+SIM_TIME_SCALE = float(os.environ.get('INDY_SIM_SCALE', '1.0'))
+# waypoint 실행에 필요한 IndyDCP2 호출 (하나라도 없으면 sequential / 점별 이동)
+TASK_WAYPOINT_API = ('clear_task_waypoints', 'push_back_task_waypoint', 'execute_task_waypoints')
+
+
 class indyCTL():
-    def __init__(self, ip="192.168.0.6"):
+    def __init__(self, ip="192.168.0.6", motion_mode=MOTION_MODE,
+                 simulate=SIMULATE, sim_time_scale=SIM_TIME_SCALE):
         
         self.robot_ip = ip                          # 로봇 컨트롤 박스의 IP 주소
         self.robot_name = 'NRMK-Indy7'              # 로봇 이름
-        self.indy = IndyDCP2(server_ip=self.robot_ip, robot_name=self.robot_name)
+        if simulate:
+            from indy_sim import SimIndyDCP2
+            self.indy = SimIndyDCP2(server_ip=self.robot_ip, robot_name=self.robot_name,
+                                    time_scale=sim_time_scale)
+        else:
+            self.indy = IndyDCP2(server_ip=self.robot_ip, robot_name=self.robot_name)
+        self.time_scale = sim_time_scale if simulate else 1.0   # 고정 대기 시간 배율
 
 
         self.indy.connect()                         # 연결
@@ -23,6 +49,13 @@ class indyCTL():
         print(self.indy.get_task_vel_level())
         print(self.indy.get_task_vel_level())
         
+        self.motion_mode = motion_mode
+        self.has_waypoints = all(hasattr(self.indy, name) for name in TASK_WAYPOINT_API)
+        if motion_mode == 'waypoint' and not self.has_waypoints:
+            print("[INDY] task waypoint 미지원 → sequential 모드 사용")
+            self.motion_mode = 'sequential'
+        self.timer = StageTimer()                   # 픽킹 동작 시간 (set_point / pick_move / pick_cycle)
+
         print("Ready")
 
     def set_point(self, cam_x, depth):
@@ -36,31 +69,78 @@ class indyCTL():
         radian          = cam_x/(distance+robot_len+camera_distances)
         angle           = math.degrees(radian)
 
-        self.indy.set_task_base(0)
-        print(self.indy.get_control_torque()) 
-        self.indy.joint_move_by([angle,0,0,0,0,0])
-        self.indy.wait_for_move_finish()
+        with self.timer.measure('set_point'), metrics.span('set_point', joint1_deg=angle):
+            self.indy.set_task_base(0)
+            self.indy.joint_move_by([angle,0,0,0,0,0])
+            self.indy.wait_for_move_finish()
 
         return "finish"
 
     def run(self, cam_x=0, cam_y=0, cam_z=0, angle=0):
 
         # 두번째 사진촬영 후
-        camera_distance = 0.04
-        end_tool=0.17
-        x               = -cam_x
-        y               = cam_y
-        if cam_z > 0.32:
-            z           = 0.3-end_tool
-        else:
-            z           = cam_z-camera_distance-end_tool
-        tool_angle      = angle
-        cam_offset      = 0.1
+        tool_move  = camera_to_tool_move(cam_x, cam_y, cam_z)
+        tool_angle = angle
+
+        with self.timer.measure(f'pick_move_{self.motion_mode}'), metrics.span('approach', mode=self.motion_mode):
+            if self.motion_mode == 'waypoint':
+                self._run_waypoints(tool_move, tool_angle)
+            else:
+                self._run_sequential(tool_move, tool_angle)
+        status = self.indy.get_robot_status()
+        print(status)
+
+        return
+
+    def plan_pick(self, goal, capture_uvw, angle=0, retreat_m=0.0, start_pos=None):
+        """pick_at 의 waypoint 를 미리 계산 (start_pos: 출발 task pose, 기본: 현재 위치)"""
+        if start_pos is None:
+            start_pos = self.indy.get_task_pos()
+        return plan_pick_waypoints_to(start_pos, goal, capture_uvw, tool_angle=angle, retreat_m=retreat_m)
+
+    def pick_at(self, goal, capture_uvw, angle=0, retreat_m=0.0, waypoints=None):
+        """
+        연속 수확: 현재 위치에서 (후퇴 →) base 프레임 접근 위치 goal 로 바로 이동 (홈 복귀 없음)
+        goal / capture_uvw: motion_plan.camera_to_base 결과와 촬영 시점 자세
+        waypoints: plan_pick 으로 미리 계산한 경로 (현재 위치에서 출발하는 경로여야 함)
+        """
+        with self.timer.measure('pick_move_chained'), \
+                metrics.span('approach', mode='chained', precomputed=waypoints is not None):
+            if waypoints is None:
+                waypoints = self.plan_pick(goal, capture_uvw, angle=angle, retreat_m=retreat_m)
+            self._execute_waypoints(waypoints)
+
+    def retreat(self, distance_m=0.1):
+        """현재 tool -z 방향으로 후퇴 (다음 대상 재확인 촬영 위치)"""
+        with metrics.span('retreat', distance_m=distance_m):
+            self.indy.set_task_base(1)
+            self.indy.task_move_by([0, 0, -distance_m, 0, 0, 0])
+            self.indy.wait_for_move_finish()
+
+    def _execute_waypoints(self, waypoints):
+        self.indy.set_task_base(0)
+        if not self.has_waypoints:
+            # waypoint API 가 없는 클라이언트 (연속 수확 경로 등): 절대 위치로 한 점씩 이동
+            for wp in waypoints:
+                self.indy.task_move_to(wp)
+                self.indy.wait_for_move_finish()
+            return
+        self.indy.clear_task_waypoints()
+        for wp in waypoints:
+            self.indy.push_back_task_waypoint(wp)
+        self.indy.execute_task_waypoints()
+        self.indy.wait_for_move_finish()
+
+    def _run_waypoints(self, tool_move, tool_angle):
+        # 손목 회전 → tool 프레임 접근 → 손목 복귀 + yaw 를 절대 waypoint 로 계산해 한 번에 실행
+        self._execute_waypoints(plan_pick_waypoints(self.indy.get_task_pos(), tool_move, tool_angle))
 
+    def _run_sequential(self, tool_move, tool_angle):
+        # 기존 방식 그대로 (이동마다 wait, 마지막 고정 대기)
         self.indy.joint_move_by([0,0,0,0,0,20])
         self.indy.wait_for_move_finish()
         self.indy.set_task_base(1)
-        self.indy.task_move_by([y-cam_offset,x,z,0,0,0]) # x(+ 아래, - 위), y(+ 왼쪽, - 오른쪽), z(+ 접근, - 후퇴) 마지막: yaw : 돌리는거
+        self.indy.task_move_by([*tool_move,0,0,0]) # x(+ 아래, - 위), y(+ 왼쪽, - 오른쪽), z(+ 접근, - 후퇴) 마지막: yaw : 돌리는거
         self.indy.wait_for_move_finish()
 
         self.indy.set_task_base(0)
@@ -69,14 +149,17 @@ class indyCTL():
 
         self.indy.task_move_by([0,0,0,0,0,tool_angle]) # x(+ 아래, - 위), y(+ 왼쪽, - 오른쪽), z(+ 접근, - 후퇴) 마지막: yaw : 돌리는거
         self.indy.wait_for_move_finish()
-        time.sleep(2)
-        status = self.indy.get_robot_status()
-        print(status)
+        time.sleep(2 * self.time_scale)
 
-        return
+    def timing_summary(self):
+        snap = self.timer.snapshot()
+        return " | ".join(f"{stage} avg {v['avg_ms'] / 1000.0:.2f}s (n={v['count']})"
+                          for stage, v in sorted(snap.items()))
 
 
     def close(self):
+        if self.timer.snapshot():
+            print(f"[INDY] 동작 시간: {self.timing_summary()}")
         self.indy.go_home()
         self.indy.wait_for_move_finish()
         print("Task Pos: ", self.indy.get_task_pos())
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+IndyDCP2 시뮬레이터 (로봇 없이 indyCTL / main.py 실행·측정용)
+
+neuromeka.IndyDCP2 에서 사용하는 호출만 같은 이름으로 구현하고,
+속도 레벨 기반 사다리꼴 속도 프로파일로 이동 시간을 모델링한다.
+
+- 사용:
+    from indy_sim import SimIndyDCP2
+    indy = SimIndyDCP2(server_ip="sim", robot_name="NRMK-Indy7")
+    indyCTL(simulate=True)           # 또는 INDY_SIM=1 환경변수
+
+- 기구학 근사 (IK/FK 없음):
+    joint1 회전 → base z 축 기준 task pose 회전, joint6 회전 → tool z 축 회전,
+    나머지 관절은 관절값만 갱신. task 이동은 task pose 만 갱신.
+- time_scale < 1 이면 이동 시간을 비율만큼 줄여서 실행 (통계는 원래 시간 기준)
+"""
+
+import math
+import time
+import threading
+
+import numpy as np
+
+from motion_plan import uvw_to_rot, rot_to_uvw
+
+HOME_JOINT_POS = [0.0, -15.0, -90.0, 0.0, -75.0, 0.0]       # deg
+HOME_TASK_POS = [0.350, -0.1865, 0.5221, 0.0, 180.0, 0.0]  # m, deg
+
+# 속도 레벨 1 당 최대 속도 (레벨 1~9 선형)
+JOINT_VEL_PER_LEVEL = 10.0        # deg/s
+TASK_VEL_PER_LEVEL = 0.05         # m/s
+TASK_ROT_VEL_PER_LEVEL = 10.0     # deg/s
+ACCEL_TIME_S = 0.5                # 0 → 최대 속도 가속 시간
+COMMAND_LATENCY_S = 0.004         # DCP 요청 1회 왕복
+
+
+class _Motion:
+    """
+    keyframe (task pose, joint pos) 사이를 하나의 속도 프로파일로 이동
+    s: 경로 진행량 (최대 속도 기준 소요 시간 단위, 0 ~ s_total)
+    """
+    def __init__(self, keyframes, seg_times, t0, time_scale, v0=0.0, decel_only=False):
+        self.keyframes = keyframes
+        self.seg_s = np.cumsum([0.0] + [float(t) for t in seg_times])
+        self.s_total = float(self.seg_s[-1])
+        self.t0 = t0
+        self.time_scale = time_scale
+        self.v0 = v0
+        self.decel_only = decel_only
+        ta = ACCEL_TIME_S
+        if decel_only:
+            self.duration = v0 * ta
+        elif self.s_total >= ta:
+            self.duration = self.s_total + ta
+        else:
+            self.duration = 2.0 * math.sqrt(self.s_total * ta)
+
+    def _profile(self, tau):
+        """tau(시뮬레이션 시간) → (진행량 s, 정규화 속도 v)"""
+        ta = ACCEL_TIME_S
+        tau = min(max(tau, 0.0), self.duration)
+        if self.decel_only:
+            return self.v0 * tau - tau * tau / (2.0 * ta), self.v0 - tau / ta
+        half = self.duration / 2.0
+        t_acc = min(ta, half)
+        v_peak = t_acc / ta
+        if tau < t_acc:
+            return tau * tau / (2.0 * ta), tau / ta
+        if tau <= self.duration - t_acc:
+            return t_acc * t_acc / (2.0 * ta) + v_peak * (tau - t_acc), v_peak
+        rest = self.duration - tau
+        return self.s_total - rest * rest / (2.0 * ta), rest / ta
+
+    def elapsed(self, now):
+        return (now - self.t0) / self.time_scale
+
+    def done(self, now):
+        return self.elapsed(now) >= self.duration
+
+    def state(self, now):
+        """(task pose, joint pos, 진행량 s, 정규화 속도 v)"""
+        s, v = self._profile(self.elapsed(now))
+        s = min(max(s, 0.0), self.s_total)
+        return self.at(s) + (s, v)
+
+    def at(self, s):
+        if self.s_total <= 0.0:
+            pose, q = self.keyframes[-1]
+            return list(pose), list(q)
+        i = int(np.searchsorted(self.seg_s, s, side='right')) - 1
+        i = min(max(i, 0), len(self.keyframes) - 2)
+        span = self.seg_s[i + 1] - self.seg_s[i]
+        f = 0.0 if span <= 0 else float((s - self.seg_s[i]) / span)
+        (p_a, q_a), (p_b, q_b) = self.keyframes[i], self.keyframes[i + 1]
+        pose = [a + f * (b - a) for a, b in zip(p_a, p_b)]
+        q = [a + f * (b - a) for a, b in zip(q_a, q_b)]
+        return pose, q
+
+
+class SimIndyDCP2:
+    def __init__(self, server_ip="sim", robot_name="NRMK-Indy7", time_scale=1.0,
+                 home_joint_pos=HOME_JOINT_POS, home_task_pos=HOME_TASK_POS):
+        self.server_ip = server_ip
+        self.robot_name = robot_name
+        self.time_scale = time_scale
+        self.home_joint_pos = list(home_joint_pos)
+        self.home_task_pos = list(home_task_pos)
+
+        self._lock = threading.Lock()
+        self._q = list(home_joint_pos)
+        self._pose = list(home_task_pos)
+        self._motion = None
+        self._task_base = 0
+        self._joint_vel_level = 3
+        self._task_vel_level = 3
+        self._task_waypoints = []
+
+        # 통계 (시뮬레이션 시간 기준, time_scale 과 무관)
+        self.n_commands = 0
+        self.n_moves = 0
+        self.motion_s = 0.0
+
+    # ------------------------- 내부 -------------------------
+
+    def _request(self):
+        self.n_commands += 1
+        if COMMAND_LATENCY_S > 0:
+            time.sleep(COMMAND_LATENCY_S * self.time_scale)
+
+    def _sync(self, now=None):
+        """진행 중인 이동을 현재 시각 기준으로 반영 (lock 안에서 호출)"""
+        if self._motion is None:
+            return None
+        now = time.monotonic() if now is None else now
+        pose, q, s, v = self._motion.state(now)
+        self._pose, self._q = pose, q
+        if self._motion.done(now):
+            self._motion = None
+            return None
+        return s, v
+
+    def _start(self, keyframes, seg_times):
+        """keyframes[0] 은 현재 상태, 이후 목표 상태들"""
+        with self._lock:
+            if self._sync() is not None:
+                print("[SIM] busy: move ignored")
+                return False
+            motion = _Motion(keyframes, seg_times, time.monotonic(), self.time_scale)
+            if motion.duration > 0:
+                self._motion = motion
+            else:
+                self._pose, self._q = list(keyframes[-1][0]), list(keyframes[-1][1])
+            self.n_moves += 1
+            self.motion_s += motion.duration
+            return True
+
+    def _joint_time(self, q_a, q_b):
+        return max(abs(b - a) for a, b in zip(q_a, q_b)) / (JOINT_VEL_PER_LEVEL * self._joint_vel_level)
+
+    def _task_time(self, p_a, p_b):
+        lin = math.dist(p_a[:3], p_b[:3]) / (TASK_VEL_PER_LEVEL * self._task_vel_level)
+        # u/v/w 는 각도 차이를 [-180, 180] 으로 wrap (179° → -179° 는 2° 회전)
+        rot = max(abs((b - a + 180.0) % 360.0 - 180.0) for a, b in zip(p_a[3:], p_b[3:]))
+        rot /= TASK_ROT_VEL_PER_LEVEL * self._task_vel_level
+        return max(lin, rot)
+
+    def _current(self):
+        with self._lock:
+            self._sync()
+            return list(self._pose), list(self._q)
+
+    # ------------------------- 연결/설정 -------------------------
+
+    def connect(self):
+        print(f"[SIM] IndyDCP2 simulator ({self.robot_name}, time_scale={self.time_scale})")
+        return True
+
+    def disconnect(self):
+        pass
+
+    def reset_robot(self):
+        self._request()
+        with self._lock:
+            self._motion = None
+
+    def set_joint_vel_level(self, level):
+        self._request()
+        self._joint_vel_level = int(min(max(level, 1), 9))
+
+    def set_task_vel_level(self, level):
+        self._request()
+        self._task_vel_level = int(min(max(level, 1), 9))
+
+    def get_joint_vel_level(self):
+        self._request()
+        return self._joint_vel_level
+
+    def get_task_vel_level(self):
+        self._request()
+        return self._task_vel_level
+
+    def set_task_base(self, mode):
+        """0: 기준(base) 프레임, 1: tool 프레임 (task_move_by 에 적용)"""
+        self._request()
+        self._task_base = int(mode)
+
+    # ------------------------- 상태 -------------------------
+
+    def get_task_pos(self):
+        self._request()
+        return self._current()[0]
+
+    def get_joint_pos(self):
+        self._request()
+        return self._current()[1]
+
+    def get_control_torque(self):
+        self._request()
+        return [0.0] * 6
+
+    def get_robot_status(self):
+        self._request()
+        with self._lock:
+            busy = self._sync() is not None
+        home = (not busy) and all(abs(a - b) < 1e-3 for a, b in zip(self._q, self.home_joint_pos))
+        return {'ready': True, 'emergency': False, 'collision': False, 'error': False,
+                'busy': busy, 'movedone': not busy, 'home': home, 'zero': False,
+                'resetting': False, 'teaching': False, 'direct_teaching': False}
+
+    def wait_for_move_finish(self):
+        while True:
+            with self._lock:
+                motion = self._motion
+                if self._sync() is None:
+                    return
+                remaining = (motion.duration - motion.elapsed(time.monotonic())) * self.time_scale
+            time.sleep(min(max(remaining, 0.001), 0.01))
+
+    # ------------------------- 이동 -------------------------
+
+    def go_home(self):
+        self._request()
+        pose, q = self._current()
+        # task 이동은 관절값을 갱신하지 않으므로 task pose 차이로도 시간 추정
+        home = list(self.home_task_pos)
+        home[3:] = rot_to_uvw(uvw_to_rot(*home[3:]), pose[3:])
+        t = max(self._joint_time(q, self.home_joint_pos), self._task_time(pose, home))
+        self._start([(pose, q), (home, list(self.home_joint_pos))], [t])
+
+    def joint_move_to(self, q_target):
+        self._request()
+        pose, q = self._current()
+        self.joint_move_by([b - a for a, b in zip(q, q_target)], _request=False)
+
+    def joint_move_by(self, dq, _request=True):
+        if _request:
+            self._request()
+        pose, q = self._current()
+        q_b = [a + d for a, d in zip(q, dq)]
+        # joint1: base z 축 회전, joint6: tool z 축 회전
+        R = uvw_to_rot(*pose[3:])
+        Rz1 = uvw_to_rot(0.0, 0.0, dq[0])
+        p_b = Rz1 @ np.asarray(pose[:3])
+        R_b = Rz1 @ R @ uvw_to_rot(0.0, 0.0, dq[5])
+        pose_b = [float(v) for v in p_b] + rot_to_uvw(R_b, pose[3:])
+        self._start([(pose, q), (pose_b, q_b)], [self._joint_time(q, q_b)])
+
+    def task_move_to(self, p_target):
+        self._request()
+        pose, q = self._current()
+        target = list(p_target[:3]) + rot_to_uvw(uvw_to_rot(*p_target[3:]), pose[3:])
+        self._start([(pose, q), (target, q)], [self._task_time(pose, target)])
+
+    def task_move_by(self, dp):
+        self._request()
+        pose, q = self._current()
+        if self._task_base == 1:
+            R = uvw_to_rot(*pose[3:])
+            p_b = np.asarray(pose[:3]) + R @ np.asarray(dp[:3], dtype=np.float64)
+            R_b = R @ uvw_to_rot(*dp[3:])
+            target = [float(v) for v in p_b] + rot_to_uvw(R_b, pose[3:])
+        else:
+            target = [a + d for a, d in zip(pose, dp)]
+        self._start([(pose, q), (target, q)], [self._task_time(pose, target)])
+
+    def stop_motion(self):
+        """현재 속도에서 감속 정지 (남은 경로 안에서)"""
+        self._request()
+        with self._lock:
+            now = time.monotonic()
+            state = self._sync(now)
+            if state is None:
+                return
+            s, v = state
+            motion = self._motion
+            s_stop = min(motion.s_total, s + v * v * ACCEL_TIME_S / 2.0)
+            stop_pose, stop_q = motion.at(s_stop)
+            seg = s_stop - s
+            if seg <= 0.0 or v <= 0.0:
+                self._motion = None
+                return
+            # 감속 구간만 별도 프로파일로 (진행량 단위를 그대로 유지)
+            self.motion_s -= motion.duration - motion.elapsed(now)
+            decel = _Motion([(self._pose, self._q), (stop_pose, stop_q)], [seg], now,
+                            self.time_scale, v0=v, decel_only=True)
+            self.motion_s += decel.duration
+            self._motion = decel
+
+    # task waypoint (indyCTL._run_waypoints)
+    def clear_task_waypoints(self):
+        self._request()
+        self._task_waypoints = []
+
+    def push_back_task_waypoint(self, p):
+        self._request()
+        self._task_waypoints.append(list(p))
+
+    def execute_task_waypoints(self):
+        """waypoint 들을 멈추지 않고 하나의 속도 프로파일로 통과"""
+        self._request()
+        pose, q = self._current()
+        keyframes, seg_times = [(pose, q)], []
+        for wp in self._task_waypoints:
+            prev = keyframes[-1][0]
+            target = list(wp[:3]) + rot_to_uvw(uvw_to_rot(*wp[3:]), prev[3:])
+            seg_times.append(self._task_time(prev, target))
+            keyframes.append((target, q))
+        if seg_times:
+            self._start(keyframes, seg_times)
@@ -10,28 +10,67 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.insert(0, BASE_DIR)
 
-from detection import main as run_detection, register_di_callback, register_di_callback2
+from detection import (main as run_detection, register_di_callback, register_di_callback2,
+                       register_busy_callback, register_targets_callback, report_harvest)
 from indy7 import indyCTL
 from endeffector import MotorControl
 from tof_sensor import ToF_Sensor
+from opencr_bus import OpenCRBus
+from tof_approach import approach_to_distance
+from harvest_planner import HarvestQueue, TargetPool, targets_to_base
+from pick_pipeline import PickPipeline
+import metrics
 
 # --- 초기화 ---
 indy = indyCTL(ip="192.168.0.6")
-eff  = MotorControl()
-tof  = ToF_Sensor()
+bus  = OpenCRBus()                                  # 엔드이펙터/ToF 가 OpenCR 연결 하나를 공유
+eff  = MotorControl(shared_opencr=bus.view("ee"))
+tof  = ToF_Sensor(shared_opencr=bus.view("tof"))
+tof.start_sampling()                                # 거리 보정 시 이미 모인 샘플 사용
 
 # 동시 호출 방지용 락 & 상태 플래그
 _seq_lock = threading.Lock()
 _is_busy  = False
+_revalidating = False   # 연속 수확 중 대상 재확인 촬영 (이 동안은 전체 인식 유지)
+
+# ---------- 연속 수확 ----------
+HARVEST_MULTI = True    # True: 한 번에 보이는 fully_ripe 전부를 홈 복귀 없이 순서대로 수확
+RETREAT_M     = 0.10    # 수확 후 재확인 촬영 위치까지 후퇴 거리
+harvest_queue = HarvestQueue(match_radius_m=0.03, max_misses=2)
+
+_targets_cond   = threading.Condition()
+_latest_targets = (None, [])    # (host_time, targets) 최신 전체 인식 프레임
+_view_ready_at  = 0.0           # set_point 정지 시각 (이후 프레임만 대상 계획에 사용)
+
+# ---------- 파이프라인 수확 ----------
+# True: 키 '1' 로 시작, 홈 자세 프레임에서 검증된 대상을 홈 복귀 즉시 연속 수확 (set_point/트리거 대기 없음)
+HARVEST_PIPELINE = False
+
+# 픽킹 시퀀스 파라미터 (on_di2 / 파이프라인 공통)
+PICK_PARAMS = dict(
+    spin_speed=100,
+    t_F_reverse=2.0,
+    t_S_reverses=2.0,
+    pause=1.0,
+    t_forward=3.5,
+    target_mm=70,         # 70mm
+    tol_mm=10,
+    tof_method="mean",    # 평균값 사용
+    tof_approach="continuous",
+    grip_mode="feedback"  # stall 감지 시 정지 (t_* 는 최대 시간)
+)
 
 
 # ---------- ToF 유틸 ----------
-def read_tof_mm(samples=5, timeout_s=2.0, method="mean"):
+def read_tof_mm(samples=5, timeout_s=2.0, method="mean", since=None):
     """
     ToF를 여러 번 읽어 거리(mm) 반환.
     method: 'median' 또는 'mean'
+    since: 백그라운드 샘플링 중이면 이 시각(time.monotonic) 이후 샘플 사용
     """
-    if method == "median":
+    if since is not None and tof.sampling:
+        d = tof.wait_for_samples(since, n=samples, timeout_s=timeout_s, method=method)
+    elif method == "median":
         d = tof.read_med_mm(samples=samples, timeout_s=timeout_s)
     else:
         d = tof.read_avg_mm(samples=samples, timeout_s=timeout_s)
@@ -41,46 +80,79 @@ def read_tof_mm(samples=5, timeout_s=2.0, method="mean"):
 
 def adjust_to_target_distance_mm(target_mm=70, tol_mm=10,
                                  step_mm=60, max_iters=8,
-                                 method="mean"):
+                                 method="mean", since=None):
     """
     현재 ToF 거리 기준으로 z축(툴 프레임)만 이동해서 target_mm ± tol_mm 범위에 수렴.
     - dist > target → 너무 멀다 → +z(접근)
     - dist < target → 너무 가깝다 → -z(후퇴)
+    since: 첫 측정에 사용할 샘플 시작 시각 (time.monotonic, 기본: 지금)
     """
+    if since is None:
+        since = time.monotonic()
     for i in range(max_iters):
-        dist = read_tof_mm(samples=4, timeout_s=1.2, method=method)
-        if dist is None or dist <= 0:
-            print("[ToF] 유효한 거리값이 없어 보정을 스킵합니다.")
-            return False
-
-        err = dist - target_mm
-        print(f"[ToF] 현재={dist} mm, 목표={target_mm} mm, 오차={err} mm")
-
-        if abs(err) <= tol_mm:
-            print("[ToF] 목표 범위에 도달 (보정 완료)")
-            return True
-
-        # 이동량 결정 (최대 step_mm)
-        if err > 0:
-            # 멀다 → 접근(+z)
-            z_mm = min(step_mm, err)
-        else:
-            # 가깝다 → 후퇴(-z)
-            z_mm = -min(step_mm, -err)
-
-        z_move_m = z_mm / 1000.0
-        print(f"[ToF] z축 이동: {z_mm} mm ({z_move_m:.3f} m)")
-
-        # 툴/작업 좌표계에서 z만 이동
-        indy.indy.set_task_base(1)
-        indy.indy.task_move_by([0.0, 0.0, z_move_m, 0.0, 0.0, 0.0])
-        indy.indy.wait_for_move_finish()
-        time.sleep(0.1)  # 관성/센서 안정화
+        with metrics.span('tof_step', iteration=i) as sp:
+            dist = read_tof_mm(samples=4, timeout_s=1.2, method=method, since=since)
+            if dist is None or dist <= 0:
+                print("[ToF] 유효한 거리값이 없어 보정을 스킵합니다.")
+                return False
+
+            err = dist - target_mm
+            sp.set(dist_mm=dist, err_mm=err)
+            print(f"[ToF] 현재={dist} mm, 목표={target_mm} mm, 오차={err} mm")
+
+            if abs(err) <= tol_mm:
+                print("[ToF] 목표 범위에 도달 (보정 완료)")
+                return True
+
+            # 이동량 결정 (최대 step_mm)
+            if err > 0:
+                # 멀다 → 접근(+z)
+                z_mm = min(step_mm, err)
+            else:
+                # 가깝다 → 후퇴(-z)
+                z_mm = -min(step_mm, -err)
+
+            z_move_m = z_mm / 1000.0
+            print(f"[ToF] z축 이동: {z_mm} mm ({z_move_m:.3f} m)")
+
+            # 툴/작업 좌표계에서 z만 이동
+            indy.indy.set_task_base(1)
+            indy.indy.task_move_by([0.0, 0.0, z_move_m, 0.0, 0.0, 0.0])
+            indy.indy.wait_for_move_finish()
+            since = time.monotonic() + 0.1  # 관성/센서 안정화 이후 샘플만 사용
 
     print("[ToF] 최대 보정 횟수 도달 (잔여 오차 허용)")
     return False
 
 
+# ---------- 대상 수신 ----------
+def on_targets(targets, host_time):
+    """detection 메인 루프에서 전체 인식 프레임마다 호출"""
+    global _latest_targets
+    with _targets_cond:
+        _latest_targets = (host_time, targets)
+        _targets_cond.notify_all()
+
+
+def wait_fresh_targets(since, timeout_s=2.0):
+    """since(time.monotonic) 이후 촬영된 프레임의 대상 목록, 시간 초과 시 None"""
+    global _revalidating
+    _revalidating = True            # 동작 중 monitor 모드 해제 → 전체 인식 프레임 수신
+    deadline = time.monotonic() + timeout_s
+    try:
+        with _targets_cond:
+            while True:
+                host_time, targets = _latest_targets
+                if host_time is not None and host_time >= since:
+                    return targets
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                _targets_cond.wait(remaining)
+    finally:
+        _revalidating = False
+
+
 # ---------- 픽킹 시퀀스 ----------
 def perform_pick_sequence(di: dict, angle: float,
                           spin_speed: int = 100,
@@ -91,35 +163,130 @@ def perform_pick_sequence(di: dict, angle: float,
                           settle: float = 0.15,
                           target_mm: int = 70,
                           tol_mm: int = 10,
-                          tof_method: str = "mean"):
+                          tof_method: str = "mean",
+                          tof_approach: str = "continuous",
+                          grip_mode: str = "feedback",
+                          grip_hold_s: float = 0.3,
+                          goal=None, capture_uvw=None, waypoints=None,
+                          overlap_reopen: bool = False):
     """
-    1) 2차 접근·정렬 (indy.run)
+    1) 2차 접근·정렬 (indy.run, goal 이 주어지면 현재 위치에서 goal 로 바로 이동, waypoints: 미리 계산한 경로)
     2) ToF 70 mm 거리 보정 (±tol)
+       tof_approach: 'continuous' (이동 중 ToF 로 정지, 샘플링 중일 때만) / 'step' (측정 → 이동 반복)
     3) 엔드이펙터: 열기 → 닫기 → 다시 열기(마지막만 restore)
+       grip_mode: 'feedback' (stall/목표 위치에서 정지, t_* 는 timeout) / 'timed' (t_* 동안 고정 회전 + pause)
+       overlap_reopen: True 면 마지막 "재열기"를 기다리지 않고 반환 (후퇴/홈 복귀와 동시에 진행,
+                       이후 엔드이펙터 동작은 FIFO 로 재열기 이후에 실행됨)
+    return: 재열기 EffectorAction
     """
     # 1) 접근·정렬
-    indy.run(cam_x=di.get("X"), cam_y=di.get("Y"), cam_z=di.get("Z"), angle=angle)
-    time.sleep(settle)  # 마지막 정렬 후 안정화
+    if goal is not None:
+        indy.pick_at(goal, capture_uvw, angle=angle, waypoints=waypoints)
+    else:
+        indy.run(cam_x=di.get("X"), cam_y=di.get("Y"), cam_z=di.get("Z"), angle=angle)
+    if tof.sampling:
+        since = time.monotonic() + settle  # 마지막 정렬 후 안정화 이후 샘플만 사용
+    else:
+        time.sleep(settle)  # 마지막 정렬 후 안정화
+        since = None
 
     # 2) ToF 거리 보정
     print("[ToF] 거리 보정 시작")
-    adjust_to_target_distance_mm(target_mm=target_mm, tol_mm=tol_mm,
-                                 step_mm=60, max_iters=8, method=tof_method)
-
-    # 보정 후 최종 거리 한 번 더 출력
-    _final = read_tof_mm(samples=4, timeout_s=1.2, method=tof_method)
-    print(f"[ToF] 최종 거리 확인: {_final if _final is not None else 'None'} mm")
+    with metrics.span('tof_correction', mode=tof_approach) as sp:
+        approached = None
+        if tof_approach == "continuous" and tof.sampling:
+            if since is not None:
+                time.sleep(max(0.0, since - time.monotonic()))
+            approached = approach_to_distance(indy.indy, tof, target_mm=target_mm, tol_mm=tol_mm)
+            since = time.monotonic() + 0.1
+        if approached is None:
+            if tof_approach == "continuous":
+                metrics.count('tof_step_fallback')
+            adjust_to_target_distance_mm(target_mm=target_mm, tol_mm=tol_mm,
+                                         step_mm=60, max_iters=8, method=tof_method, since=since)
+
+        # 보정 후 최종 거리 한 번 더 출력
+        _final = read_tof_mm(samples=4, timeout_s=1.2, method=tof_method)
+        print(f"[ToF] 최종 거리 확인: {_final if _final is not None else 'None'} mm")
+        sp.set(final_mm=_final)
+    if _final is not None:
+        metrics.observe('tof_final_error_mm', abs(_final - target_mm))
 
     # 3) 엔드이펙터 동작 (열기 → 닫기 → 다시 열기)
-    eff.rotate_for(seconds=t_F_reverse, direction=+1, speed=spin_speed, restore_mode=False)
-    time.sleep(pause)
+    if grip_mode == "feedback":
+        # 열림 끝(stall)까지 열기 → 줄기에 걸릴 때까지 닫기 → 닫은 만큼 다시 열기
+        eff.grip_async(direction=+1, speed=spin_speed, timeout_s=t_F_reverse).result()
+        closed = eff.grip_async(direction=-1, speed=spin_speed, timeout_s=t_forward).result()
+        with metrics.span('grip_hold'):
+            time.sleep(grip_hold_s)
+        report_harvest()
+        metrics.count('harvested')
+        reopen = eff.grip_async(direction=+1, speed=spin_speed, timeout_s=t_S_reverses,
+                                travel_deg=closed['travel_deg'], restore_mode=True)
+    else:
+        eff.rotate_for(seconds=t_F_reverse, direction=+1, speed=spin_speed, restore_mode=False)
+        time.sleep(pause)
 
-    eff.rotate_for(seconds=t_forward, direction=-1, speed=spin_speed, restore_mode=False)
-    time.sleep(pause)
+        eff.rotate_for(seconds=t_forward, direction=-1, speed=spin_speed, restore_mode=False)
+        time.sleep(pause)
+        report_harvest()
+        metrics.count('harvested')
 
-    # 마지막 동작에서만 모드 복구
-    eff.rotate_for(seconds=t_S_reverses, direction=+1, speed=spin_speed, restore_mode=True)
-    time.sleep(1.0)
+        # 마지막 동작에서만 모드 복구
+        reopen = eff.rotate_for_async(seconds=t_S_reverses, direction=+1, speed=spin_speed, restore_mode=True)
+    if not overlap_reopen:
+        reopen.result()
+        time.sleep(1.0)
+    return reopen
+
+
+def perform_harvest_session(di: dict, angle: float, settle: float = 0.15, **pick_kwargs):
+    """
+    연속 수확: set_point 이후 정지 상태 프레임의 모든 대상을 방문 순서대로 수확 (사이에 홈 복귀 없음)
+    대상마다 후퇴 → 새 프레임으로 남은 대상 재확인 → 남은 순서 재계산
+    대상 목록을 얻지 못하면 di/angle 한 개만 수확
+    """
+    capture_pos = indy.indy.get_task_pos()
+    fresh = wait_fresh_targets(since=_view_ready_at + settle)
+    planned = targets_to_base(fresh or [], capture_pos)
+    if not planned:
+        perform_pick_sequence(di, angle, settle=settle, **pick_kwargs)
+        return 1
+
+    harvest_queue.plan(planned, start=capture_pos[:3])
+    print(f"[HARVEST] 대상 {len(planned)}개 계획")
+    t0 = time.monotonic()
+    n_picked = 0
+    while True:
+        target = harvest_queue.pop_next()
+        if target is None:
+            break
+        perform_pick_sequence(target['di'], target['angle'], settle=settle,
+                              goal=target['goal'], capture_uvw=target['capture_uvw'], **pick_kwargs)
+        harvest_queue.mark_picked(target)
+        n_picked += 1
+        if len(harvest_queue) == 0:
+            break
+
+        # 후퇴 후 정지 상태에서 남은 대상 재확인 (재열기는 후퇴와 동시에 진행)
+        indy.retreat(RETREAT_M)
+        with metrics.span('revalidate') as sp:
+            pos = indy.indy.get_task_pos()
+            fresh = wait_fresh_targets(since=time.monotonic() + settle)
+            eff.wait_idle()  # 다음 대상 접근 전 재열기 완료
+            sp.set(fresh=fresh is not None)
+        if fresh is None:
+            print("[HARVEST] 재확인 프레임 없음 → 기존 계획 유지")
+            continue
+        remaining = harvest_queue.revalidate(targets_to_base(fresh, pos), start=pos[:3])
+        print(f"[HARVEST] 남은 대상 {len(remaining)}개")
+
+    elapsed = time.monotonic() - t0
+    if n_picked:
+        indy.timer.record('pick_per_berry', elapsed * 1000.0 / n_picked)
+    print(f"[HARVEST] {n_picked}개 수확, {elapsed:.1f}s "
+          f"({harvest_queue.berries_per_hour():.1f} berries/h) {harvest_queue.counters}")
+    return n_picked
 
 
 def perform_pick_sequence_async(di: dict, angle: float,
@@ -130,15 +297,18 @@ def perform_pick_sequence_async(di: dict, angle: float,
                                 t_forward: float = 3.5,
                                 target_mm: int = 70,
                                 tol_mm: int = 10,
-                                tof_method: str = "mean"):
+                                tof_method: str = "mean",
+                                tof_approach: str = "continuous",
+                                grip_mode: str = "feedback"):
     global _is_busy
 
     def _worker():
         global _is_busy
-        with _seq_lock:
+        with _seq_lock, indy.timer.measure("pick_cycle"), metrics.span('pick_cycle'):  # 트리거 → 홈 복귀까지
             _is_busy = True
             try:
-                perform_pick_sequence(
+                sequence = perform_harvest_session if HARVEST_MULTI else perform_pick_sequence
+                sequence(
                     di, angle,
                     spin_speed=spin_speed,
                     t_F_reverse=t_F_reverse,
@@ -149,6 +319,9 @@ def perform_pick_sequence_async(di: dict, angle: float,
                     target_mm=target_mm,
                     tol_mm=tol_mm,
                     tof_method=tof_method,
+                    tof_approach=tof_approach,
+                    grip_mode=grip_mode,
+                    overlap_reopen=True,    # 재열기와 홈 복귀 동시 진행
                 )
             except Exception as e:
                 print(f"[SEQ] error: {e}")
@@ -156,10 +329,15 @@ def perform_pick_sequence_async(di: dict, angle: float,
                 # 엔드이펙터 종료 후 항상 홈 복귀
                 try:
                     time.sleep(0.15)
-                    indy.indy.go_home()
-                    indy.indy.wait_for_move_finish()
+                    with metrics.span('homing'):
+                        indy.indy.go_home()
+                        indy.indy.wait_for_move_finish()
                 except Exception as e:
                     print(f"[SEQ] home error: {e}")
+                try:
+                    eff.wait_idle(timeout=10.0)
+                except Exception as e:
+                    print(f"[SEQ] effector error: {e}")
                 _is_busy = False
 
     if _is_busy:
@@ -168,6 +346,17 @@ def perform_pick_sequence_async(di: dict, angle: float,
     threading.Thread(target=_worker, daemon=True).start()
 
 
+def pipeline_pick(target, waypoints):
+    """PickPipeline 에서 호출: 홈에서 미리 계산한 경로로 접근 → ToF → 그립 (재열기는 홈 복귀와 동시 진행)"""
+    eff.wait_idle(timeout=10.0)  # 직전 대상 재열기 완료
+    perform_pick_sequence(target['di'], target['angle'], settle=0.15,
+                          goal=target['goal'], capture_uvw=target['capture_uvw'], waypoints=waypoints,
+                          overlap_reopen=True, **PICK_PARAMS)
+
+
+pipeline = PickPipeline(indy, pick=pipeline_pick, pool=TargetPool(match_radius_m=0.03, min_hits=2))
+
+
 # ---------- DI 콜백 ----------
 def on_di(di: dict):
     print(
@@ -177,32 +366,43 @@ def on_di(di: dict):
         f"Z={di.get('Z', float('nan')):.3f} m | "
         f"dist={di.get('distance_m', float('nan')):.3f} m"
     )
+    if HARVEST_PIPELINE:
+        pipeline.start()
+        return
+    global _view_ready_at
     indy.set_point(cam_x=di.get("X"), depth=di.get("Z"))
+    _view_ready_at = time.monotonic()
 
 
 def on_di2(di: dict, angle):
-    perform_pick_sequence_async(
-        di, angle,
-        spin_speed=100,
-        t_F_reverse=2.0,
-        t_S_reverses=2.0,
-        pause=1.0,
-        t_forward=3.5,
-        target_mm=70,       # 70mm
-        tol_mm=10,
-        tof_method="mean"   # 평균값 사용
-    )
+    if HARVEST_PIPELINE:
+        return  # 파이프라인이 대상 선택/수확을 직접 처리
+    perform_pick_sequence_async(di, angle, **PICK_PARAMS)
 
 
 # ---------- 엔트리 ----------
 if __name__ == "__main__":
     register_di_callback(on_di)
     register_di_callback2(on_di2)
+    if HARVEST_PIPELINE:
+        # 홈에서 정지한 동안은 전체 인식 (다음 대상 검증), 수확 중에는 monitor 모드
+        register_busy_callback(lambda: pipeline.running and not pipeline.at_home)
+        register_targets_callback(pipeline.on_targets)
+    else:
+        register_busy_callback(lambda: _is_busy and not _revalidating)
+        if HARVEST_MULTI:
+            register_targets_callback(on_targets)
     try:
         run_detection()
     finally:
+        if pipeline.running:
+            pipeline.stop(timeout=30.0)
         try:
             eff.shutdown()
+            print(f"[OpenCR] effector transactions: {eff.transaction_stats()}")
         except Exception:
             pass
+        tof.stop_sampling()                         # 버스를 닫기 전에 ToF 샘플러 종료
+        bus.close()
         indy.close()
+        metrics.close()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+픽킹 시퀀스 이벤트 로그 / 메트릭 (span, event, counter, histogram)
+
+- 비활성(기본)일 때 span() 은 공유 no-op 객체를 반환하고 count/observe/event 는 바로 반환 (전역 변수 확인 1회)
+- 활성화: 환경변수 PICK_METRICS_DIR=<디렉토리> 또는 metrics.configure(<디렉토리>)
+    <dir>/events-<시작시각>.jsonl : span/event 한 줄씩 (t: time.monotonic 초, 첫 줄 session 에 wall clock 기준점)
+    <dir>/metrics.prom            : Prometheus text format (counter / histogram), PROM_INTERVAL_S 마다 + close 시 갱신
+- 파일 쓰기는 전용 스레드에서 처리 (호출 스레드는 큐에 넣기만 함)
+
+- 사용:
+    import metrics
+    with metrics.span('approach', mode='waypoint') as sp:
+        ...
+        sp.set(result='ok')
+    metrics.count('grip_stall')
+    metrics.observe('tof_final_error_mm', 3.0)
+    metrics.close()
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import itertools
+
+METRICS_DIR = os.environ.get('PICK_METRICS_DIR', '')
+PROM_INTERVAL_S = 10.0
+PROM_PREFIX = 'harvest_'
+
+# 히스토그램 버킷 (span 은 ms 단위)
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class _NullSpan:
+    """비활성 상태 span (아무것도 기록하지 않음)"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, le in enumerate(self.buckets):
+            if value <= le:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+class Span:
+    """monotonic 시작/종료 시각을 기록하는 구간, 같은 스레드 안에서 중첩되면 parent 로 연결"""
+    __slots__ = ('_rec', 'name', 'attrs', 'id', 'parent', 't0')
+
+    def __init__(self, rec, name, attrs):
+        self._rec = rec
+        self.name = name
+        self.attrs = attrs
+        self.id = None
+        self.parent = None
+        self.t0 = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = self._rec._stack()
+        self.parent = stack[-1].id if stack else None
+        self.id = next(self._rec._ids)
+        stack.append(self)
+        self.t0 = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        dur_ms = (time.monotonic() - self.t0) * 1000.0
+        stack = self._rec._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self._rec._finish_span(self, dur_ms)
+        return False
+
+
+class Recorder:
+    def __init__(self, directory, prom_interval_s=PROM_INTERVAL_S, buckets=DEFAULT_BUCKETS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.events_path = os.path.join(directory, time.strftime('events-%Y%m%d-%H%M%S.jsonl'))
+        self.prom_path = os.path.join(directory, 'metrics.prom')
+        self.prom_interval_s = prom_interval_s
+        self.buckets = tuple(buckets)
+
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+        self._emit({'type': 'session', 't': time.monotonic(), 'wall': time.time(), 'pid': os.getpid()})
+        print(f"[METRICS] writing to {self.events_path}")
+
+    # ------------------------- 기록 -------------------------
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _emit(self, record):
+        if not self._closed:
+            self._queue.put(record)
+
+    def span(self, name, attrs):
+        return Span(self, name, attrs)
+
+    def _finish_span(self, span, dur_ms):
+        self.observe(f'{span.name}_ms', dur_ms)
+        record = {'type': 'span', 'name': span.name, 't': span.t0, 'dur_ms': round(dur_ms, 3),
+                  'id': span.id, 'parent': span.parent, 'thread': threading.current_thread().name}
+        if span.attrs:
+            record.update(span.attrs)
+        self._emit(record)
+
+    def event(self, name, attrs):
+        stack = self._stack()
+        record = {'type': 'event', 'name': name, 't': time.monotonic(),
+                  'parent': stack[-1].id if stack else None}
+        record.update(attrs)
+        self._emit(record)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, value):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    # ------------------------- 내보내기 -------------------------
+
+    def prometheus_text(self):
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = PROM_PREFIX + name + '_total'
+                lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric} {value}')
+            for name, hist in sorted(self._histograms.items()):
+                metric = PROM_PREFIX + name
+                lines.append(f'# TYPE {metric} histogram')
+                cumulative = 0
+                for le, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {hist.count}')
+                lines.append(f'{metric}_sum {hist.sum:.3f}')
+                lines.append(f'{metric}_count {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        tmp = self.prom_path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, self.prom_path)   # scraper(node_exporter textfile 등)가 쓰다 만 파일을 읽지 않게
+
+    def _write_loop(self):
+        next_prom = time.monotonic() + self.prom_interval_s
+        with open(self.events_path, 'a') as f:
+            while True:
+                try:
+                    record = self._queue.get(timeout=max(0.0, next_prom - time.monotonic()))
+                except queue.Empty:
+                    record = False
+                if record is None:
+                    break
+                if record:
+                    f.write(json.dumps(record, default=str) + '\n')
+                    # 큐에 쌓인 만큼 한 번에 쓰고 flush
+                    if not self._queue.empty():
+                        continue
+                    f.flush()
+                if time.monotonic() >= next_prom:
+                    self.write_prometheus()
+                    next_prom = time.monotonic() + self.prom_interval_s
+            f.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=5.0)
+        self.write_prometheus()
+        print(f"[METRICS] closed ({self.events_path}, {self.prom_path})")
+
+
+# ------------------------- 모듈 API (비활성 시 no-op) -------------------------
+
+_recorder = None
+
+
+def configure(directory=None, **kwargs):
+    """directory 로 기록 시작 (이미 활성화돼 있으면 기존 기록을 닫고 교체), None 이면 비활성화"""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+    if directory:
+        _recorder = Recorder(directory, **kwargs)
+    return _recorder
+
+
+def enabled():
+    return _recorder is not None
+
+
+def span(name, **attrs):
+    if _recorder is None:
+        return _NULL_SPAN
+    return _recorder.span(name, attrs)
+
+
+def event(name, **attrs):
+    if _recorder is not None:
+        _recorder.event(name, attrs)
+
+
+def count(name, n=1):
+    if _recorder is not None:
+        _recorder.count(name, n)
+
+
+def observe(name, value):
+    if _recorder is not None:
+        _recorder.observe(name, value)
+
+
+def close():
+    configure(None)
+
+
+if METRICS_DIR:
+    configure(METRICS_DIR)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+픽킹 접근 경로 계획 (indyCTL.run 용)
+
+기존 run 은 joint +20° → tool 프레임 이동 → joint -20° → yaw 회전을 각각 move + wait 로 실행했다.
+여기서는 같은 최종 자세를 현재 task pose 기준 절대 waypoint 목록으로 계산해서
+task waypoint 한 번 실행(execute_task_waypoints) + wait 한 번으로 보낼 수 있게 한다.
+
+- task pose: [x, y, z (m), u, v, w (deg)], R = Rz(w) · Ry(v) · Rx(u)
+- joint6 회전은 tool z축 회전과 같다고 가정 (tool 프레임 = 플랜지 프레임)
+"""
+
+import math
+
+import numpy as np
+
+WRIST_TILT_DEG = 20.0   # 접근 중 손목(joint6) 회전 각도
+
+# 카메라 좌표 → tool 이동량 (indyCTL.run 기준 값)
+CAMERA_DISTANCE = 0.04  # 카메라 ~ 플랜지 z 거리 (m)
+END_TOOL = 0.17         # 엔드이펙터 길이 (m)
+CAM_OFFSET = 0.1        # 카메라 ~ 툴 중심 오프셋 (m)
+MAX_CAM_Z = 0.32        # 이보다 먼 대상은 0.3 m 까지만 접근 (이후 ToF 보정)
+
+
+def _rot_x(deg):
+    c, s = math.cos(math.radians(deg)), math.sin(math.radians(deg))
+    return np.array([[1.0, 0.0, 0.0], [0.0, c, -s], [0.0, s, c]])
+
+
+def _rot_y(deg):
+    c, s = math.cos(math.radians(deg)), math.sin(math.radians(deg))
+    return np.array([[c, 0.0, s], [0.0, 1.0, 0.0], [-s, 0.0, c]])
+
+
+def _rot_z(deg):
+    c, s = math.cos(math.radians(deg)), math.sin(math.radians(deg))
+    return np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]])
+
+
+def uvw_to_rot(u, v, w):
+    return _rot_z(w) @ _rot_y(v) @ _rot_x(u)
+
+
+def rot_to_uvw(R, ref=None):
+    """
+    회전 행렬 → (u, v, w) deg
+    ref: 이전 waypoint 의 (u, v, w). 주어지면 ref 에 가장 가까운 표현(±360, 대체 Euler 해)으로 맞춰
+         보간 시 반대 방향으로 크게 도는 것을 막음
+    """
+    v = math.degrees(math.atan2(-R[2, 0], math.hypot(R[0, 0], R[1, 0])))
+    u = math.degrees(math.atan2(R[2, 1], R[2, 2]))
+    w = math.degrees(math.atan2(R[1, 0], R[0, 0]))
+    if ref is None:
+        return [u, v, w]
+    # 같은 회전의 두 표현 (u, v, w) / (u+180, 180-v, w+180) 중 ref 에 가까운 쪽 선택
+    best = None
+    for cand in ([u, v, w], [u + 180.0, 180.0 - v, w + 180.0]):
+        cand = [a + 360.0 * round((r - a) / 360.0) for a, r in zip(cand, ref)]
+        cost = sum(abs(a - r) for a, r in zip(cand, ref))
+        if best is None or cost < best[0]:
+            best = (cost, cand)
+    return best[1]
+
+
+def _pose(p, R, ref_uvw):
+    return [float(p[0]), float(p[1]), float(p[2])] + rot_to_uvw(R, ref_uvw)
+
+
+def camera_to_tool_move(cam_x, cam_y, cam_z, clamp=True):
+    """
+    카메라 좌표(m) → 손목을 WRIST_TILT_DEG 돌린 tool 프레임 이동량 (dx, dy, dz)
+    clamp: cam_z > MAX_CAM_Z 이면 촬영 위치에서 0.3 m 거리까지만 접근 (False 면 딸기 위치 그대로)
+    """
+    if clamp and cam_z > MAX_CAM_Z:
+        z = 0.3 - END_TOOL
+    else:
+        z = cam_z - CAMERA_DISTANCE - END_TOOL
+    # x(+ 아래, - 위), y(+ 왼쪽, - 오른쪽), z(+ 접근, - 후퇴)
+    return (cam_y - CAM_OFFSET, -cam_x, z)
+
+
+def camera_to_base(capture_pos, cam_x, cam_y, cam_z, wrist_deg=WRIST_TILT_DEG, clamp=True):
+    """
+    촬영 시점 task pose 기준 카메라 좌표 → 접근 완료 위치 (base 프레임, m)
+    clamp=False: MAX_CAM_Z 제한 없이 딸기 위치에 대응하는 접근 위치 (촬영 위치와 무관, 프레임 간 대상 매칭용)
+    """
+    p0 = np.asarray(capture_pos[:3], dtype=np.float64)
+    R1 = uvw_to_rot(*capture_pos[3:6]) @ _rot_z(wrist_deg)
+    goal = p0 + R1 @ np.asarray(camera_to_tool_move(cam_x, cam_y, cam_z, clamp=clamp), dtype=np.float64)
+    return [float(v) for v in goal]
+
+
+def plan_pick_waypoints_to(task_pos, goal, capture_uvw, tool_angle=0.0,
+                           retreat_m=0.0, standoff_m=0.05, wrist_deg=WRIST_TILT_DEG):
+    """
+    현재 pose 에서 base 프레임 접근 위치 goal 로 가는 절대 waypoint (연속 수확용)
+    - retreat_m > 0 이면 먼저 현재 tool -z 로 후퇴 (직전 대상에서 빠져나옴)
+    - goal 앞 standoff_m 지점까지 이동 후 tool z 축으로 직선 접근
+    - 마지막에 손목 복귀 + 촬영 자세 기준 base z 축 yaw 회전
+    capture_uvw: goal 을 계산한 촬영 시점 자세 (u, v, w)
+    """
+    p0 = np.asarray(task_pos[:3], dtype=np.float64)
+    R0 = uvw_to_rot(*task_pos[3:6])
+    Rc = uvw_to_rot(*capture_uvw)
+    R1 = Rc @ _rot_z(wrist_deg)
+    goal = np.asarray(goal, dtype=np.float64)
+
+    waypoints = []
+    ref = list(task_pos[3:6])
+    if retreat_m > 0:
+        waypoints.append(_pose(p0 - R0[:, 2] * retreat_m, R0, ref))
+        ref = waypoints[-1][3:]
+    if standoff_m > 0:
+        waypoints.append(_pose(goal - R1[:, 2] * standoff_m, R1, ref))
+        ref = waypoints[-1][3:]
+    waypoints.append(_pose(goal, R1, ref))
+    waypoints.append(_pose(goal, _rot_z(tool_angle) @ Rc, waypoints[-1][3:]))
+    return waypoints
+
+
+def plan_pick_waypoints(task_pos, tool_move, tool_angle=0.0, wrist_deg=WRIST_TILT_DEG):
+    """
+    indyCTL.run 의 연속 상대 이동을 절대 task waypoint 로 변환
+    task_pos : 현재 task pose [x, y, z, u, v, w]
+    tool_move: tool 프레임 이동량 (dx, dy, dz) m  (손목을 wrist_deg 돌린 상태의 tool 프레임)
+    tool_angle: 마지막 기준(base) 프레임 yaw 회전량 (deg)
+    return: [접근 전 손목 회전, 접근 완료, 손목 복귀 + yaw] 절대 pose 3개
+    """
+    p0 = np.asarray(task_pos[:3], dtype=np.float64)
+    uvw0 = list(task_pos[3:6])
+    R0 = uvw_to_rot(*uvw0)
+
+    # 1) joint6 +wrist_deg (tool z 회전), 위치 그대로
+    R1 = R0 @ _rot_z(wrist_deg)
+    wp1 = _pose(p0, R1, uvw0)
+    # 2) 회전된 tool 프레임 기준 이동
+    p2 = p0 + R1 @ np.asarray(tool_move, dtype=np.float64)
+    wp2 = _pose(p2, R1, wp1[3:])
+    # 3) joint6 -wrist_deg 후 base z 축 yaw 회전
+    R3 = _rot_z(tool_angle) @ R0
+    wp3 = _pose(p2, R3, wp2[3:])
+    return [wp1, wp2, wp3]
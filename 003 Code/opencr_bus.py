@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OpenCR Serial Bus Manager
+
+엔드이펙터(Dynamixel)와 ToF 센서는 같은 OpenCR 보드를 사용하므로
+시리얼 연결 하나를 공유하고, 모든 트랜잭션을 요청 큐 + 전용 스레드로 직렬화한다.
+
+- 사용:
+    from opencr_bus import OpenCRBus
+    bus = OpenCRBus()                                   # /dev/ttyACM* 한 번만 probe
+    eff = MotorControl(shared_opencr=bus.view('ee'))
+    tof = ToF_Sensor(shared_opencr=bus.view('tof'))
+    ...
+    bus.close()
+
+view 는 OpenCRSerial 과 같은 메서드 이름으로 호출 가능 (예: view.get_tof_distance())
+view.batch([(method, args), ...]) 는 여러 트랜잭션을 요청 하나로 연속 실행 (다른 view 요청이 끼지 않음)
+"""
+
+import sys
+import queue
+import threading
+from concurrent.futures import Future
+
+sys.path.append('/home/dfx')
+try:
+    from opencr.opencr_firmware.libraries.peripheral._opencr import OpenCRSerial
+except ImportError:  # 시뮬레이터(opencr_sim.SimOpenCR)만 사용하는 환경
+    OpenCRSerial = None
+
+
+class OpenCRView:
+    """
+    OpenCRSerial 대리 객체: 메서드 호출을 버스 요청 큐로 전달
+    close() 는 버스를 닫지 않음 (버스 소유자가 OpenCRBus.close 호출)
+    """
+    def __init__(self, bus, name):
+        self._bus = bus
+        self.name = name
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def _call(*args, **kwargs):
+            return self._bus.call(method, *args, _view=self.name, **kwargs)
+        return _call
+
+    def batch(self, calls, timeout=None):
+        return self._bus.call_batch(calls, _view=self.name, timeout=timeout)
+
+    def close(self):
+        pass
+
+
+class OpenCRBus:
+    def __init__(self,
+                 possible_device_ports=None,
+                 baud_rate: int = 57600,
+                 serial_timeout: float = 1.0,
+                 device_address: int = 0xF0,
+                 opencr_serial=None):
+        """
+        :param possible_device_ports: 시도할 시리얼 포트 리스트
+        :param opencr_serial: 이미 열린 OpenCRSerial (또는 호환 객체, 시뮬레이터 등)
+        """
+        if possible_device_ports is None:
+            possible_device_ports = ['/dev/ttyACM0', '/dev/ttyACM1']
+
+        self.possible_device_ports = possible_device_ports
+        self.connected_device_port = None
+        self.baud_rate = baud_rate
+        self.serial_timeout = serial_timeout
+        self.device_address = device_address
+
+        self.opencr = opencr_serial if opencr_serial is not None else self._open()
+
+        # 트랜잭션 카운터 (view 별)
+        self._stats_lock = threading.Lock()
+        self.transactions = {}
+
+        self._requests = queue.Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()    # _closed 확인과 put 을 묶어 close 이후 요청이 큐에 남지 않게 함
+        self._worker = threading.Thread(target=self._run, name="opencr-bus", daemon=True)
+        self._worker.start()
+
+    def _open(self):
+        for device_port in self.possible_device_ports:
+            try:
+                opencr = OpenCRSerial(device_port, self.baud_rate, self.serial_timeout, self.device_address)
+                self.connected_device_port = device_port
+                print(f"[OpenCR] Bus connected to {device_port}")
+                return opencr
+            except Exception as connection_error:
+                print(f"[OpenCR] Failed to connect to {device_port}: {connection_error}")
+                continue
+        raise RuntimeError("[OpenCR] No available /dev/ttyACM* device found.")
+
+    # ------------------------- 요청 처리 -------------------------
+
+    def _run(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            method, args, kwargs, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if method is None:  # batch: args = [(method, args), ...]
+                    future.set_result([getattr(self.opencr, m)(*a) for m, a in args])
+                else:
+                    future.set_result(getattr(self.opencr, method)(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+        # 종료 후 남은 요청은 실행하지 않고 실패 처리 (result() 가 영원히 기다리지 않게)
+        while True:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[3].set_running_or_notify_cancel():
+                item[3].set_exception(RuntimeError("[OpenCR] Bus is closed"))
+
+    def _enqueue(self, item):
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("[OpenCR] Bus is closed")
+            self._requests.put(item)
+
+    def _count(self, view, n=1):
+        with self._stats_lock:
+            key = view or '-'
+            self.transactions[key] = self.transactions.get(key, 0) + n
+
+    def submit(self, method, *args, _view=None, **kwargs) -> Future:
+        """트랜잭션을 큐에 넣고 Future 반환 (FIFO 순서로 하나씩 실행)"""
+        future = Future()
+        self._enqueue((method, args, kwargs, future))
+        self._count(_view)
+        return future
+
+    def submit_batch(self, calls, _view=None) -> Future:
+        """
+        calls: [(method, args), ...] 를 요청 하나로 큐에 넣음 (중간에 다른 요청이 실행되지 않음)
+        Future 결과는 각 호출 결과 리스트, 하나라도 실패하면 그 예외 (이후 호출은 실행 안 함)
+        """
+        calls = [(method, tuple(args)) for method, args in calls]
+        future = Future()
+        self._enqueue((None, calls, {}, future))
+        self._count(_view, len(calls))
+        return future
+
+    def call(self, method, *args, _view=None, timeout=None, **kwargs):
+        """트랜잭션 실행 후 결과 반환 (블로킹)"""
+        return self.submit(method, *args, _view=_view, **kwargs).result(timeout)
+
+    def call_batch(self, calls, _view=None, timeout=None):
+        return self.submit_batch(calls, _view=_view).result(timeout)
+
+    def view(self, name):
+        return OpenCRView(self, name)
+
+    def transaction_count(self, name=None):
+        with self._stats_lock:
+            if name is None:
+                return sum(self.transactions.values())
+            return self.transactions.get(name, 0)
+
+    def close(self):
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._worker.join(timeout=2.0)
+        try:
+            if hasattr(self.opencr, "close"):
+                self.opencr.close()
+            print("[OpenCR] Bus closed")
+        except Exception:
+            pass
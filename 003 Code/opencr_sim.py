@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+OpenCR 시뮬레이터 (엔드이펙터 Dynamixel + ToF, 보드 없이 MotorControl / ToF_Sensor 실행·테스트용)
+
+OpenCRSerial 에서 사용하는 호출만 같은 이름으로 구현
+- Dynamixel: velocity 모드에서는 goalVelocity 에 비례해 회전, position 모드에서는 goal 로 등속 이동
+  닫는 방향(-)으로 stem_travel_deg 만큼 돌면 줄기에 닿아 정지(stall), 전류가 stall_current 로 상승
+  여는 방향(+)으로는 open_limit_deg 에서 기구 끝(정지)
+  overload_after_s 를 주면 그 시간 이상 stall 이 이어질 때 과부하 보호로 토크 OFF + hardware error 비트 설정
+- 위치 값: 0~1023 ↔ 0~200도 (endeffector 와 같은 맵핑), 범위를 넘으면 wrap
+- ToF: tof_distance_mm 고정값 (또는 callable)
+
+- 사용:
+    from opencr_sim import SimOpenCR
+    eff = MotorControl(shared_opencr=SimOpenCR(stem_travel_deg=120))
+    python3 opencr_sim.py            # 피드백 그립 vs 고정 시간 비교
+"""
+
+import time
+import threading
+
+POSITION_RANGE_DEG = 200.0
+POSITION_MAX = 1023
+DEG_PER_VELOCITY_UNIT = 0.666      # goalVelocity 1 단위당 deg/s (100 → 약 67 deg/s)
+POSITION_MODE_SPEED = 120.0        # position 모드 이동 속도 (deg/s)
+OVERLOAD_ERROR_BIT = 0x20          # Hardware Error Status: Overload Error
+
+
+class SimOpenCR:
+    def __init__(self, stem_travel_deg=150.0, open_limit_deg=0.0,
+                 free_current=40, stall_current=400, tof_distance_mm=70,
+                 time_scale=1.0, overload_after_s=None):
+        """
+        :param stem_travel_deg: 완전히 열린 위치에서 닫는 방향으로 줄기에 닿을 때까지의 회전량
+        :param open_limit_deg: 시작 위치에서 여는 방향 기구 끝까지의 회전량 (0: 완전히 열린 상태로 시작)
+        :param time_scale: 1 보다 작으면 회전이 그만큼 빨리 진행 (MotorControl 의 대기 시간과 맞출 때 사용)
+        :param overload_after_s: stall 이 이 시간(시뮬레이션 시간) 이상 이어지면 과부하 shutdown (None: 없음)
+        """
+        self.stem_travel_deg = stem_travel_deg
+        self.open_limit_deg = open_limit_deg
+        self.free_current = free_current
+        self.stall_current = stall_current
+        self.tof_distance_mm = tof_distance_mm
+        self.time_scale = time_scale
+        self.overload_after_s = overload_after_s
+
+        self._lock = threading.Lock()
+        self._t = time.monotonic()
+        self._travel = 0.0           # 누적 회전량 (deg, + 여는 방향), 0 = 시작 위치
+        self._mode = 3
+        self._torque = False
+        self._velocity = 0
+        self._goal = None            # position 모드 목표 (누적 회전량 기준 deg)
+        self._stalled = False
+        self._stall_time = 0.0       # 연속 stall 시간 (s)
+        self._hw_error = 0
+        self.calls = {}
+
+    # ------------------------- 내부 -------------------------
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def _limits(self):
+        """누적 회전량 허용 범위 (닫힘: 줄기 접촉, 열림: 기구 끝)"""
+        return self.open_limit_deg - self.stem_travel_deg, self.open_limit_deg
+
+    def _advance(self):
+        now = time.monotonic()
+        dt = (now - self._t) / self.time_scale
+        self._t = now
+        if not self._torque:
+            self._stalled = False
+            self._stall_time = 0.0
+            return
+        lo, hi = self._limits()
+        if self._mode == 1:
+            rate = self._velocity * DEG_PER_VELOCITY_UNIT
+        elif self._goal is not None:
+            diff = self._goal - self._travel
+            rate = max(-POSITION_MODE_SPEED, min(POSITION_MODE_SPEED, diff / dt if dt > 0 else 0.0))
+        else:
+            rate = 0.0
+        target = self._travel + rate * dt
+        clamped = min(max(target, lo), hi)
+        self._stalled = rate != 0.0 and (clamped != target or
+                                         (self._travel <= lo and rate < 0) or (self._travel >= hi and rate > 0))
+        self._travel = clamped
+        self._stall_time = self._stall_time + dt if self._stalled else 0.0
+        if self.overload_after_s is not None and self._stall_time >= self.overload_after_s:
+            # 과부하 보호: 모터가 스스로 토크를 끔 (reboot 전까지 hardware error 유지)
+            self._torque = False
+            self._stalled = False
+            self._hw_error |= OVERLOAD_ERROR_BIT
+
+    # ------------------------- Dynamixel -------------------------
+
+    def dxl_init(self, dxl_id, position_range=200, protocol=0):
+        self._count('dxl_init')
+        self._hw_error = 0
+
+    def dxl_torqueOn(self, dxl_id):
+        self._count('dxl_torqueOn')
+        with self._lock:
+            self._advance()
+            self._torque = True
+
+    def dxl_torqueOff(self, dxl_id):
+        self._count('dxl_torqueOff')
+        with self._lock:
+            self._advance()
+            self._torque = False
+
+    def dxl_setOperatingMode(self, dxl_id, mode):
+        self._count('dxl_setOperatingMode')
+        with self._lock:
+            self._advance()
+            if self._torque:
+                raise RuntimeError("[SIM] operating mode change requires torque off")
+            self._mode = int(mode)
+            self._velocity = 0
+            self._goal = None
+
+    def dxl_getTorqueEnable(self, dxl_id):
+        self._count('dxl_getTorqueEnable')
+        with self._lock:
+            self._advance()
+            return int(self._torque)
+
+    def dxl_getHardwareErrorStatus(self, dxl_id):
+        self._count('dxl_getHardwareErrorStatus')
+        with self._lock:
+            self._advance()
+            return self._hw_error
+
+    def dxl_goalVelocity(self, dxl_id, velocity):
+        self._count('dxl_goalVelocity')
+        with self._lock:
+            self._advance()
+            self._velocity = int(velocity) if self._mode == 1 else 0
+
+    def dxl_goalPosition(self, dxl_id, position):
+        self._count('dxl_goalPosition')
+        with self._lock:
+            self._advance()
+            if self._mode != 3:
+                return
+            # 절대 위치 → 현재 바퀴 기준 누적 회전량
+            base = self._travel - (self._travel % POSITION_RANGE_DEG)
+            self._goal = base + float(position) * POSITION_RANGE_DEG / POSITION_MAX
+
+    def dxl_getPresentPositionData(self, dxl_id):
+        self._count('dxl_getPresentPositionData')
+        with self._lock:
+            self._advance()
+            return int(round((self._travel % POSITION_RANGE_DEG) * POSITION_MAX / POSITION_RANGE_DEG))
+
+    def dxl_getPresentCurrentData(self, dxl_id):
+        self._count('dxl_getPresentCurrentData')
+        with self._lock:
+            self._advance()
+            if not self._torque:
+                return 0
+            return self.stall_current if self._stalled else self.free_current
+
+    # ------------------------- ToF -------------------------
+
+    def get_tof_distance(self):
+        self._count('get_tof_distance')
+        d = self.tof_distance_mm
+        return d() if callable(d) else d
+
+    def close(self):
+        pass
+
+
+if __name__ == "__main__":
+    from endeffector import MotorControl
+
+    for stem in (60.0, 150.0, 230.0):
+        eff = MotorControl(shared_opencr=SimOpenCR(stem_travel_deg=stem))
+        t0 = time.monotonic()
+        res = eff.grip_async(direction=-1, speed=100, timeout_s=3.5).result()
+        print(f"[SIM] stem at {stem:.0f}° → {res['reason']} after {res['elapsed_s']:.2f}s "
+              f"(travel {res['travel_deg']:.0f}°, fixed grip 3.50s)")
+        eff.shutdown()
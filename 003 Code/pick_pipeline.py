@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+파이프라인 수확 사이클 (키 입력/새 프레임을 기다리지 않고 홈 복귀 즉시 다음 수확 시작)
+
+- 홈 자세에서 정지한 동안의 전체 인식 프레임만 TargetPool 에 반영 (홈 기준 base 프레임 좌표)
+- 여러 프레임에서 반복 관찰된(검증된) 대상 중 홈에서 가까운 대상부터 수확
+- 한 대상을 수확하는 동안 다음 대상의 접근 경로(홈 자세 기준 waypoint)를 planner 스레드에서 미리 계산
+  → 홈에 도착하면 경로 계산/트리거 대기 없이 바로 출발
+- 미리 계산한 경로는 시간으로 만료시키지 않음: 홈 도착 시 그 대상이 아직 검증된 후보(같은 딸기, match_radius_m 이내)로
+  남아 있으면 그대로 출발, 계산 이후 새 홈 프레임이 들어왔으면 그 프레임에서도 관찰된 경우에만 사용
+  맞지 않으면 버리고 현재 후보에서 다시 계산, 검증된 후보가 없을 때만 새 프레임을 기다림
+
+- 사용:
+    pipeline = PickPipeline(indy, pick=lambda target, waypoints: ...)
+    register_targets_callback(pipeline.on_targets)
+    pipeline.start()
+    ...
+    pipeline.stop()
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from harvest_planner import TargetPool, targets_to_base
+
+
+class PickPipeline:
+    def __init__(self, indy, pick, pool=None, home_settle_s=0.15,
+                 poll_s=0.5):
+        """
+        :param indy: indy7.indyCTL
+        :param pick: pick(target, waypoints) → 홈에서 출발해 접근 ~ 그립까지 실행 (예외 시 실패로 기록)
+        :param pool: harvest_planner.TargetPool (기본: 새로 생성)
+        :param home_settle_s: 홈 도착 후 이 시간이 지난 뒤 촬영된 프레임만 사용
+        :param poll_s: 검증된 후보가 없을 때 다시 확인하는 주기
+        """
+        self.indy = indy
+        self.pick = pick
+        self.pool = pool if pool is not None else TargetPool()
+        self.home_settle_s = home_settle_s
+        self.poll_s = poll_s
+
+        self.home_pos = None
+        self._home_since = None     # 홈 정지 + settle 이후 시각, None 이면 홈이 아님
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._planner = None
+        self._pending = None        # 다음 대상 경로 Future → (target, waypoints, 계산에 쓴 pool.last_update)
+
+        self.counters = {'picked': 0, 'failed': 0, 'precomputed': 0, 'replanned': 0, 'waited': 0}
+
+    # ------------------------- 상태 -------------------------
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def at_home(self):
+        return self._home_since is not None
+
+    # ------------------------- 인식 결과 수신 -------------------------
+
+    def on_targets(self, targets, host_time):
+        """detection 전체 인식 프레임마다 호출, 홈에서 정지한 동안 촬영된 프레임만 반영"""
+        with self._cond:
+            home_since, home_pos = self._home_since, self.home_pos
+        if home_since is None or host_time is None or host_time < home_since:
+            return
+        self.pool.update(targets_to_base(targets, home_pos), host_time)
+        with self._cond:
+            self._cond.notify_all()
+
+    # ------------------------- 실행 -------------------------
+
+    def start(self):
+        if self.running:
+            print("[PIPE] already running")
+            return
+        self._stop.clear()
+        self._planner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pick-plan")
+        self._thread = threading.Thread(target=self._run, name="pick-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """현재 수확이 끝나고 홈에 복귀하면 종료"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._planner is not None:
+            self._planner.shutdown(wait=False)
+        print(f"[PIPE] stopped {self.counters} pool {self.pool.counters}")
+
+    def _arrive_home(self):
+        pos = self.indy.indy.get_task_pos()
+        with self._cond:
+            self.home_pos = pos
+            self._home_since = time.monotonic() + self.home_settle_s
+            self._cond.notify_all()
+
+    def _go_home(self):
+        with self.indy.timer.measure('go_home'), metrics.span('homing'):
+            self.indy.indy.go_home()
+            self.indy.indy.wait_for_move_finish()
+        self._arrive_home()
+
+    def _plan(self, target):
+        return target, self.indy.plan_pick(target['goal'], target['capture_uvw'], angle=target['angle'],
+                                           start_pos=self.home_pos)
+
+    def _plan_next(self):
+        """수확 중 planner 스레드에서 실행: 다음 후보의 홈 기준 경로 계산"""
+        frame_time = self.pool.last_update
+        target = self.pool.peek_best(self.home_pos[:3])
+        return (*self._plan(target), frame_time) if target is not None else (None, None, frame_time)
+
+    def _next_target(self):
+        """다음 대상과 경로 (미리 계산한 대상이 아직 후보로 남아 있으면 그 경로 사용), 종료 시 None"""
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            target, waypoints, frame_time = pending.result()
+            if target is not None:
+                if self.pool.take_match(target, since=frame_time) is not None:
+                    self.counters['precomputed'] += 1
+                    return target, waypoints
+                self.counters['replanned'] += 1
+
+        waited = False
+        while not self._stop.is_set():
+            target = self.pool.pop_best(self.home_pos[:3])
+            if target is not None:
+                return self._plan(target)
+            if not waited:
+                self.counters['waited'] += 1
+                waited = True
+            with self._cond:
+                self._cond.wait(self.poll_s)
+        return None
+
+    def _run(self):
+        self._go_home()
+        print("[PIPE] started")
+        while not self._stop.is_set():
+            arrived = self._home_since
+            nxt = self._next_target()
+            if nxt is None:
+                break
+            target, waypoints = nxt
+            with self._cond:
+                self._home_since = None
+            dwell_ms = (time.monotonic() - arrived + self.home_settle_s) * 1000.0
+            self.indy.timer.record('home_dwell', dwell_ms)
+            metrics.observe('home_dwell_ms', dwell_ms)
+
+            # 이 대상을 수확하는 동안 다음 대상 경로 계산
+            self._pending = self._planner.submit(self._plan_next)
+            try:
+                with self.indy.timer.measure('pick_cycle'), metrics.span('pick_cycle', pipeline=True):
+                    try:
+                        self.pick(target, waypoints)
+                        self.pool.mark_picked(target)
+                        self.counters['picked'] += 1
+                    except Exception as e:
+                        print(f"[PIPE] pick error: {e}")
+                        self.counters['failed'] += 1
+                    finally:
+                        self._go_home()
+            except Exception as e:
+                print(f"[PIPE] home error: {e}")
+                break
+            print(f"[PIPE] picked {self.counters['picked']}, "
+                  f"validated left {self.pool.validated_count()}")
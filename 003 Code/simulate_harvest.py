@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+수확 사이클 시뮬레이션 (로봇/OpenCR 없이 사이클 시간·처리량 측정)
+
+main.py 의 한 사이클(set_point → indy.run → ToF 접근 → 엔드이펙터 → 홈 복귀)을
+indy_sim.SimIndyDCP2 위에서 반복 실행하고 단계별 시간과 시간당 수확 수를 출력
+엔드이펙터 동작은 main.py 기본 시간만큼 대기로 대체, 인식 시간은 포함하지 않음
+
+- 사용:
+    python3 simulate_harvest.py --cycles 10 --scale 0.1
+    python3 simulate_harvest.py --mode sequential --scale 0.1      # 기존 이동 방식 비교
+    python3 simulate_harvest.py --targets targets.jsonl             # {"X","Y","Z","angle"} 한 줄씩
+    python3 simulate_harvest.py --per-view 4 --scale 0.1            # 연속 수확 (한 화면 4개, 홈 복귀 없음)
+    python3 simulate_harvest.py --pipeline --scale 0.1              # 파이프라인 (홈 프레임 대상, 홈 복귀 즉시 다음 수확)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from indy7 import indyCTL
+from tof_approach import approach_to_distance, _SimToF
+from harvest_planner import HarvestQueue, TargetPool, targets_to_base
+from pick_pipeline import PickPipeline
+
+# main.perform_pick_sequence 기본값 (열기 → 닫기 → 다시 열기, 사이 pause)
+EFFECTOR_SEQUENCE_S = 2.0 + 1.0 + 3.5 + 1.0 + 2.0 + 1.0
+
+
+def random_targets(n, seed=0):
+    """카메라 좌표계 기준 그럴듯한 딸기 위치 (m) + 꼭지 각도 (deg)"""
+    rng = random.Random(seed)
+    return [{'X': rng.uniform(-0.08, 0.08), 'Y': rng.uniform(-0.06, 0.06),
+             'Z': rng.uniform(0.22, 0.36), 'angle': rng.uniform(-30.0, 30.0)}
+            for _ in range(n)]
+
+
+def load_targets(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_cycle(indy, di, tof_error_mm, scale, target_mm=70, tol_mm=10):
+    """한 사이클 실행, 단계별 시간은 indy.timer 에 기록"""
+    timer = indy.timer
+    with timer.measure('pick_cycle'):
+        indy.set_point(cam_x=di['X'], depth=di['Z'])
+        indy.run(cam_x=di['X'], cam_y=di['Y'], cam_z=di['Z'], angle=di['angle'])
+        with timer.measure('tof_approach'):
+            tof = _SimToF(indy.indy, target_mm + tof_error_mm)
+            approach_to_distance(indy.indy, tof, target_mm=target_mm, tol_mm=tol_mm)
+        with timer.measure('effector'):
+            time.sleep(EFFECTOR_SEQUENCE_S * scale)
+        with timer.measure('go_home'):
+            indy.indy.go_home()
+            indy.indy.wait_for_move_finish()
+
+
+def run_view(indy, view, rng, scale, retreat_m=0.10, target_mm=70, tol_mm=10):
+    """
+    연속 수확 한 화면: 첫 대상으로 set_point 후 모든 대상을 방문 순서대로 수확, 마지막에만 홈 복귀
+    (재확인 촬영은 계획을 그대로 유지하는 것으로 대체)
+    """
+    timer = indy.timer
+    with timer.measure('view_cycle'):
+        indy.set_point(cam_x=view[0]['X'], depth=view[0]['Z'])
+        capture = indy.indy.get_task_pos()
+        queue = HarvestQueue()
+        queue.plan(targets_to_base([{'di': di, 'angle': di['angle']} for di in view], capture),
+                   start=capture[:3])
+        first = True
+        while True:
+            target = queue.pop_next()
+            if target is None:
+                break
+            if not first:
+                indy.retreat(retreat_m)
+            first = False
+            indy.pick_at(target['goal'], target['capture_uvw'], angle=target['angle'])
+            with timer.measure('tof_approach'):
+                tof = _SimToF(indy.indy, target_mm + rng.gauss(0.0, 30.0))
+                approach_to_distance(indy.indy, tof, target_mm=target_mm, tol_mm=tol_mm)
+            with timer.measure('effector'):
+                time.sleep(EFFECTOR_SEQUENCE_S * scale)
+            queue.mark_picked(target)
+        with timer.measure('go_home'):
+            indy.indy.go_home()
+            indy.indy.wait_for_move_finish()
+    return len(view)
+
+
+def run_pipeline(indy, targets, rng, scale, frame_period_s=0.066, target_mm=70, tol_mm=10):
+    """
+    파이프라인 수확: 모든 대상이 홈 자세 카메라 좌표로 보인다고 보고, 홈에 있는 동안 frame_period_s 마다 인식 결과 전달
+    (수확한 대상은 TargetPool 이 다시 추가하지 않음)
+    """
+    def pick(target, waypoints):
+        indy.pick_at(target['goal'], target['capture_uvw'], angle=target['angle'], waypoints=waypoints)
+        with indy.timer.measure('tof_approach'):
+            tof = _SimToF(indy.indy, target_mm + rng.gauss(0.0, 30.0))
+            approach_to_distance(indy.indy, tof, target_mm=target_mm, tol_mm=tol_mm)
+        with indy.timer.measure('effector'):
+            time.sleep(EFFECTOR_SEQUENCE_S * scale)
+
+    frame = [{'di': di, 'angle': di['angle']} for di in targets]
+    pipeline = PickPipeline(indy, pick, pool=TargetPool(match_radius_m=0.01),
+                            home_settle_s=0.15 * scale, poll_s=frame_period_s * scale)
+    stop = threading.Event()
+
+    def feed():
+        while not stop.wait(frame_period_s * scale):
+            if pipeline.at_home:
+                pipeline.on_targets(frame, time.monotonic())
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    pipeline.start()
+    while pipeline.counters['picked'] + pipeline.counters['failed'] < len(targets):
+        if not pipeline.running:
+            print("[SIM] pipeline thread exited before all targets were picked")
+            break
+        time.sleep(0.05)
+    pipeline.stop()
+    stop.set()
+    return pipeline.counters['picked']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="수확 사이클 시뮬레이션")
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--targets', default=None, help="대상 목록 JSONL (기본: 랜덤)")
+    parser.add_argument('--mode', default='waypoint', choices=['waypoint', 'sequential'])
+    parser.add_argument('--scale', type=float, default=1.0, help="시간 배율 (0.1 → 10배 빠르게)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--per-view', type=int, default=1, help="한 화면의 대상 수 (>1 이면 연속 수확)")
+    parser.add_argument('--pipeline', action='store_true', help="파이프라인 수확 (pick_pipeline.PickPipeline)")
+    args = parser.parse_args()
+
+    targets = load_targets(args.targets) if args.targets else random_targets(args.cycles, args.seed)
+    rng = random.Random(args.seed)
+
+    indy = indyCTL(ip="sim", motion_mode=args.mode, simulate=True, sim_time_scale=args.scale)
+    targets = targets[:args.cycles]
+    t0 = time.monotonic()
+    if args.pipeline:
+        run_pipeline(indy, targets, rng, scale=args.scale)
+    elif args.per_view > 1:
+        for i in range(0, len(targets), args.per_view):
+            run_view(indy, targets[i:i + args.per_view], rng, scale=args.scale)
+    else:
+        for di in targets:
+            run_cycle(indy, di, tof_error_mm=rng.gauss(0.0, 30.0), scale=args.scale)
+    total_s = (time.monotonic() - t0) / args.scale
+
+    # 벽시계 시간 → 시뮬레이션 시간 (scale 로 나눔)
+    snap = indy.timer.snapshot()
+    label = "pipeline" if args.pipeline else f"{args.per_view}/view"
+    print(f"\n=== Harvest cycle simulation ({args.mode}, {len(targets)} berries, {label}) ===")
+    for stage in ['set_point', f'pick_move_{indy.motion_mode}', 'pick_move_chained', 'tof_approach',
+                  'effector', 'go_home', 'home_dwell', 'pick_cycle', 'view_cycle']:
+        if stage in snap:
+            print(f"{stage:<22}{snap[stage]['avg_ms'] / 1000.0 / args.scale:>8.2f} s")
+    if targets:
+        print(f"{'berries/hour':<22}{3600.0 * len(targets) / total_s:>8.1f}")
+    print(f"robot commands: {indy.indy.n_commands}, moves: {indy.indy.n_moves}")
+    indy.indy.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,29 +1,341 @@
-import socket
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+수확점 좌표 TCP 송신 (length-prefix framing + 전송 큐 + 자동 재연결)
+
+- send_data(data): 큐에 넣고 바로 반환 (인식 루프는 막히지 않음), 전송은 전용 스레드에서
+    - 큐가 maxsize 를 넘으면 가장 오래된 메시지 drop (좌표는 최신 값이 중요)
+    - 큐에 쌓인 메시지는 batch_max 개까지 한 frame 으로 묶어 전송
+    - 연결 실패/끊김 시 backoff (retry_min_s → 2배씩 → retry_max_s) 후 재연결,
+      sendall 이 실패한 frame 은 다시 전송
+    - 매 전송 전에 select + recv(MSG_PEEK) 로 수신 쪽이 닫았는지(EOF/RST) 확인하고, 닫혔으면 이번 frame 을
+      보내지 않고 재연결 후 전송 (닫힌 연결에 쓴 첫 sendall 은 성공하므로 확인하지 않으면 그 frame 이 조용히 유실됨)
+    - 남는 유실 구간 (수신 쪽 ack 가 없으므로 감지 불가): 확인과 sendall 사이에 수신 쪽이 닫은 경우,
+      수신 쪽이 읽지 않은 채 닫은 버퍼의 frame. 끊김(sendall 실패/EOF 감지) 직전에 보낸 frame 의 메시지는
+      counters['unconfirmed'] 로 따로 셈 (유실됐을 수 있음)
+- frame: [length:u32][codec:u8][payload]  (network byte order, length = codec + payload 바이트 수)
+    payload 는 항상 메시지 목록 (batch)
+    - CODEC_JSON:    json.dumps([msg, ...])
+    - CODEC_MSGPACK: msgpack.packb([msg, ...]) (msgpack 미설치 시 json 사용)
+    - CODEC_POINT:   [count:u16] + count × POINT_STRUCT (detection 수확점 message 전용 고정 길이,
+                     다른 형태의 메시지가 섞인 batch 는 json 으로 전송)
+- FrameDecoder: 수신 쪽에서 받은 바이트를 넣으면 메시지 목록 반환
+
+- 사용:
+    sender = SocketSender('127.0.0.1', 9999, codec='point')
+    sender.connect()                    # 연결은 백그라운드에서 (서버가 아직 없어도 됨)
+    sender.send_data(target['message'])
+    sender.close()
+
+    python3 socket_sender.py            # 늦게 뜨는/재시작하는 수신 서버로 재연결·framing 확인
+"""
+
 import json
+import time
+import select
+import socket
+import struct
+import threading
+from collections import deque
+
+try:
+    import msgpack
+except ImportError:  # msgpack 미설치 시 json 으로 전송
+    msgpack = None
+
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+CODEC_POINT = 2
+CODECS = {'json': CODEC_JSON, 'msgpack': CODEC_MSGPACK, 'point': CODEC_POINT}
+
+HEADER = struct.Struct('!IB')
+POINT_COUNT = struct.Struct('!H')
+# left xyz, right xyz [m], angle [deg], center_pixel x, y
+POINT_STRUCT = struct.Struct('!7f2i')
+MAX_FRAME = 1 << 20
+
+
+def _is_point(msg):
+    try:
+        return (set(msg) == {'left', 'right', 'angle', 'center_pixel'}
+                and msg['angle'] is not None and 'x' in msg['center_pixel'])
+    except TypeError:
+        return False
+
+
+def _pack_point(msg):
+    left, right, center = msg['left'], msg['right'], msg['center_pixel']
+    return POINT_STRUCT.pack(left['x'], left['y'], left['z'], right['x'], right['y'], right['z'],
+                             msg['angle'], center['x'], center['y'])
+
+
+def _unpack_point(buf, offset):
+    lx, ly, lz, rx, ry, rz, angle, cx, cy = POINT_STRUCT.unpack_from(buf, offset)
+    r3, r2 = (lambda v: round(v, 3)), (lambda v: round(v, 2))
+    return {"left": {"x": r3(lx), "y": r3(ly), "z": r3(lz)},
+            "right": {"x": r3(rx), "y": r3(ry), "z": r3(rz)},
+            "angle": r2(angle),
+            "center_pixel": {"x": cx, "y": cy}}
+
+
+def encode_frame(messages, codec=CODEC_JSON):
+    """메시지 목록 → frame 바이트 (codec 을 쓸 수 없으면 json)"""
+    if codec == CODEC_POINT and all(_is_point(m) for m in messages):
+        payload = POINT_COUNT.pack(len(messages)) + b''.join(_pack_point(m) for m in messages)
+    elif codec == CODEC_MSGPACK and msgpack is not None:
+        payload = msgpack.packb(messages)
+    else:
+        codec = CODEC_JSON
+        payload = json.dumps(messages, separators=(',', ':')).encode('utf-8')
+    return HEADER.pack(len(payload) + 1, codec) + payload
+
+
+def decode_payload(codec, payload):
+    if codec == CODEC_JSON:
+        return json.loads(payload.decode('utf-8'))
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack frame received but msgpack is not installed")
+        return msgpack.unpackb(payload)
+    if codec == CODEC_POINT:
+        (count,) = POINT_COUNT.unpack_from(payload, 0)
+        return [_unpack_point(payload, POINT_COUNT.size + i * POINT_STRUCT.size) for i in range(count)]
+    raise ValueError(f"unknown codec {codec}")
+
+
+class FrameDecoder:
+    """스트림 바이트 → 메시지 목록 (frame 경계와 recv 경계가 달라도 됨)"""
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def feed(self, data):
+        self._buf += data
+        messages = []
+        while len(self._buf) >= HEADER.size:
+            length, codec = HEADER.unpack_from(self._buf, 0)
+            if length < 1 or length > MAX_FRAME:
+                raise ValueError(f"invalid frame length {length}")
+            end = HEADER.size + length - 1
+            if len(self._buf) < end:
+                break
+            payload = bytes(self._buf[HEADER.size:end])
+            del self._buf[:end]
+            messages.extend(decode_payload(codec, payload))
+        return messages
+
 
 class SocketSender:
-    def __init__(self, host='127.0.0.1', port=9999):
+    def __init__(self, host='127.0.0.1', port=9999, codec='json', maxsize=256, batch_max=8,
+                 retry_min_s=0.2, retry_max_s=5.0, verbose=False):
+        """
+        :param codec: 'json' / 'msgpack' / 'point' (수확점 message 고정 길이 binary)
+        :param batch_max: frame 하나에 묶는 최대 메시지 수 (1 이면 batch 없음)
+        :param verbose: True 면 전송한 frame 마다 출력
+        """
+        if codec not in CODECS:
+            raise ValueError(f"unknown codec {codec} (choose from {sorted(CODECS)})")
+        if codec == 'msgpack' and msgpack is None:
+            print("[SOCKET] msgpack 미설치, json 으로 전송")
         self.host = host
         self.port = port
+        self.codec = CODECS[codec]
+        self.maxsize = maxsize
+        self.batch_max = max(1, batch_max)
+        self.retry_min_s = retry_min_s
+        self.retry_max_s = retry_max_s
+        self.verbose = verbose
+
         self.sock = None
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._retry = None          # 전송 실패한 frame (재연결 후 먼저 전송)
+        self._thread = None
+        self._closing = False
+        self._closed = False
+        self._last_sent = 0         # 현재 연결에서 마지막으로 보낸 frame 의 메시지 수
+        self.counters = {'sent': 0, 'frames': 0, 'bytes': 0, 'dropped': 0, 'reconnects': 0, 'errors': 0,
+                         'resent': 0, 'unconfirmed': 0}
 
     def connect(self):
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.sock.connect((self.host, self.port))
-        print(f"[SOCKET] Connected to {self.host}:{self.port}")
+        """전송 스레드 시작 (연결은 스레드에서, 실패하면 backoff 후 재시도)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="socket-sender", daemon=True)
+            self._thread.start()
 
     def send_data(self, data: dict):
-        if self.sock is None:
-            raise RuntimeError("Socket not connected. Call connect() first.")
+        """큐에 넣고 바로 반환 (close 이후에는 False)"""
+        with self._cond:
+            if self._closing:
+                return False
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.counters['dropped'] += 1
+            self._queue.append(data)
+            self._cond.notify()
+        return True
+
+    def backlog(self):
+        with self._cond:
+            return len(self._queue) + (1 if self._retry is not None else 0)
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters, queued=len(self._queue), connected=self.sock is not None)
+
+    # ------------------------- 전송 스레드 -------------------------
+
+    def _open(self):
+        sock = socket.create_connection((self.host, self.port), timeout=2.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._cond:
+            self.sock = sock
+            self.counters['reconnects'] += 1
+        print(f"[SOCKET] Connected to {self.host}:{self.port}")
+
+    def _drop(self):
+        with self._cond:
+            sock, self.sock = self.sock, None
+            self._last_sent = 0
+        if sock is not None:
+            sock.close()
+
+    def _peer_closed(self):
+        """수신 쪽이 연결을 닫았는지 (EOF 또는 RST), 블로킹하지 않음"""
         try:
-            json_data = json.dumps(data)
-            self.sock.sendall(json_data.encode('utf-8'))
-            print(f"[SOCKET] Sent: {json_data}")
-        except Exception as e:
-            print(f"[SOCKET] Error sending data: {e}")
-
-    def close(self):
-        if self.sock:
-            self.sock.close()
-            self.sock = None
-            print("[SOCKET] Connection closed.")
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            if not readable:
+                return False
+            return self.sock.recv(1, socket.MSG_PEEK) == b''
+        except (OSError, ValueError):
+            return True
+
+    def _requeue(self, item, reason):
+        """item 을 재연결 후 먼저 보내도록 남기고 연결 정리"""
+        self.counters['errors'] += 1
+        with self._cond:
+            self._retry = item
+            # 직전 frame 은 수신 쪽이 닫히기 전에 읽었는지 알 수 없음
+            self.counters['unconfirmed'] += self._last_sent
+        print(f"[SOCKET] {reason}, resending {item[1]} messages after reconnect")
+        self.counters['resent'] += item[1]
+        self._drop()
+
+    def _next_frame(self):
+        """다음에 보낼 (frame, 메시지 수), 보낼 것이 없으면 대기 후 None"""
+        with self._cond:
+            if self._retry is not None:
+                item, self._retry = self._retry, None
+                return item
+            if not self._queue:
+                self._cond.wait(0.1)
+                if not self._queue:
+                    return None
+            n = min(self.batch_max, len(self._queue))
+            messages = [self._queue.popleft() for _ in range(n)]
+        return encode_frame(messages, self.codec), n
+
+    def _run(self):
+        backoff = self.retry_min_s
+        while True:
+            with self._cond:
+                if self._closed or (self._closing and not self._queue and self._retry is None):
+                    break
+            if self.sock is None:
+                try:
+                    self._open()
+                    backoff = self.retry_min_s
+                except OSError as e:
+                    self.counters['errors'] += 1
+                    print(f"[SOCKET] connect failed ({e}), retry in {backoff:.1f}s, backlog {self.backlog()}")
+                    with self._cond:
+                        self._cond.wait(backoff)
+                    backoff = min(backoff * 2.0, self.retry_max_s)
+                    continue
+            item = self._next_frame()
+            if item is None:
+                continue
+            frame, n = item
+            if self._peer_closed():
+                self._requeue(item, "Peer closed connection")
+                continue
+            try:
+                self.sock.sendall(frame)
+            except OSError as e:
+                self._requeue(item, f"Error sending data: {e}")
+                continue
+            self._last_sent = n
+            self.counters['sent'] += n
+            self.counters['frames'] += 1
+            self.counters['bytes'] += len(frame)
+            if self.verbose:
+                print(f"[SOCKET] Sent {n} messages ({len(frame)} bytes)")
+        self._drop()
+
+    def close(self, timeout=2.0):
+        """남은 메시지를 timeout 까지 전송한 뒤 종료"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(1.0)
+        self._drop()
+        left = self.backlog()
+        print(f"[SOCKET] Connection closed. {self.counters}" + (f", {left} unsent" if left else ""))
+
+
+if __name__ == "__main__":
+    # 수신 서버가 늦게 뜨고 중간에 재시작해도 좌표가 frame 단위로 그대로 복원되는지 확인
+    def serve_once(server, received, n_min):
+        """n_min 개 이상 받고 더 들어오는 데이터가 없으면 연결을 닫음 (읽은 데이터는 모두 처리)"""
+        conn, _ = server.accept()
+        conn.settimeout(1.0)
+        decoder = FrameDecoder()
+        with conn:
+            while True:
+                if len(received) >= n_min and not select.select([conn], [], [], 0.1)[0]:
+                    break
+                try:
+                    data = conn.recv(65536)
+                except socket.timeout:
+                    break
+                if not data:
+                    break
+                received.extend(decoder.feed(data))
+
+    def point(i):
+        return {"left": {"x": 0.1 * i, "y": 0.02, "z": 0.31}, "right": {"x": 0.1 * i + 0.01, "y": 0.02, "z": 0.31},
+                "angle": 12.5, "center_pixel": {"x": 320 + i, "y": 240}}
+
+    for codec in ('json', 'point'):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+
+        sender = SocketSender('127.0.0.1', port, codec=codec, retry_min_s=0.05)
+        sender.connect()
+        t0 = time.perf_counter()
+        for i in range(20):
+            sender.send_data(point(i))
+        print(f"[DEMO] {codec}: 20 sends before server listens: {(time.perf_counter() - t0) * 1000.0:.2f} ms")
+        time.sleep(0.2)
+
+        received = []
+        server.listen(1)
+        serve_once(server, received, 10)          # 받은 만큼 처리하고 끊음 (수신 쪽 재시작)
+        for i in range(20, 30):
+            sender.send_data(point(i))
+        serve_once(server, received, 30)
+        sender.close()
+        server.close()
+        xs = sorted({m['center_pixel']['x'] - 320 for m in received})
+        print(f"[DEMO] {codec}: received {len(received)} messages, distinct {len(xs)}, "
+              f"resent {sender.counters['resent']}, unconfirmed {sender.counters['unconfirmed']}")
+        assert xs == list(range(30)), f"{codec}: missing {sorted(set(range(30)) - set(xs))}"
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+detection → app.py(Firebase) 텔레메트리 채널 (Unix domain socket, JSON line + ack)
+
+- TelemetrySender (detection 쪽): send() 는 메모리 큐에 넣고 바로 반환 (인식 루프는 절대 막히지 않음)
+    전용 스레드가 소켓으로 전송, 연결이 끊기거나 app.py 가 느리면 큐에 쌓임
+    - 병합: 연속된 'count' 는 N 을 합산, 연속된 상태 메시지(init_data / clear)는 마지막 것만 유지
+    - 큐가 maxsize 를 넘으면 가장 오래된 메시지 drop (dropped 카운트)
+    - ack 를 받기 전 메시지(in-flight, 최대 window 개)는 재연결 시 다시 전송
+    - backlog(): 큐 + ack 대기 메시지 수
+- TelemetryReceiver (app.py 쪽): 소켓에서 메시지를 읽어 handler(msg) 호출 후 {"ack": seq} 응답
+    재전송으로 같은 seq 가 다시 오면 처리하지 않고 ack 만 보냄
+
+- 연결 직후 {"hello": sid} (sender 마다 다른 sid, 바뀌면 receiver 의 seq 기록 초기화)
+- 메시지: {"seq": n, "Task": ..., "Total": ..., "Mature": ..., "N": ...}
+"""
+
+import os
+import json
+import time
+import socket
+import select
+import uuid
+import threading
+from collections import deque, OrderedDict
+
+MERGE_SUM = {'count': 'N'}              # 연속되면 필드 합산
+MERGE_REPLACE = {'init_data', 'clear'}  # 연속되면 마지막 것만 유지
+
+
+class TelemetrySender:
+    def __init__(self, path, maxsize=1024, window=64, retry_s=0.5, high_water=256):
+        self.path = path
+        self.maxsize = maxsize
+        self.window = window
+        self.retry_s = retry_s
+        self.high_water = high_water
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._in_flight = OrderedDict()   # seq → msg (ack 대기)
+        self._seq = 0
+        self._sid = uuid.uuid4().hex
+        self._sock = None
+        self._closing = False
+        self._closed = False
+        self._over_high_water = False
+        self.counters = {'sent': 0, 'acked': 0, 'merged': 0, 'dropped': 0, 'resent': 0, 'reconnects': 0}
+
+        self._thread = threading.Thread(target=self._run, name="telemetry-sender", daemon=True)
+        self._thread.start()
+
+    # ------------------------- 호출 스레드 (non-blocking) -------------------------
+
+    def send(self, task, **fields):
+        msg = dict(fields, Task=task)
+        with self._cond:
+            if self._closing:
+                return False
+            tail = self._queue[-1] if self._queue else None
+            # 한 번 전송한 메시지(seq 있음)는 receiver 가 이미 처리했을 수 있으므로 병합하지 않음
+            if (tail is not None and 'seq' not in tail and tail['Task'] == task
+                    and (task in MERGE_SUM or task in MERGE_REPLACE)):
+                if task in MERGE_SUM:
+                    key = MERGE_SUM[task]
+                    tail[key] = tail.get(key, 1) + msg.get(key, 1)
+                else:
+                    self._queue[-1] = msg
+                self.counters['merged'] += 1
+            else:
+                if len(self._queue) >= self.maxsize:
+                    self._queue.popleft()
+                    self.counters['dropped'] += 1
+                self._queue.append(msg)
+            self._check_high_water()
+            self._cond.notify()
+        return True
+
+    def backlog(self):
+        with self._cond:
+            return len(self._queue) + len(self._in_flight)
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters, queued=len(self._queue), in_flight=len(self._in_flight),
+                        connected=self._sock is not None)
+
+    def _check_high_water(self):
+        depth = len(self._queue) + len(self._in_flight)
+        if depth >= self.high_water and not self._over_high_water:
+            self._over_high_water = True
+            print(f"[TELEMETRY] backlog {depth} (app.py 응답 지연)")
+        elif depth < self.high_water // 2 and self._over_high_water:
+            self._over_high_water = False
+            print(f"[TELEMETRY] backlog recovered ({depth})")
+
+    # ------------------------- 전송 스레드 -------------------------
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(1.0)
+        try:
+            sock.connect(self.path)
+            sock.sendall((json.dumps({'hello': self._sid}) + '\n').encode())
+        except OSError:
+            sock.close()
+            return False
+        with self._cond:
+            self._sock = sock
+            # ack 못 받은 메시지는 seq 순서대로 큐 앞에 다시 넣음
+            resend = list(self._in_flight.values())
+            self._in_flight.clear()
+            self._queue.extendleft(reversed(resend))
+            self.counters['resent'] += len(resend)
+            self.counters['reconnects'] += 1
+        return True
+
+    def _disconnect(self):
+        with self._cond:
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            sock.close()
+
+    def _read_acks(self, sock, buf):
+        data = sock.recv(65536)
+        if not data:
+            raise ConnectionError("receiver closed")
+        buf += data
+        *lines, buf = buf.split(b'\n')
+        with self._cond:
+            for line in lines:
+                seq = json.loads(line).get('ack')
+                if self._in_flight.pop(seq, None) is not None:
+                    self.counters['acked'] += 1
+            self._check_high_water()
+            self._cond.notify_all()
+        return buf
+
+    def _run(self):
+        buf = b''
+        while True:
+            with self._cond:
+                if self._closed or (self._closing and not self._queue and not self._in_flight):
+                    break
+                sock = self._sock
+            if sock is None:
+                if not self._connect():
+                    with self._cond:
+                        self._cond.wait(self.retry_s)
+                    continue
+                buf = b''
+                sock = self._sock
+            try:
+                # 전송 가능한 만큼 전송 (window 이내)
+                while True:
+                    with self._cond:
+                        if not self._queue or len(self._in_flight) >= self.window:
+                            break
+                        msg = self._queue.popleft()
+                        if 'seq' not in msg:
+                            self._seq += 1
+                            msg['seq'] = self._seq
+                        self._in_flight[msg['seq']] = msg
+                    sock.sendall((json.dumps(msg) + '\n').encode())
+                    self.counters['sent'] += 1
+                # ack 수신 (새 메시지가 없으면 짧게 대기)
+                readable, _, _ = select.select([sock], [], [], 0.05)
+                if readable:
+                    buf = self._read_acks(sock, buf)
+                else:
+                    with self._cond:
+                        if not self._queue or len(self._in_flight) >= self.window:
+                            self._cond.wait(0.05)
+            except (OSError, ValueError, ConnectionError) as e:
+                print(f"[TELEMETRY] connection lost: {e}")
+                self._disconnect()
+        self._disconnect()
+
+    def close(self, timeout=5.0):
+        """남은 메시지 전송/ack 를 timeout 까지 기다린 뒤 종료"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(1.0)
+        left = self.backlog()
+        if left:
+            print(f"[TELEMETRY] closed with {left} undelivered messages")
+
+
+class TelemetryReceiver:
+    def __init__(self, path, handler):
+        """
+        :param path: Unix socket 경로 (이미 있으면 지우고 새로 bind)
+        :param handler: handler(msg) 메시지 처리 (예외가 나도 ack, 오류는 출력)
+        """
+        self.path = path
+        self.handler = handler
+        self._sid = None
+        self._last_seq = 0
+        self._stop = threading.Event()
+        if os.path.exists(path):
+            os.unlink(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(1)
+        self._server.settimeout(0.5)
+        self.counters = {'received': 0, 'duplicates': 0, 'errors': 0}
+        self._thread = threading.Thread(target=self._accept_loop, name="telemetry-receiver", daemon=True)
+        self._thread.start()
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self._serve(conn)
+
+    def _serve(self, conn):
+        conn.settimeout(0.5)
+        buf = b''
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    data = conn.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not data:
+                    break
+                buf += data
+                *lines, buf = buf.split(b'\n')
+                acks = []
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        msg = json.loads(line)
+                        if not isinstance(msg, dict):
+                            raise ValueError(f"not an object: {type(msg).__name__}")
+                    except ValueError as e:
+                        # 잘못된 줄 하나로 수신 스레드가 죽지 않도록 건너뜀 (seq 를 모르므로 ack 없음)
+                        self.counters['errors'] += 1
+                        print(f"[TELEMETRY] malformed line dropped: {e}")
+                        continue
+                    if 'hello' in msg:
+                        if msg['hello'] != self._sid:
+                            self._sid, self._last_seq = msg['hello'], 0
+                        continue
+                    seq = msg.pop('seq', None)
+                    if seq is not None and seq <= self._last_seq:
+                        self.counters['duplicates'] += 1
+                    else:
+                        try:
+                            self.handler(msg)
+                        except Exception as e:
+                            self.counters['errors'] += 1
+                            print(f"[TELEMETRY] handler error: {e} ({msg})")
+                        self.counters['received'] += 1
+                        if seq is not None:
+                            self._last_seq = seq
+                    if seq is not None:
+                        acks.append(json.dumps({'ack': seq}) + '\n')
+                if acks:
+                    try:
+                        conn.sendall(''.join(acks).encode())
+                    except OSError:
+                        break
+
+    def close(self):
+        self._stop.set()
+        self._server.close()
+        self._thread.join(2.0)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+if __name__ == "__main__":
+    # 수신 쪽이 느리거나(처리 0.2s) 늦게 시작해도 send() 가 막히지 않는지 확인
+    import tempfile
+
+    path = os.path.join(tempfile.gettempdir(), f"telemetry-demo-{os.getpid()}.sock")
+    sender = TelemetrySender(path)
+    t0 = time.perf_counter()
+    sender.send('init_data', Total=40, Mature=12)
+    for _ in range(50):
+        sender.send('count')
+    print(f"[DEMO] 51 sends with no receiver: {(time.perf_counter() - t0) * 1000.0:.2f} ms, "
+          f"backlog {sender.backlog()}")
+
+    received = []
+    receiver = TelemetryReceiver(path, lambda msg: (time.sleep(0.2), received.append(msg)))
+    for _ in range(10):
+        sender.send('count')
+    sender.close(timeout=5.0)
+    receiver.close()
+    print(f"[DEMO] received {received}")
+    print(f"[DEMO] sender {sender.stats()}, receiver {receiver.counters}")
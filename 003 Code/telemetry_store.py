@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+오프라인 우선 텔레메트리 저장소 (SQLite WAL) + Firestore 동기화
+
+- TelemetryStore: init_data / init_log / count / clear 이벤트를 시각과 함께 로컬 DB 에 먼저 기록
+    네트워크/Firebase 상태와 관계없이 app.py 는 로컬 기록만 하고 바로 반환
+- TelemetrySyncer: 백그라운드에서 Firebase 연결을 (재)시도하고, 미동기화 이벤트를 순서대로 재생
+    이벤트 갱신과 동기화 위치(Harvest_Data/Sync.last_event_id)를 같은 batch 로 commit
+    → commit 후 로컬 표시 전에 종료돼도 다음 연결 시 위치를 읽어 이미 반영된 이벤트는 건너뜀 (멱등)
+    init_log 문서 ID 는 이벤트 ID 로 고정 (evt-<id>)
+    재생 도중 실패하면 commit 하지 않은 갱신은 버리고 (discard) 다음 연결에서 같은 이벤트부터 다시 재생
+- 잘못된 이벤트: append 에서 ValueError, 이미 DB 에 있는 잘못된 이벤트는 quarantine 테이블로 분리하고 건너뜀
+    (한 이벤트 때문에 동기화가 멈추지 않음)
+
+- 사용:
+    store = TelemetryStore('telemetry.db')
+    syncer = TelemetrySyncer(store, connect=lambda: FirebaseConnection(flush_interval_s=None, max_pending=None))
+    store.append('count', n=1); syncer.wake()
+    syncer.close(); store.close()
+
+    python3 telemetry_store.py     # 오프라인 → 재연결 → commit 후 중단 상황을 FakeFirestore 로 재현
+"""
+
+import time
+import sqlite3
+import datetime
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts     REAL NOT NULL,
+    task   TEXT NOT NULL,
+    total  INTEGER,
+    mature INTEGER,
+    n      INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quarantine (
+    id    INTEGER PRIMARY KEY,
+    error TEXT NOT NULL
+);
+"""
+
+TASKS = ('init_data', 'init_log', 'count', 'clear')
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def validate_event(task, total=None, mature=None, n=1):
+    """이벤트 필드 검사, 잘못되면 ValueError"""
+    if task not in TASKS:
+        raise ValueError(f"unknown telemetry task: {task}")
+    if task in ('init_data', 'init_log'):
+        if not (_is_count(total) and _is_count(mature)):
+            raise ValueError(f"{task}: Total/Mature must be non-negative integers (got {total}, {mature})")
+        if mature > total:
+            raise ValueError(f"{task}: Mature {mature} > Total {total}")
+    elif task == 'count':
+        if not (_is_count(n) and n > 0):
+            raise ValueError(f"count: N must be a positive integer (got {n})")
+
+
+class TelemetryStore:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")   # WAL 에서는 전원 차단 시에도 DB 손상 없음 (마지막 commit 일부만 유실 가능)
+        self._db.executescript(SCHEMA)
+
+    def append(self, task, total=None, mature=None, n=1, ts=None):
+        """이벤트 기록 후 이벤트 ID 반환 (잘못된 이벤트는 기록하지 않고 ValueError)"""
+        validate_event(task, total, mature, n)
+        with self._lock:
+            cur = self._db.execute("INSERT INTO events (ts, task, total, mature, n) VALUES (?, ?, ?, ?, ?)",
+                                   (ts if ts is not None else time.time(), task, total, mature, n))
+            return cur.lastrowid
+
+    def synced_id(self):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM sync_state WHERE key = 'synced_id'").fetchone()
+        return row[0] if row else 0
+
+    def mark_synced(self, event_id):
+        with self._lock:
+            self._db.execute("INSERT INTO sync_state (key, value) VALUES ('synced_id', ?) "
+                             "ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)", (event_id,))
+
+    def pending(self, limit=200):
+        """미동기화 이벤트 [(id, ts, task, total, mature, n), ...] (ID 순, quarantine 제외)"""
+        synced = self.synced_id()
+        with self._lock:
+            return self._db.execute("SELECT id, ts, task, total, mature, n FROM events WHERE id > ? "
+                                    "AND id NOT IN (SELECT id FROM quarantine) "
+                                    "ORDER BY id LIMIT ?", (synced, limit)).fetchall()
+
+    def backlog(self):
+        synced = self.synced_id()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM events WHERE id > ? "
+                                    "AND id NOT IN (SELECT id FROM quarantine)", (synced,)).fetchone()[0]
+
+    def quarantine(self, event_id, error):
+        """동기화할 수 없는 이벤트 분리 (events 에는 남겨 두고 재생만 건너뜀)"""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO quarantine (id, error) VALUES (?, ?)", (event_id, str(error)))
+
+    def quarantined(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM quarantine").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def apply_event(fc, row):
+    """
+    이벤트 한 개를 FirebaseConnection 갱신으로 변환
+    init_log 외에는 writer 에 쌓기만 함, init_log 는 transaction 으로 동기화 위치와 함께 바로 commit
+    """
+    event_id, ts, task, total, mature, n = row
+    if task == 'init_data':
+        fc.init_data(total, mature)
+    elif task == 'init_log':
+        when = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc)
+        fc.init_log(total, mature, when=when, log_id=f"evt-{event_id}", sync_marker=event_id)
+    elif task == 'count':
+        fc.increment_harvest_count(n)
+    elif task == 'clear':
+        fc.clear_data()
+
+
+class TelemetrySyncer:
+    def __init__(self, store, connect, interval_s=2.0, retry_s=10.0, batch_size=200):
+        """
+        :param connect: FirebaseConnection 을 만드는 함수 (자동 flush 없이: flush_interval_s=None, max_pending=None)
+                        오프라인이면 예외 → retry_s 후 재시도
+        :param interval_s: 새 이벤트 확인 주기 (wake() 호출 시 바로 동기화)
+        :param batch_size: commit 한 번에 재생할 최대 이벤트 수
+        """
+        self.store = store
+        self.connect = connect
+        self.interval_s = interval_s
+        self.retry_s = retry_s
+        self.batch_size = batch_size
+
+        self._fc = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.counters = {'synced': 0, 'commits': 0, 'skipped': 0, 'connects': 0, 'errors': 0,
+                         'quarantined': 0, 'discarded': 0}
+        self._thread = threading.Thread(target=self._run, name="telemetry-sync", daemon=True)
+        self._thread.start()
+
+    @property
+    def online(self):
+        return self._fc is not None
+
+    def wake(self):
+        self._wake.set()
+
+    def _ensure_connected(self):
+        if self._fc is not None:
+            return
+        fc = self.connect()
+        # 이미 Firestore 에 반영된 위치까지 로컬 표시 (commit 후 표시 전에 중단된 경우)
+        marker = fc.read_sync_marker()
+        if marker > self.store.synced_id():
+            self.counters['skipped'] += marker - self.store.synced_id()
+            self.store.mark_synced(marker)
+        self._fc = fc
+        self.counters['connects'] += 1
+        print(f"[SYNC] connected (synced up to event {self.store.synced_id()})")
+
+    def _drop_connection(self):
+        """연결 버리기, commit 하지 않은 갱신은 기록하지 않음 (sync 위치 없이 기록되면 다시 재생할 때 중복)"""
+        fc, self._fc = self._fc, None
+        if fc is not None:
+            try:
+                self.counters['discarded'] += fc.discard()
+                fc.close()
+            except Exception:
+                pass
+
+    def _commit(self, last_id, n_events):
+        """쌓인 갱신 + 동기화 위치를 batch 하나로 commit"""
+        self._fc.set_sync_marker(last_id)
+        self._fc.flush(raise_errors=True)
+        self.store.mark_synced(last_id)
+        self.counters['commits'] += 1
+        self.counters['synced'] += n_events
+
+    def sync_once(self):
+        """미동기화 이벤트를 batch_size 씩 모두 재생, 동기화한 이벤트 수 반환 (실패 시 예외)"""
+        total = 0
+        while True:
+            self._ensure_connected()
+            rows = self.store.pending(self.batch_size)
+            if not rows:
+                return total
+            n_queued = 0        # commit 하지 않고 writer 에 쌓인 이벤트 수
+            prev_id = None
+            for row in rows:
+                event_id, task = row[0], row[2]
+                try:
+                    validate_event(*row[2:])
+                    if task != 'init_log':
+                        apply_event(self._fc, row)
+                except Exception as e:
+                    # init_log 외의 apply_event 는 writer 에 쌓기만 하므로 여기서의 예외는 이벤트 문제
+                    # → 분리하고, 이 batch 에서 쌓인 갱신과 로컬 상태는 버린 뒤 다시 연결해 처음부터
+                    print(f"[SYNC] quarantine event {event_id}: {type(e).__name__}: {e}")
+                    self.store.quarantine(event_id, e)
+                    self.counters['quarantined'] += 1
+                    self._drop_connection()
+                    break
+                if task == 'init_log':
+                    # 앞서 쌓인 이벤트를 먼저 commit, init_log 는 transaction 으로 동기화 위치와 함께 commit
+                    if n_queued:
+                        self._commit(prev_id, n_queued)
+                        total += n_queued
+                        n_queued = 0
+                    apply_event(self._fc, row)
+                    self.store.mark_synced(event_id)
+                    self.counters['commits'] += 1
+                    self.counters['synced'] += 1
+                    total += 1
+                else:
+                    n_queued += 1
+                prev_id = event_id
+            else:
+                if n_queued:
+                    self._commit(prev_id, n_queued)
+                    total += n_queued
+
+    def _run(self):
+        delay = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.sync_once()
+                delay = self.interval_s
+            except Exception as e:
+                # 연결/commit 실패: 로컬 기록은 그대로, 연결을 버리고 나중에 처음부터 다시 (위치 다시 읽음)
+                self.counters['errors'] += 1
+                print(f"[SYNC] offline ({type(e).__name__}: {e}), backlog {self.store.backlog()}, "
+                      f"retry in {self.retry_s:g}s")
+                self._drop_connection()
+                delay = self.retry_s
+        # 마지막 동기화도 이 스레드에서 (다른 스레드와 같은 이벤트를 동시에 재생하면 Increment 가 두 번 반영됨)
+        try:
+            self.sync_once()
+        except Exception as e:
+            print(f"[SYNC] final sync failed, {self.store.backlog()} events kept locally: {e}")
+        self._drop_connection()
+
+    def close(self, timeout=10.0):
+        """마지막으로 한 번 동기화 시도 후 종료 (실패해도 이벤트는 로컬에 남아 다음 실행 때 동기화)"""
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"[SYNC] sync still running after {timeout:g}s, "
+                  f"{self.store.backlog()} events kept locally until it finishes")
+        print(f"[SYNC] closed {self.counters}")
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from firestore_fake import FakeFirestore
+    from firebase_connection import FirebaseConnection
+
+    path = os.path.join(tempfile.gettempdir(), f"telemetry-demo-{os.getpid()}.db")
+    db = FakeFirestore()
+    db.collection('Harvest_Data').document('Data').set({'n_harvest': 0})
+    network = {'up': False}
+
+    def connect():
+        if not network['up']:
+            raise ConnectionError("greenhouse Wi-Fi down")
+        return FirebaseConnection(db=db, flush_interval_s=None, max_pending=None)
+
+    store = TelemetryStore(path)
+    syncer = TelemetrySyncer(store, connect, interval_s=0.1, retry_s=0.2)
+    store.append('init_data', 40, 12)
+    store.append('init_log', 40, 12)
+    for _ in range(5):
+        store.append('count')
+    time.sleep(0.3)
+    print(f"[DEMO] offline: backlog {store.backlog()}, firestore {db.dump()['Harvest_Data/Data']}")
+
+    network['up'] = True
+    time.sleep(0.5)
+    print(f"[DEMO] online: backlog {store.backlog()}, firestore {db.dump()['Harvest_Data/Data']}")
+
+    # commit 후 로컬 표시 전에 중단된 상황: 로컬 위치를 되돌려도 다시 반영되지 않아야 함
+    syncer.close()
+    with store._lock:
+        store._db.execute("DELETE FROM sync_state")
+    store.append('count', n=2)
+    syncer = TelemetrySyncer(store, connect, interval_s=0.1, retry_s=0.2)
+    time.sleep(0.3)
+    syncer.close()
+    print(f"[DEMO] after replay: firestore {db.dump()['Harvest_Data/Data']} (n_harvest should be 7)")
+    store.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.unlink(path + suffix)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ToF 연속 접근 (closed-loop)
+
+기존 adjust_to_target_distance_mm 은 "측정 → 이동 → 정지 대기 → 측정" 을 반복하지만,
+여기서는 툴 z축으로 남은 거리만큼 한 번에 이동을 시작하고, 이동 중 들어오는 ToF 샘플로
+오차를 계속 확인해 허용 범위에 들어오면 바로 정지한다.
+
+IndyDCP2 는 이동 중 속도를 바꿀 수 없음 (task_vel_level 은 다음 이동 명령부터 적용, 속도 override 없음)
+→ 속도 레벨은 이동 명령을 보낼 때의 오차로 한 번 정하고, 실행 중인 이동은 레벨 때문에 멈추지 않음
+  (이동 끝점이 목표 거리이므로 목표 근처에서는 궤적 자체가 감속)
+  다시 명령하는 경우: 목표 밖에서 이동이 끝났을 때, 목표를 지나쳤을 때 (방향 반대 → 정지 후 후퇴)
+
+- robot: IndyDCP2 호환 객체 (set_task_base, set_task_vel_level, get_task_vel_level,
+         task_move_by, stop_motion, get_robot_status, wait_for_move_finish)
+- tof  : ToF_Sensor (start_sampling 이 켜진 상태, latest() 사용)
+
+- 시뮬레이션:
+    python3 tof_approach.py --start 180 --target 70
+"""
+
+import time
+import argparse
+from typing import Optional
+
+import numpy as np
+
+import metrics
+from motion_plan import uvw_to_rot
+
+# (|오차| 하한 mm, 속도 레벨): 오차가 클수록 빠르게, 가까워질수록 느리게
+DEFAULT_SPEED_SCHEDULE = ((80, 3), (30, 2), (0, 1))
+
+
+def speed_level_for(err_mm: float, schedule=DEFAULT_SPEED_SCHEDULE) -> int:
+    for min_err, level in schedule:
+        if abs(err_mm) >= min_err:
+            return level
+    return schedule[-1][1]
+
+
+def _is_moving(robot) -> bool:
+    status = robot.get_robot_status()
+    return bool(status.get('busy')) and not bool(status.get('movedone'))
+
+
+def approach_to_distance(robot, tof,
+                         target_mm: int = 70, tol_mm: int = 10,
+                         max_travel_mm: float = 200.0,
+                         speed_schedule=DEFAULT_SPEED_SCHEDULE,
+                         timeout_s: float = 8.0,
+                         poll_s: float = 0.02,
+                         max_sample_age_s: float = 0.2,
+                         stop_band_mm: Optional[float] = None) -> Optional[int]:
+    """
+    툴 z축 연속 접근으로 ToF 거리를 target_mm ± tol_mm 에 맞춤
+    - 이동 중에는 |오차| <= stop_band_mm (기본 tol_mm/3) 이면 즉시 정지
+    - 이동이 끝났을 때 |오차| <= tol_mm 이면 완료, 아니면 남은 오차로 다시 이동
+    - 이동 중 목표를 지나치면 (오차 부호 반대, |오차| > tol_mm) 정지 후 반대 방향으로 이동
+    - 속도 레벨은 명령할 때의 오차로 speed_schedule 에서 선택 (이동 중에는 바꾸지 않음)
+    - 명령한 이동 길이 합이 max_travel_mm 를 넘게 되는 이동은 보내지 않고 중단 (ToF 오측정 시 충돌 방지)
+    return: 최종 거리(mm), 유효한 ToF 값이 없거나 시간/이동량 초과 시 None
+    """
+    if stop_band_mm is None:
+        stop_band_mm = tol_mm / 3.0
+    restore_level = robot.get_task_vel_level()
+    robot.set_task_base(1)
+
+    t0 = time.monotonic()
+    commanded_mm = 0.0     # 명령한 이동 길이 합 (안전 한계 확인용, 중간에 정지한 이동도 전체 길이로 셈)
+    moving = False
+    cur_level = None
+    cur_dir = 0
+    n_commands = 0
+    dist = None
+
+    try:
+        while time.monotonic() - t0 < timeout_s:
+            sample = tof.latest(max_age_s=max_sample_age_s)
+            if sample is None:
+                time.sleep(poll_s)
+                continue
+            _, dist = sample
+            err = dist - target_mm
+
+            if moving and not _is_moving(robot):
+                moving = False
+
+            if abs(err) <= stop_band_mm or (not moving and abs(err) <= tol_mm):
+                if moving:
+                    robot.stop_motion()
+                    robot.wait_for_move_finish()
+                    moving = False
+                print(f"[ToF] 연속 접근 완료: {dist} mm (명령 {n_commands}회, "
+                      f"{time.monotonic() - t0:.2f}s)")
+                metrics.event('tof_approach_done', dist_mm=dist, commands=n_commands)
+                metrics.count('tof_move_commands', n_commands)
+                return dist
+
+            direction = 1 if err > 0 else -1   # 멀다 → +z(접근), 가깝다 → -z(후퇴)
+            overshoot = moving and direction != cur_dir and abs(err) > tol_mm
+
+            if not moving or overshoot:
+                level = speed_level_for(err, speed_schedule)
+                remaining = abs(err)
+                if commanded_mm + remaining > max_travel_mm:
+                    print(f"[ToF] 최대 이동량 {max_travel_mm} mm 초과 → 접근 중단")
+                    break
+                if overshoot:
+                    robot.stop_motion()
+                    robot.wait_for_move_finish()
+                metrics.event('tof_move', err_mm=err, level=level, direction=direction, overshoot=overshoot)
+                if level != cur_level:
+                    robot.set_task_vel_level(level)
+                # 남은 오차만큼 한 번에 이동 시작 (정지는 ToF 로 판단)
+                robot.task_move_by([0.0, 0.0, direction * remaining / 1000.0, 0.0, 0.0, 0.0])
+                moving, cur_level, cur_dir = True, level, direction
+                commanded_mm += remaining
+                n_commands += 1
+
+            time.sleep(poll_s)
+        else:
+            print("[ToF] 연속 접근 시간 초과")
+    finally:
+        if moving:
+            robot.stop_motion()
+            robot.wait_for_move_finish()
+        robot.set_task_vel_level(restore_level)
+
+    return None
+
+
+# ------------------------- 시뮬레이션 -------------------------
+
+class _SimToF:
+    """시뮬레이션 로봇(indy_sim.SimIndyDCP2)의 시작 tool z 축 방향 이동량으로 계산한 거리"""
+    def __init__(self, robot, start_mm):
+        self.robot = robot
+        self.start_mm = start_mm
+        pose = robot.get_task_pos()
+        self._p0 = np.asarray(pose[:3])
+        self._axis = uvw_to_rot(*pose[3:])[:, 2]
+
+    def latest(self, max_age_s=None):
+        p = np.asarray(self.robot.get_task_pos()[:3])
+        travelled_mm = float(np.dot(p - self._p0, self._axis)) * 1000.0
+        return time.monotonic(), int(round(self.start_mm - travelled_mm))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ToF 연속 접근 시뮬레이션")
+    parser.add_argument('--start', type=float, default=180.0, help="시작 거리(mm)")
+    parser.add_argument('--target', type=int, default=70)
+    parser.add_argument('--tol', type=int, default=10)
+    args = parser.parse_args()
+
+    from indy_sim import SimIndyDCP2
+    sim_robot = SimIndyDCP2()
+    sim_robot.set_task_vel_level(1)
+    sim_tof = _SimToF(sim_robot, args.start)
+    t_start = time.monotonic()
+    final = approach_to_distance(sim_robot, sim_tof, target_mm=args.target, tol_mm=args.tol)
+    print(f"[SIM] final={final} mm, elapsed={time.monotonic() - t_start:.2f}s")
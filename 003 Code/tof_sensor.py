@@ -2,11 +2,21 @@
 import sys
 import os
 import time
+import threading
+from collections import deque
 from statistics import median
-from typing import Optional
+from typing import Optional, List, Tuple
+
+import metrics
 
 sys.path.append('/home/dfx')
-from opencr.opencr_firmware.libraries.peripheral._opencr import OpenCRSerial
+try:
+    from opencr.opencr_firmware.libraries.peripheral._opencr import OpenCRSerial
+except ImportError:  # 시뮬레이터(opencr_sim.SimOpenCR)만 사용하는 환경
+    OpenCRSerial = None
+
+# 센서 측정 주기 (VL53L0X 기본 timing budget ≈ 33 ms), 이보다 자주 읽어도 같은 값이고 공유 OpenCR 버스만 점유
+TOF_PERIOD_S = float(os.environ.get('TOF_PERIOD_S', '0.033'))
 
 
 class ToF_Sensor:
@@ -20,6 +30,12 @@ class ToF_Sensor:
         self._owns_opencr = False
         self.opencr = None  
 
+        # 백그라운드 샘플링 상태 (start_sampling)
+        self._sampler = None
+        self._sampler_stop = threading.Event()
+        self._buf = deque(maxlen=256)
+        self._buf_cond = threading.Condition()
+
         if shared_opencr is not None:
             self.opencr = shared_opencr
             self._owns_opencr = False
@@ -64,6 +80,8 @@ class ToF_Sensor:
             return None
 
     def read_avg_mm(self, samples: int = 5, timeout_s: float = 2.0) -> Optional[int]:
+        if self.sampling:
+            return self.wait_for_samples(time.monotonic(), samples, timeout_s, method="mean")
         vals = []
         t0 = time.time()
         while len(vals) < max(1, samples) and (time.time() - t0) < max(0.1, timeout_s):
@@ -78,6 +96,8 @@ class ToF_Sensor:
 
     def read_med_mm(self, samples: int = 5, timeout_s: float = 2.0) -> Optional[int]:
         """여러 번 읽어 중값(mm). 실패 시 None."""
+        if self.sampling:
+            return self.wait_for_samples(time.monotonic(), samples, timeout_s, method="median")
         vals = []
         t0 = time.time()
         while len(vals) < max(1, samples) and (time.time() - t0) < max(0.1, timeout_s):
@@ -90,7 +110,103 @@ class ToF_Sensor:
             return None
         return int(median(vals))
 
+    # ------------------------- 백그라운드 샘플링 -------------------------
+
+    @property
+    def sampling(self) -> bool:
+        return self._sampler is not None
+
+    def start_sampling(self, buffer_size: int = 256, retry_s: float = 0.03,
+                       period_s: float = TOF_PERIOD_S):
+        """
+        센서 측정 주기(period_s)마다 읽어 (monotonic 시각, mm) 링 버퍼에 저장
+        이후 read_avg_mm/read_med_mm 과 아래 조회 함수는 버퍼를 사용
+        """
+        if self._sampler is not None:
+            return
+        with self._buf_cond:
+            self._buf = deque(maxlen=max(1, buffer_size))
+        self._sampler_stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, args=(retry_s, period_s),
+                                         name="tof-sampler", daemon=True)
+        self._sampler.start()
+        print("[ToF] Background sampling started")
+
+    def stop_sampling(self):
+        if self._sampler is None:
+            return
+        self._sampler_stop.set()
+        self._sampler.join(timeout=1.0)
+        self._sampler = None
+        print("[ToF] Background sampling stopped")
+
+    def _sample_loop(self, retry_s: float, period_s: float):
+        while not self._sampler_stop.is_set():
+            t0 = time.monotonic()
+            d = self.read_distance()
+            if d is not None and d > 0:
+                with self._buf_cond:
+                    self._buf.append((time.monotonic(), d))
+                    self._buf_cond.notify_all()
+                metrics.count('tof_samples')
+                # 다음 측정값이 나올 때까지 버스를 다른 트랜잭션(엔드이펙터 등)에 양보
+                self._sampler_stop.wait(max(0.0, period_s - (time.monotonic() - t0)))
+            else:
+                metrics.count('tof_invalid_reads')
+                self._sampler_stop.wait(retry_s)
+
+    def latest(self, max_age_s: Optional[float] = None) -> Optional[Tuple[float, int]]:
+        """가장 최근 샘플 (monotonic 시각, mm). 없거나 max_age_s 보다 오래되면 None"""
+        with self._buf_cond:
+            if not self._buf:
+                return None
+            t, d = self._buf[-1]
+        if max_age_s is not None and time.monotonic() - t > max_age_s:
+            return None
+        return t, d
+
+    def samples_since(self, t: float) -> List[int]:
+        """monotonic 시각 t 이후 샘플(mm) 리스트"""
+        with self._buf_cond:
+            return [d for (ts, d) in self._buf if ts >= t]
+
+    def mean_since(self, t: float) -> Optional[int]:
+        vals = self.samples_since(t)
+        if not vals:
+            return None
+        return int(sum(vals) / len(vals))
+
+    def median_window(self, n: int) -> Optional[int]:
+        """최근 n 개 샘플의 중값"""
+        with self._buf_cond:
+            vals = [d for (_, d) in list(self._buf)[-max(1, n):]]
+        if not vals:
+            return None
+        return int(median(vals))
+
+    def wait_for_samples(self, since: float, n: int = 1, timeout_s: float = 1.0,
+                         method: str = "mean") -> Optional[int]:
+        """
+        since 이후 샘플이 n 개 모일 때까지(최대 timeout_s) 기다린 뒤 mean/median 반환
+        timeout 시 모인 샘플만으로 계산, 하나도 없으면 None
+        """
+        deadline = time.monotonic() + max(0.0, timeout_s)
+        with self._buf_cond:
+            while True:
+                vals = [d for (ts, d) in self._buf if ts >= since]
+                remaining = deadline - time.monotonic()
+                if len(vals) >= max(1, n) or remaining <= 0:
+                    break
+                self._buf_cond.wait(remaining)
+        if not vals:
+            return None
+        vals = vals[:max(1, n)]
+        if method == "median":
+            return int(median(vals))
+        return int(sum(vals) / len(vals))
+
     def close(self):
+        self.stop_sampling()
         if self.opencr and self._owns_opencr:
             try:
                 if hasattr(self.opencr, "close"):
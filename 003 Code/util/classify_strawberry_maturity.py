@@ -24,3 +24,44 @@ def classify_strawberry_maturity(hsv_image, instance_mask,
         return 'semi_ripe'
     else:
         return 'unripe'
+
+
+def classify_strawberry_maturity_batch(hsv_image, instance_mask,
+                                        v_thresh=30, s_thresh=50,
+                                        red_low=10, red_high=170,
+                                        ripe_ratio=0.2, semi_ratio=0.1):
+    """
+    전체 인스턴스의 숙성도를 한 번에 분류 (classify_strawberry_maturity 와 동일한 기준)
+    :param hsv_image: 전체 HSV 이미지 (3채널 numpy 배열)
+    :param instance_mask: 인스턴스 마스크 (int 배열), 값: 0=배경, 1~N=인스턴스
+    :return: {inst_id: 'fully_ripe' | 'semi_ripe' | 'unripe' | 'unknown'}
+    """
+    labels = np.asarray(instance_mask)
+    ids = np.unique(labels)
+    ids = ids[ids > 0]
+    if ids.size == 0:
+        return {}
+
+    h, s, v = hsv_image[..., 0], hsv_image[..., 1], hsv_image[..., 2]
+    valid = (v > v_thresh) & (s > s_thresh) & (labels > 0)
+    red = valid & ((h < red_low) | (h > red_high))
+
+    # 라벨별 유효/빨강 픽셀 수를 한 번에 계산
+    n_bins = int(ids.max()) + 1
+    totals = np.bincount(labels[valid], minlength=n_bins)
+    reds = np.bincount(labels[red], minlength=n_bins)
+
+    result = {}
+    for inst_id in ids.tolist():
+        total = totals[inst_id]
+        if total == 0:
+            result[inst_id] = 'unknown'
+            continue
+        red_ratio = reds[inst_id] / total
+        if red_ratio >= ripe_ratio:
+            result[inst_id] = 'fully_ripe'
+        elif red_ratio >= semi_ratio:
+            result[inst_id] = 'semi_ripe'
+        else:
+            result[inst_id] = 'unripe'
+    return result
@@ -3,7 +3,11 @@ import cv2
 from skimage.draw import line as bresenham_line
 from typing import List
 
-def refine_triangle_vertices(mask: np.ndarray, triangle: np.ndarray) -> np.ndarray:
+def refine_triangle_vertices(mask: np.ndarray, triangle: np.ndarray, offset: tuple = (0, 0)) -> np.ndarray:
+    """
+    offset: mask 가 ROI 일 때 ROI 좌상단의 프레임 좌표 (x, y), triangle 과 반환값은 프레임 좌표
+    """
+    ox, oy = offset
     refined_pts = []
     for i in range(3):
         p0 = triangle[i]
@@ -12,23 +16,27 @@ def refine_triangle_vertices(mask: np.ndarray, triangle: np.ndarray) -> np.ndarr
         midpoint = ((p1 + p2) / 2).astype(int)
         rr, cc = bresenham_line(p0[1], p0[0], midpoint[1], midpoint[0])
         for y, x in zip(rr, cc):
-            if 0 <= x < mask.shape[1] and 0 <= y < mask.shape[0] and mask[y, x] > 0:
+            if 0 <= x - ox < mask.shape[1] and 0 <= y - oy < mask.shape[0] and mask[y - oy, x - ox] > 0:
                 refined_pts.append(np.array([x, y]))
                 break
         else:
             refined_pts.append(p0)
     return np.array(refined_pts, dtype=np.int32)
 
-def extract_centerline_and_picking_points(mask: np.ndarray) -> tuple:
+def extract_centerline_and_picking_points(mask: np.ndarray, offset: tuple = (0, 0)) -> tuple:
     """
     주어진 딸기 인스턴스 마스크로부터 중심축과 수확지점 후보 두 점을 계산합니다.
 
-    Returns:
+    Args:
+        mask (np.ndarray): 인스턴스 마스크 (전체 프레임 또는 인스턴스 ROI)
+        offset (tuple): mask 가 ROI 일 때 ROI 좌상단의 프레임 좌표 (x, y)
+
+    Returns (프레임 좌표):
         tip (np.ndarray): 중심축 하단 점
         midpoint (np.ndarray): 중심축 상단 점
         picking_pts (list[np.ndarray]): 수확 지점 후보 두 점
     """
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=tuple(offset))
     if not contours or len(contours[0]) < 3:
         return None, None, []
 
@@ -41,7 +49,7 @@ def extract_centerline_and_picking_points(mask: np.ndarray) -> tuple:
     if triangle.shape != (3, 2):
         return None, None, []
 
-    refined_pts = refine_triangle_vertices(mask, triangle)
+    refined_pts = refine_triangle_vertices(mask, triangle, offset)
     if refined_pts.shape != (3, 2):
         return None, None, []
 
@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from scipy import ndimage
 from skimage.segmentation import watershed
 
 def generate_instance_mask(mask_gray: np.ndarray, morph_kernel_size=(3, 3), dist_thresh_ratio=0.4):
@@ -16,3 +17,21 @@ def generate_instance_mask(mask_gray: np.ndarray, morph_kernel_size=(3, 3), dist
     _, markers = cv2.connectedComponents(sure_fg)
     instance_mask = watershed(-dist, markers, mask=(clean_mask > 0))
     return instance_mask
+
+
+def instance_rois(instance_mask: np.ndarray, pad=0):
+    """
+    인스턴스별 bounding box ROI 계산 (한 번의 find_objects)
+    :param instance_mask: 인스턴스 마스크 (int 배열), 값: 0=배경, 1~N=인스턴스
+    :param pad: ROI 주변 여유 픽셀 (프레임 경계에서 잘림)
+    :return: [(inst_id, (slice_y, slice_x)), ...] inst_id 오름차순
+    """
+    h, w = instance_mask.shape[:2]
+    rois = []
+    for idx, sl in enumerate(ndimage.find_objects(instance_mask)):
+        if sl is None:
+            continue
+        sy, sx = sl
+        rois.append((idx + 1, (slice(max(0, sy.start - pad), min(h, sy.stop + pad)),
+                               slice(max(0, sx.start - pad), min(w, sx.stop + pad)))))
+    return rois
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class LatestFrameQueue:
+    """
+    최신 항목만 유지하는 bounded 큐
+    - 가득 찬 상태에서 put 하면 가장 오래된 항목을 버림 (stale 프레임 drop)
+    - drop=False 면 버리지 않고 빈 자리가 생길 때까지 대기 (재생 소스의 전 프레임 처리용)
+    - dropped: 버려진 항목 수
+    """
+    def __init__(self, maxsize=1, drop=True):
+        self._items = deque()
+        self._maxsize = max(1, int(maxsize))
+        self._drop = drop
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item, timeout=None):
+        """drop=False 에서 timeout 까지 자리가 나지 않으면 False 반환"""
+        with self._cond:
+            if len(self._items) >= self._maxsize:
+                if self._drop:
+                    self._items.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(lambda: len(self._items) < self._maxsize, timeout):
+                    return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """항목이 없으면 timeout(초)까지 대기, 그래도 없으면 None 반환"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._items) > 0, timeout):
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class StageTimer:
+    """
+    스테이지별 처리 시간(ms) 측정
+    - 최근값 지수이동평균(EMA)과 누적 평균을 함께 유지
+    - 여러 스레드에서 동시에 record 가능
+    """
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._ema = {}
+        self._total = {}
+        self._count = {}
+
+    @contextmanager
+    def measure(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - t0) * 1000.0)
+
+    def record(self, stage, ms):
+        with self._lock:
+            prev = self._ema.get(stage)
+            self._ema[stage] = ms if prev is None else prev + self.alpha * (ms - prev)
+            self._total[stage] = self._total.get(stage, 0.0) + ms
+            self._count[stage] = self._count.get(stage, 0) + 1
+
+    def snapshot(self):
+        """{stage: {'ema_ms', 'avg_ms', 'count'}}"""
+        with self._lock:
+            return {stage: {'ema_ms': self._ema[stage],
+                            'avg_ms': self._total[stage] / self._count[stage],
+                            'count': self._count[stage]}
+                    for stage in self._ema}
+
+    def summary_text(self, stages=None):
+        snap = self.snapshot()
+        stages = stages or list(snap.keys())
+        return " | ".join(f"{s} {snap[s]['ema_ms']:.1f}ms" for s in stages if s in snap)
+
+
+class AdaptiveScheduler:
+    """
+    로봇 동작 상태에 따른 인식 부하 조절
+    - 'full'   : 매 프레임 전체 인식 (YOLO + Segmentation + 후처리)
+    - 'monitor': is_busy() 가 True 인 동안 monitor_every 프레임마다 detector(YOLO)만 실행, 나머지는 skip
+    busy 가 풀리면(홈 복귀) 즉시 'full' 로 복귀하고 resumed 를 True 로 알려줌 (이전 캐시 무효화용)
+    """
+    FULL = 'full'
+    MONITOR = 'monitor'
+
+    def __init__(self, is_busy=None, monitor_every=5):
+        self.is_busy = is_busy
+        self.monitor_every = max(1, int(monitor_every))
+        self.mode = self.FULL
+        self.resumed = False
+        self._monitor_idx = 0
+        # 관찰용 카운터
+        self.counters = {'full': 0, 'detect': 0, 'skip': 0, 'to_monitor': 0, 'to_full': 0}
+
+    def next_action(self):
+        """이번 프레임 처리 방식: 'full' | 'detect' | 'skip'"""
+        busy = bool(self.is_busy()) if self.is_busy is not None else False
+        self.resumed = False
+
+        if busy and self.mode == self.FULL:
+            self.mode = self.MONITOR
+            self._monitor_idx = 0
+            self.counters['to_monitor'] += 1
+        elif not busy and self.mode == self.MONITOR:
+            self.mode = self.FULL
+            self.resumed = True
+            self.counters['to_full'] += 1
+
+        if self.mode == self.FULL:
+            action = 'full'
+        else:
+            action = 'detect' if self._monitor_idx % self.monitor_every == 0 else 'skip'
+            self._monitor_idx += 1
+        self.counters[action] += 1
+        return action
+
+    def summary_text(self):
+        c = self.counters
+        return f"{self.mode} (full {c['full']}, detect {c['detect']}, skip {c['skip']})"
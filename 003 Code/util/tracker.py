@@ -0,0 +1,250 @@
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+
+def box_iou(a, b):
+    """a, b: (x1, y1, x2, y2)"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def box_contains(box, x, y):
+    return box[0] <= x < box[2] and box[1] <= y < box[3]
+
+
+class KalmanBoxFilter:
+    """
+    등속 모델 칼만 필터
+    상태: [cx, cy, w, h, vx, vy], 측정: [cx, cy, w, h]
+    """
+    def __init__(self, box, process_noise=1.0, measure_noise=4.0):
+        cx, cy, w, h = self._to_cxcywh(box)
+        self.x = np.array([cx, cy, w, h, 0.0, 0.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0])
+        self.F = np.eye(6)
+        self.F[0, 4] = 1.0
+        self.F[1, 5] = 1.0
+        self.H = np.eye(4, 6)
+        self.Q = np.eye(6) * process_noise
+        self.Q[4:, 4:] *= 0.1
+        self.R = np.eye(4) * measure_noise
+
+    @staticmethod
+    def _to_cxcywh(box):
+        x1, y1, x2, y2 = box
+        return (x1 + x2) / 2.0, (y1 + y2) / 2.0, float(x2 - x1), float(y2 - y1)
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self.box()
+
+    def update(self, box):
+        z = np.array(self._to_cxcywh(box))
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return (cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0)
+
+
+class Track:
+    """딸기 1개에 대한 트랙 + 마지막 refresh 시점의 캐시"""
+    def __init__(self, track_id, box):
+        self.id = track_id
+        self.kf = KalmanBoxFilter(box)
+        self.box = tuple(box)          # 이번 프레임 측정 box (정수, 프레임 좌표)
+        self.hits = 1
+        self.misses = 0
+        # refresh 캐시
+        self.ref_box = None            # refresh 시점 box
+        self.mask = None               # refresh 시점 crop 마스크 (ref_box 크기)
+        self.maturity = None
+
+    def smoothed_box(self, shape=None):
+        """
+        칼만 필터로 스무딩한 box (정수, 최소 1px), shape=(h, w) 를 주면 프레임 안으로 자름
+        캐시 재사용 프레임의 마스크 위치/표시에 사용 (detection box 의 프레임 간 흔들림 제거)
+        """
+        x1, y1, x2, y2 = (int(round(v)) for v in self.kf.box())
+        x1, y1 = max(x1, 0), max(y1, 0)
+        if shape is not None:
+            x2, y2 = min(x2, shape[1]), min(y2, shape[0])
+            x1, y1 = min(x1, shape[1] - 1), min(y1, shape[0] - 1)
+        return x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)
+
+
+class BoxTracker:
+    """
+    YOLO box 기반 tracking-by-detection (IoU 헝가리안 매칭 + 칼만 스무딩)
+    - 매칭은 칼만 예측 box 로, 캐시 재사용 프레임의 마스크/트랙 box 는 스무딩된 box 로 출력
+      (refresh 판단은 실제 detection box 기준, 수확 대상 좌표는 refresh 시점 값 그대로)
+    - 트랙별로 segmentation 마스크 / 숙성도 / 수확 대상 결과를 캐시
+    - refresh_interval 프레임마다, 또는 새 트랙 / box 큰 변화(IoU < refresh_iou) / 대상 트랙 소실 시에만
+      전체 인식 경로를 다시 실행하도록 needs_refresh 로 알려줌
+    """
+    def __init__(self, iou_thresh=0.3, max_age=5, refresh_interval=10, refresh_iou=0.7):
+        self.iou_thresh = iou_thresh
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.refresh_iou = refresh_iou
+
+        self._next_id = 1
+        self.n_refresh = 0
+        self.n_reuse = 0
+        self.reset()
+
+    def reset(self):
+        """모든 트랙/캐시 제거 (track id / 카운터는 이어서 사용)"""
+        self.tracks = {}
+        self._frames_since_refresh = None
+        self._current_ids = []
+        self.target_track_id = None
+        self._target = None
+        self._targets = []
+
+    # ------------------------- 연관 -------------------------
+
+    def update(self, boxes):
+        """
+        boxes: [(x1, y1, x2, y2), ...] 이번 프레임 detection
+        return: 각 box 에 대응하는 track id 리스트
+        """
+        track_list = list(self.tracks.values())
+        predicted = [t.kf.predict() for t in track_list]
+
+        matched = {}
+        if track_list and boxes:
+            cost = np.ones((len(track_list), len(boxes)))
+            for i, pb in enumerate(predicted):
+                for j, b in enumerate(boxes):
+                    cost[i, j] = 1.0 - box_iou(pb, b)
+            rows, cols = linear_sum_assignment(cost)
+            for i, j in zip(rows, cols):
+                if 1.0 - cost[i, j] >= self.iou_thresh:
+                    matched[j] = track_list[i]
+
+        ids = []
+        seen = set()
+        for j, b in enumerate(boxes):
+            track = matched.get(j)
+            if track is None:
+                track = Track(self._next_id, b)
+                self.tracks[track.id] = track
+                self._next_id += 1
+            else:
+                track.kf.update(b)
+                track.box = tuple(b)
+                track.hits += 1
+                track.misses = 0
+            seen.add(track.id)
+            ids.append(track.id)
+
+        for track in track_list:
+            if track.id not in seen:
+                track.misses += 1
+                if track.misses > self.max_age:
+                    del self.tracks[track.id]
+
+        self._current_ids = ids
+        if self._frames_since_refresh is not None:
+            self._frames_since_refresh += 1
+        return ids
+
+    # ------------------------- 캐시 -------------------------
+
+    def needs_refresh(self):
+        """이번 프레임에 전체 인식(seg/instance/숙성도/수확점)을 다시 해야 하는지"""
+        if self._frames_since_refresh is None or self._frames_since_refresh >= self.refresh_interval:
+            return True
+        for tid in self._current_ids:
+            track = self.tracks[tid]
+            if track.ref_box is None or box_iou(track.box, track.ref_box) < self.refresh_iou:
+                return True
+        if self.target_track_id is not None and self.target_track_id not in self._current_ids:
+            return True
+        return False
+
+    def target_track_box(self):
+        """이전 수확 대상 트랙의 현재 box (없으면 None)"""
+        if self.target_track_id in self._current_ids:
+            return self.tracks[self.target_track_id].box
+        return None
+
+    def track_at(self, x, y):
+        """(x, y) 를 포함하는 현재 트랙 중 가장 작은 box 의 id"""
+        best, best_area = None, None
+        for tid in self._current_ids:
+            b = self.tracks[tid].box
+            if box_contains(b, x, y):
+                area = (b[2] - b[0]) * (b[3] - b[1])
+                if best_area is None or area < best_area:
+                    best, best_area = tid, area
+        return best
+
+    def refresh(self, seg, instance_centers, maturities, target, targets=()):
+        """
+        전체 인식 결과로 현재 트랙 캐시 갱신
+        seg: [((x1, y1, x2, y2), mask), ...] (update 에 넘긴 boxes 와 같은 순서)
+        instance_centers: [(inst_id, cx, cy), ...]
+        maturities: {inst_id: label}
+        target: process_frame 의 target dict 또는 None
+        targets: 전체 수확 대상 목록 (각 대상에 'track_id' 를 기록)
+        """
+        for tid, (box, mask) in zip(self._current_ids, seg):
+            track = self.tracks[tid]
+            track.ref_box = tuple(box)
+            track.mask = mask
+            track.maturity = None
+        for inst_id, cx, cy in instance_centers:
+            tid = self.track_at(cx, cy)
+            if tid is not None and self.tracks[tid].maturity is None:
+                self.tracks[tid].maturity = maturities.get(inst_id)
+
+        self._target = target
+        self._targets = list(targets)
+        for t in self._targets:
+            t['track_id'] = self.track_at(t['cx'], t['cy'])
+        self.target_track_id = self.track_at(target['cx'], target['cy']) if target is not None else None
+        # 대상이 어떤 트랙에도 속하지 않으면 캐시하지 않음 (다음 프레임 재계산)
+        self._frames_since_refresh = None if (target is not None and self.target_track_id is None) else 0
+        self.n_refresh += 1
+
+    def cached_seg(self, shape=None):
+        """
+        스무딩된 box 크기에 맞춘 캐시 마스크: [((x1, y1, x2, y2), mask), ...]
+        shape: 프레임 (h, w), box 를 프레임 안으로 자름
+        """
+        seg = []
+        for tid in self._current_ids:
+            track = self.tracks[tid]
+            x1, y1, x2, y2 = track.smoothed_box(shape)
+            mask = track.mask
+            if mask.shape != (y2 - y1, x2 - x1):
+                mask = cv2.resize(mask, (x2 - x1, y2 - y1), interpolation=cv2.INTER_NEAREST)
+            seg.append(((x1, y1, x2, y2), mask))
+        self.n_reuse += 1
+        return seg
+
+    def cached_target(self):
+        return self._target if self.target_track_id in self._current_ids else None
+
+    def cached_targets(self):
+        """refresh 시점 대상 중 트랙이 아직 보이는 것만"""
+        return [t for t in self._targets if t['track_id'] in self._current_ids]
+
+    def current_tracks(self, smoothed=False, shape=None):
+        """[(track_id, box, maturity), ...], smoothed: 칼만 스무딩 box (캐시 재사용 프레임)"""
+        return [(tid, self.tracks[tid].smoothed_box(shape) if smoothed else self.tracks[tid].box,
+                 self.tracks[tid].maturity) for tid in self._current_ids]